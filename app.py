@@ -1,608 +1,368 @@
 import dash
-from dash import dcc, html, Input, Output, callback, dash_table
+from dash import dcc, html, Input, Output, State, callback, clientside_callback, dash_table, no_update, DiskcacheManager
+from dash.development.base_component import Component
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
-import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, inspect as inspect_db, text
+from sqlalchemy.types import String, Text
 from datetime import datetime, timedelta
 import os
-import numpy as np
-import urllib.parse
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+import functools
+from decimal import Decimal
+from flask import Response, jsonify, request, stream_with_context
+
+# ==================== CONEXÃO COM O BANCO ====================
+# Conexão, pool de threads e QUERIES ficam em portal/db.py (sem dependência do Dash)
+from portal.db import (
+    DB_CONFIG, DETAIL_CHUNK_ROWS, QUERIES, SOURCE_TABLES,
+    breaker, execute_remote_query, get_engine, get_shared_engine, iter_frames, probe_remote_tables, read_frame,
+    reset_db_pool, stream_remote_query, submit_db
+)
+from portal.cache import DiskCacheBackend, MemoryCacheBackend
+from portal.catalogo import catalogo
+from portal.status import ICONES_STATUS, STATUS_CRITICOS, cores_status
+
+# ==================== CACHE COMPARTILHADO ====================
+# Resultados das fontes, figuras e sondas do banco ficam em um cache em disco
+# compartilhado pelos workers do gunicorn: cada resultado é calculado uma vez
+# por servidor, não uma vez por worker. Com False, o cache é só do processo.
+USE_SHARED_CACHE = True
+SHARED_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'shared')
+PROBE_CACHE_SECONDS = 30              # Sonda do SQL Server reaproveitada entre workers
+SOURCE_CACHE_SECONDS = 24 * 3600      # Resultados por assinatura das tabelas de origem
+
+cache_backend = DiskCacheBackend(SHARED_CACHE_DIR) if USE_SHARED_CACHE else MemoryCacheBackend()
+
+def probe_remote_cached():
+    """probe_remote_tables() com resultado compartilhado por PROBE_CACHE_SECONDS"""
+    return cache_backend.get_or_compute('sonda:remota', probe_remote_tables, expire=PROBE_CACHE_SECONDS)
+
+async def run_in_db_pool(func, *args):
+    """Awaitable de func(*args) executada no pool do banco (até DB_MAX_CONCURRENCY ao mesmo tempo)"""
+    return await asyncio.wrap_future(submit_db(func, *args))
+
+async def execute_query_async(query, params=None, **leitura):
+    """
+    Versão awaitable de execute_query: a query roda no pool do banco sem
+    bloquear o event loop, e várias delas em asyncio.gather rodam em paralelo
+    """
+    return await run_in_db_pool(functools.partial(execute_query, query, params, **leitura))
 
-# ==================== CONFIGURAÇÕES DE CONEXÃO ====================
-DB_CONFIG = {
-    'server': 'rio01p-sql01',
-    'database': 'ControleTI',
-    'username': 'RM',
-    'password': 'rm',
-    'port': '1433'
-}
+def execute_query(query, params=None, **leitura):
+    """
+    Executa query na réplica local (quando sincronizada) ou no SQL Server.
+    `leitura` vai para read_frame (chunksize, max_rows, convert).
+    """
+    if USE_LOCAL_REPLICA and replica.is_ready():
+        df = replica.query(query, params, **leitura)
+        if df is not None:
+            return df
+    return execute_remote_query(query, params, **leitura)
 
-# ===================================================================
+def stream_query(key, chunksize=DETAIL_CHUNK_ROWS):
+    """
+    Resultado da query `key` de QUERIES em blocos de `chunksize` linhas, com os
+    tipos declarados, lidos do cursor conforme o consumidor pede (exportação,
+    agregações): só um bloco fica em memória e não há o teto de linhas do
+    snapshot. Réplica local quando sincronizada; se ela não aceitar a query
+    antes do primeiro bloco, o SQL Server.
+    """
+    query = QUERIES[key]
+    if USE_LOCAL_REPLICA and replica.is_ready():
+        gerados = 0
+        try:
+            with replica.engine.connect() as connection:
+                for bloco in iter_frames(connection, query.sql, query.params, chunksize, convert=query.convert):
+                    gerados += 1
+                    yield query.prepare(bloco)
+            return
+        except Exception as e:
+            if gerados:
+                raise
+            print(f"Query não executada na réplica local, usando SQL Server: {e}")
+    for bloco in stream_remote_query(query.sql, query.params, chunksize, convert=query.convert):
+        yield query.prepare(bloco)
+
+
+def probe_source_tables():
+    """Assinaturas das tabelas lidas pelas QUERIES (réplica local, se em uso, ou SQL Server)"""
+    if USE_LOCAL_REPLICA and replica.is_ready():
+        return replica.signatures()
+    return probe_remote_cached()
+
+# ==================== RÉPLICA LOCAL (SQLite) ====================
+USE_LOCAL_REPLICA = True  # As QUERIES leem da cópia local; o SQL Server só é usado na sincronização
+REPLICA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'replica', 'controle_ti.db')
+INCREMENTAL_TABLES = ('Computadores', 'Perifericos')  # Chave ID crescente: linhas novas podem ser anexadas
+SYNC_CHUNK_ROWS = 5000  # Linhas lidas do SQL Server e gravadas na réplica por vez
+
+def _sql_format(valor, formato):
+    """FORMAT(data, 'yyyy-MM') do SQL Server para o SQLite"""
+    if valor is None:
+        return None
+    data = datetime.fromisoformat(str(valor))
+    for token, codigo in (('yyyy', '%Y'), ('MM', '%m'), ('dd', '%d'), ('HH', '%H'), ('mm', '%M')):
+        formato = formato.replace(token, codigo)
+    return data.strftime(formato)
+
+class _SqlStringAgg:
+    """STRING_AGG(valor, separador) do SQL Server para o SQLite"""
+
+    def __init__(self):
+        self.valores = []
+        self.separador = ''
+
+    def step(self, valor, separador):
+        if valor is not None:
+            self.valores.append(str(valor))
+            self.separador = separador
+
+    def finalize(self):
+        return self.separador.join(self.valores) if self.valores else None
+
+def _configurar_sqlite(dbapi_connection, connection_record):
+    """Funções T-SQL usadas pelas QUERIES e leitura concorrente (WAL)"""
+    dbapi_connection.execute('PRAGMA journal_mode=WAL')
+    dbapi_connection.create_function('GETDATE', 0, lambda: datetime.now().isoformat(sep=' ', timespec='seconds'))
+    dbapi_connection.create_function('YEAR', 1, lambda v: None if v is None else datetime.fromisoformat(str(v)).year)
+    dbapi_connection.create_function('FORMAT', 2, _sql_format)
+    dbapi_connection.create_aggregate('STRING_AGG', 2, _SqlStringAgg)
+
+def _read_sql(engine, query, params=None, **leitura):
+    """Lê uma query sem tratar erros (a sincronização não pode confundir falha com tabela vazia)"""
+    with engine.connect() as connection:
+        return read_frame(connection, query, params, **leitura)
+
+def _generic_types(esquema):
+    """Tipos genéricos do SQLAlchemy para as colunas de get_columns(); omite os que não têm equivalente"""
+    tipos = {}
+    for coluna in esquema:
+        try:
+            tipos[coluna['name']] = coluna['type'].as_generic()
+        except NotImplementedError:
+            pass
+    return tipos
+
+def _sqlite_ready(df):
+    """Converte valores que o SQLite não aceita (Decimal, UUID, ...)"""
+    for col in df.columns:
+        if pd.api.types.is_object_dtype(df[col]):
+            df[col] = df[col].map(
+                lambda v: float(v) if isinstance(v, Decimal)
+                else v if v is None or isinstance(v, (str, bytes, int, float, datetime))
+                else str(v)
+            )
+    return df
 
+class LocalReplica:
+    """
+    Cópia local (SQLite) de Computadores, Colaboradores, Terceirizados e
+    Perifericos. As QUERIES rodam sobre ela e o dashboard continua respondendo
+    com os últimos dados sincronizados se o SQL Server cair.
+    """
 
-def get_engine():
-    """Cria engine SQLAlchemy para SQL Server - Compatível com Linux"""
-    try:
-        password_encoded = urllib.parse.quote_plus(DB_CONFIG['password'])
-        username_encoded = urllib.parse.quote_plus(DB_CONFIG['username'])
-        
-        connection_attempts = [
-            {
-                'driver': 'ODBC Driver 18 for SQL Server',
-                'method': 'pyodbc'
-            },
-            {
-                'driver': 'ODBC Driver 17 for SQL Server', 
-                'method': 'pyodbc'
-            },
-            {
-                'driver': 'FreeTDS',
-                'method': 'pyodbc'
-            },
-            # Método 2: pymssql (não precisa de ODBC)
-            {
-                'method': 'pymssql'
-            }
-        ]
-        
-        for attempt in connection_attempts:
-            try:
-                if attempt['method'] == 'pyodbc':
-                    driver_encoded = urllib.parse.quote_plus(attempt['driver'])
-                    connection_string = f"""mssql+pyodbc://{username_encoded}:{password_encoded}@{DB_CONFIG['server']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}?driver={driver_encoded}&TrustServerCertificate=yes"""
-                elif attempt['method'] == 'pymssql':
-                    connection_string = f"""mssql+pymssql://{username_encoded}:{password_encoded}@{DB_CONFIG['server']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"""
-                
-                print(f"Tentando conexão com: {attempt}")
-                engine = create_engine(connection_string)
-                
-                # Testa a conexão
-                with engine.connect() as connection:
-                    connection.execute(text("SELECT 1"))
-                
-                print(f"Conexão bem-sucedida com: {attempt}")
-                return engine
-                
-            except Exception as e:
-                print(f"Falha com {attempt}: {e}")
-                continue
-        
-        raise Exception("Nenhum método de conexão funcionou")
-        
-    except Exception as e:
-        print(f"Erro na criação da engine: {e}")
-        return None
+    def __init__(self, path=REPLICA_PATH):
+        self.path = path
+        self._engine = None
+        self._ready = False
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            engine = create_engine(f"sqlite:///{self.path}", connect_args={'timeout': 30, 'check_same_thread': False})
+            event.listen(engine, 'connect', _configurar_sqlite)
+            with engine.begin() as conn:
+                conn.exec_driver_sql("""
+                    CREATE TABLE IF NOT EXISTS _sync_estado (
+                        Tabela TEXT PRIMARY KEY,
+                        Linhas TEXT,
+                        ChaveMax TEXT,
+                        Checksum TEXT,
+                        PrefixoChave INTEGER,
+                        PrefixoLinhas TEXT,
+                        PrefixoChecksum TEXT,
+                        SincronizadoEm TEXT
+                    )
+                """)
+            self._engine = engine
+        return self._engine
 
-def execute_query(query):
-    """Executa query e retorna DataFrame usando SQLAlchemy"""
-    engine = get_engine()
-    if engine:
+    def _estado(self):
+        with self.engine.connect() as conn:
+            rows = conn.exec_driver_sql("SELECT * FROM _sync_estado").mappings().all()
+        return {row['Tabela']: dict(row) for row in rows}
+
+    def signatures(self):
+        """Assinaturas (do SQL Server) das tabelas na última sincronização"""
         try:
-            with engine.connect() as connection:
-                df = pd.read_sql(text(query), connection)
-            return df
+            estado = self._estado()
         except Exception as e:
-            print(f"Erro na query: {e}")
-            print(f"Query executada: {query}")
-            return pd.DataFrame()
-    return pd.DataFrame()
-
-QUERIES = {
-    # Terceirizados inativos com equipamentos
-    'terceirizados_inativos_com_equipamentos': """
-        SELECT 
-            C.Serial, 
-            C.Modelo, 
-            C.Matricula AS Matricula_Comp,        
-            T.Nome, 
-            T.Matricula AS Matricula_Terc, 
-            T.Chefia 
-        FROM Computadores C 
-        JOIN Terceirizados T ON C.Matricula = T.Matricula 
-        WHERE T.Situacao = 0
-    """,
-    
-    # Terceirizados ativos com equipamentos
-    'terceirizados_ativos_com_equipamentos': """
-        SELECT 
-            C.Serial, 
-            C.Modelo, 
-            C.Matricula AS Matricula_Comp,        
-            T.Nome, 
-            T.Matricula AS Matricula_Terc, 
-            T.Chefia 
-        FROM Computadores C 
-        JOIN Terceirizados T ON C.Matricula = T.Matricula 
-        WHERE T.Situacao = 1
-    """,
-    
-    # Colaboradores demitidos
-    'colaboradores_demitidos': """
-        SELECT Colaboradores.Nome 
-        FROM Colaboradores  
-        WHERE Colaboradores.Situacao = 'Demitido'
-    """,
-    
-    # Colaboradores aviso prévio
-    'colaboradores_aviso_previo': """
-        SELECT Colaboradores.Nome 
-        FROM Colaboradores  
-        WHERE Colaboradores.Situacao = 'Aviso Prévio'
-    """,
-    
-    # Colaboradores demitidos com equipamentos
-    'colaboradores_demitidos_com_equipamentos': """
-        SELECT     
-            c.Nome AS Colaborador,     
-            c.CCusto,     
-            c.Chefia,     
-            comp.Modelo AS ModeloComputador,     
-            p.Modelo AS ModeloPeriferico 
-        FROM Colaboradores c 
-        LEFT JOIN Computadores comp ON comp.Matricula = c.Matricula 
-        LEFT JOIN Perifericos p ON p.Matricula = c.Matricula 
-        WHERE c.Situacao = 'Demitido'     
-            AND c.Nome IS NOT NULL     
-            AND comp.Modelo IS NOT NULL     
-            AND (comp.ID IS NOT NULL OR p.ID IS NOT NULL)
-    """,
-    
-    # Total em estoque
-    'total_equipamentos_estoque': """
-        SELECT SUM(Quantidade) AS TotalEmEstoque 
-        FROM (     
-            SELECT Modelo, COUNT(*) AS Quantidade     
-            FROM Computadores     
-            WHERE Usuario LIKE '%estoque%'     
-              AND Status NOT IN (4, 6, 8, 9, 5)  -- Excluir: Extraviado, Roubado, Descartado, Danificado, Reparo
-            GROUP BY Modelo 
-        ) AS Subconsulta
-    """,
-    
-    # Modelos em estoque
-    'modelos_em_estoque': """
-        SELECT 
-            Modelo, 
-            COUNT(*) AS Quantidade
-        FROM Computadores
-        WHERE Usuario LIKE '%estoque%'
-          AND Status NOT IN (4, 6, 8, 9, 5)  -- Excluir: Extraviado, Roubado, Descartado, Danificado, Reparo
-        GROUP BY Modelo
-        ORDER BY Quantidade DESC
-    """,
-    
-    # Colaboradores ativos com equipamentos
-    'colaboradores_ativos_com_equipamentos': """
-        SELECT 
-            Computadores.Serial, 
-            Computadores.Modelo, 
-            Computadores.Matricula, 
-            Colaboradores.Nome 
-        FROM Computadores 
-        LEFT JOIN Colaboradores ON Computadores.Matricula = Colaboradores.Matricula
-        WHERE Computadores.Matricula IS NOT NULL
-            AND Colaboradores.Nome IS NOT NULL
-    """,
-    
-    # KPIs de contagem
-    'kpi_terceirizados_inativos': """
-        SELECT COUNT(*) as total_terceirizados_inativos
-        FROM Computadores C 
-        JOIN Terceirizados T ON C.Matricula = T.Matricula 
-        WHERE T.Situacao = 0
-    """,
-    
-    'kpi_terceirizados_ativos': """
-        SELECT COUNT(*) as total_terceirizados_ativos
-        FROM Computadores C 
-        JOIN Terceirizados T ON C.Matricula = T.Matricula 
-        WHERE T.Situacao = 1
-    """,
-    
-    'kpi_colaboradores_demitidos': """
-        SELECT COUNT(*) as total_colaboradores_demitidos
-        FROM Colaboradores  
-        WHERE Situacao = 'Demitido'
-    """,
-    
-    'kpi_colaboradores_aviso_previo': """
-        SELECT COUNT(*) as total_colaboradores_aviso_previo
-        FROM Colaboradores  
-        WHERE Situacao = 'Aviso Prévio'
-    """,
-    
-    'kpi_colaboradores_ativos': """
-        SELECT COUNT(*) as total_colaboradores_ativos
-        FROM Colaboradores  
-        WHERE Situacao = 'Ativo'
-    """,
-    
-    'lista_computadores': """
-        SELECT Serial
-        FROM Computadores
-        WHERE Serial IS NOT NULL
-          AND Status NOT IN (4, 6, 8, 9, 5)  -- Excluir: Extraviado, Roubado, Descartado, Danificado, Reparo
-    """,
-    
-    # Equipamentos alocados (não estoque, com matrícula)
-    'kpi_equipamentos_alocados': """
-        SELECT COUNT(*) as total_equipamentos_alocados
-        FROM Computadores
-        WHERE Matricula IS NOT NULL
-          AND (Usuario IS NULL OR Usuario NOT LIKE '%estoque%')
-          AND Status NOT IN (4, 6, 8, 9, 5)  -- Excluir: Extraviado, Roubado, Descartado, Danificado, Reparo
-    """,
-    
-    'kpi_equipamentos_sem_dono': """
-        SELECT COUNT(*) as total_equipamentos_descartados
-        FROM Computadores
-        WHERE Status IN (4, 6, 8, 9)  -- Extraviado, Roubado, Descartado, Danificado
-    """,
-    
-    'kpi_colaboradores_ativos_sem_computador': """
-        SELECT COUNT(*) as total_colaboradores_ativos_sem_computador
-        FROM Colaboradores c
-        LEFT JOIN Computadores comp ON comp.Matricula = c.Matricula
-        WHERE c.Situacao = 'Ativo'
-          AND comp.Matricula IS NULL
-    """,
-    
-    'kpi_demitidos_com_equipamentos': """
-        SELECT COUNT(DISTINCT c.Matricula) as total_demitidos_com_equipamentos
-        FROM Colaboradores c 
-        LEFT JOIN Computadores comp ON comp.Matricula = c.Matricula 
-        LEFT JOIN Perifericos p ON p.Matricula = c.Matricula 
-        WHERE c.Situacao = 'Demitido'     
-            AND c.Nome IS NOT NULL     
-            AND comp.Modelo IS NOT NULL     
-            AND (comp.ID IS NOT NULL OR p.ID IS NOT NULL)
-    """,
-    
-    'kpi_colaboradores_ativos_com_equipamentos': """
-        SELECT COUNT(*) as total_colaboradores_ativos_com_equipamentos
-        FROM Computadores 
-        LEFT JOIN Colaboradores ON Computadores.Matricula = Colaboradores.Matricula
-        WHERE Computadores.Matricula IS NOT NULL
-            AND Colaboradores.Nome IS NOT NULL
-    """,
-    
-    # Consultas adicionais básicas
-    'total_computadores': """
-        SELECT COUNT(*) as total_computadores
-        FROM Computadores
-        WHERE Status NOT IN (4, 6, 8, 9, 5)  -- Excluir: Extraviado, Roubado, Descartado, Danificado, Reparo
-    """,
-    
-    'kpi_equipamentos_alugados': """
-        SELECT COUNT(*) as total_equipamentos_alugados
-        FROM Computadores
-        WHERE Modelo LIKE '%Samsung%' OR Modelo LIKE '%SAMSUNG%' OR Modelo LIKE '%samsung%'
-        AND Status NOT IN (4, 6, 8, 9, 5)  -- Excluir: Extraviado, Roubado, Descartado, Danificado, Reparo
-    """,
-    
-    'computadores_por_modelo': """
-        SELECT 
-            Modelo,
-            COUNT(*) as quantidade
-        FROM Computadores
-        WHERE Modelo IS NOT NULL
-          AND Status NOT IN (4, 6, 8, 9, 5)  -- Excluir: Extraviado, Roubado, Descartado, Danificado, Reparo
-        GROUP BY Modelo
-        ORDER BY quantidade DESC
-    """,
-    
-    'usuarios_por_setor': """
-        SELECT 
-            COALESCE(c.CCusto, 'Sem Setor') as Setor,
-            COUNT(*) as quantidade
-        FROM Colaboradores c
-        WHERE c.Situacao NOT IN ('Demitido', 'Aviso Prévio')
-        GROUP BY c.CCusto
-        ORDER BY quantidade DESC
-    """,
-    
-    'ocupacao_por_setor': """
-        SELECT 
-            COALESCE(c.CCusto, 'Sem Setor') as Setor,
-            COUNT(DISTINCT c.Matricula) as TotalColaboradores,
-            COUNT(DISTINCT CASE WHEN comp.Matricula IS NOT NULL THEN c.Matricula END) as ComEquipamento,
-            CASE 
-                WHEN COUNT(DISTINCT c.Matricula) > 0 
-                THEN ROUND(
-                    (COUNT(DISTINCT CASE WHEN comp.Matricula IS NOT NULL THEN c.Matricula END) * 100.0) / 
-                    COUNT(DISTINCT c.Matricula), 1
+            print(f"Erro ao ler estado da réplica local: {e}")
+            return None
+        return {
+            tabela: (row['Linhas'], row['ChaveMax'], row['Checksum'])
+            for tabela, row in estado.items()
+        }
+
+    def is_ready(self):
+        """True quando todas as tabelas de origem já foram copiadas ao menos uma vez"""
+        if not self._ready and os.path.exists(self.path):
+            self._ready = set(SOURCE_TABLES) <= set(self.signatures() or ())
+        return self._ready
+
+    def query(self, query, params=None, **leitura):
+        """Executa uma query na réplica; None se ela não for suportada pelo SQLite"""
+        try:
+            return _read_sql(self.engine, query, params, **leitura)
+        except Exception as e:
+            print(f"Query não executada na réplica local, usando SQL Server: {e}")
+            return None
+
+    def sync(self):
+        """
+        Copia as tabelas que mudaram no SQL Server. Tabelas com chave crescente
+        recebem só as linhas novas quando as antigas não foram alteradas.
+        Retorna a lista de tabelas atualizadas. Um worker por vez sincroniza;
+        os outros encontram as tabelas já atualizadas e só pulam.
+        """
+        with self._lock, cache_backend.lock('replica:sync'):
+            remoto = probe_remote_cached()
+            if remoto is None:
+                return []  # SQL Server indisponível: mantém a última cópia
+            engine_remoto = get_shared_engine()
+            if engine_remoto is None:
+                return []
+            estado = self._estado()
+            atualizadas = []
+            for tabela, chave in SOURCE_TABLES.items():
+                assinatura = remoto.get(tabela)
+                local = estado.get(tabela)
+                if assinatura is None or (local and assinatura == (local['Linhas'], local['ChaveMax'], local['Checksum'])):
+                    continue
+                try:
+                    prefixo = None
+                    if tabela in INCREMENTAL_TABLES:
+                        # Lido antes da cópia, que só traz linhas até essa chave: uma linha alterada
+                        # depois deste ponto muda o checksum remoto e força a cópia completa na
+                        # próxima sincronização, em vez de entrar na base de comparação
+                        prefixo = self._remote_prefix(engine_remoto, tabela, chave)
+                    limite = prefixo[0] if prefixo else None
+                    if not (prefixo and self._append_new_rows(engine_remoto, tabela, chave, local, limite)):
+                        self._full_copy(engine_remoto, tabela, chave, limite)
+                    self._save_state(tabela, assinatura, prefixo)
+                    atualizadas.append(tabela)
+                except Exception as e:
+                    print(f"Erro ao sincronizar {tabela} na réplica local: {e}")
+            if atualizadas:
+                print(f"Réplica local sincronizada: {', '.join(atualizadas)}")
+            return atualizadas
+
+    def _remote_prefix(self, engine_remoto, tabela, chave, ultima_chave=None):
+        """
+        (chave máxima, linhas, checksum) das linhas remotas com chave <= ultima_chave
+        (todas, se None). Linhas e checksum vêm como texto, como em _sync_estado.
+        """
+        filtro = '' if ultima_chave is None else f"WHERE {chave} <= :ultima"
+        df = _read_sql(
+            engine_remoto,
+            f"""
+                SELECT MAX({chave}) AS ChaveMax, COUNT_BIG(*) AS Linhas, CHECKSUM_AGG(BINARY_CHECKSUM(*)) AS Checksum
+                FROM {tabela}
+                {filtro}
+            """,
+            params={'ultima': ultima_chave} if ultima_chave is not None else None
+        )
+        chave_max, linhas, checksum = df.iloc[0]
+        return (
+            None if pd.isna(chave_max) else int(chave_max),
+            None if pd.isna(linhas) else str(linhas),
+            None if pd.isna(checksum) else str(checksum)
+        )
+
+    def _append_new_rows(self, engine_remoto, tabela, chave, local, limite):
+        """
+        Anexa as linhas com chave até `limite` se as já copiadas não mudaram;
+        False = precisa de cópia completa
+        """
+        if not local or local['PrefixoChave'] is None or limite is None:
+            return False
+        ultima = int(local['PrefixoChave'])
+        prefixo = self._remote_prefix(engine_remoto, tabela, chave, ultima)
+        if prefixo[1:] != (local['PrefixoLinhas'], local['PrefixoChecksum']):
+            return False
+        with engine_remoto.connect() as remoto, self.engine.begin() as conn:
+            novas = f"SELECT * FROM {tabela} WHERE {chave} > :ultima AND {chave} <= :limite"
+            for bloco in iter_frames(remoto, novas, {'ultima': ultima, 'limite': limite}, SYNC_CHUNK_ROWS):
+                if not bloco.empty:
+                    _sqlite_ready(bloco).to_sql(tabela, conn, if_exists='append', index=False)
+        return True
+
+    def _full_copy(self, engine_remoto, tabela, chave, limite=None):
+        """
+        Copia a tabela inteira (só as linhas com chave até `limite`, se informado)
+        para uma tabela nova e troca de uma vez. As linhas são gravadas em blocos
+        de SYNC_CHUNK_ROWS à medida que chegam do SQL Server.
+        """
+        nova = f"_nova_{tabela}"
+        # Textos sem diferenciar maiúsculas, como no collation padrão do SQL Server. Os tipos
+        # vêm do esquema remoto: uma coluna pode estar só com NULL no primeiro bloco
+        esquema = inspect_db(engine_remoto).get_columns(tabela)
+        tipos = {coluna['name']: Text(collation='NOCASE') for coluna in esquema if isinstance(coluna['type'], String)}
+        colunas = None
+        with engine_remoto.connect() as remoto, self.engine.begin() as conn:
+            consulta, parametros = f"SELECT * FROM {tabela}", None
+            if limite is not None:
+                consulta, parametros = consulta + f" WHERE {chave} <= :limite", {'limite': limite}
+            for bloco in iter_frames(remoto, consulta, parametros, SYNC_CHUNK_ROWS):
+                bloco = _sqlite_ready(bloco)
+                if colunas is None:
+                    colunas = list(bloco.columns)
+                    # Sem linhas não há de onde o pandas tirar os tipos: usa os do esquema remoto
+                    dtype = {**_generic_types(esquema), **tipos} if bloco.empty else tipos
+                    bloco.to_sql(nova, conn, if_exists='replace', index=False, dtype=dtype)
+                else:
+                    bloco.to_sql(nova, conn, if_exists='append', index=False)
+            if colunas is None:
+                # Nenhum bloco: cria a tabela vazia a partir do esquema remoto
+                colunas = [coluna['name'] for coluna in esquema]
+                pd.DataFrame(columns=colunas).to_sql(
+                    nova, conn, if_exists='replace', index=False, dtype={**_generic_types(esquema), **tipos}
                 )
-                ELSE 0 
-            END as TaxaOcupacao
-        FROM Colaboradores c
-        LEFT JOIN Computadores comp ON comp.Matricula = c.Matricula
-        WHERE c.Situacao = 'Ativo'
-        GROUP BY c.CCusto
-        HAVING COUNT(DISTINCT c.Matricula) > 0
-        ORDER BY TaxaOcupacao DESC
-    """,
-    
-    'colaboradores_por_chefia': """
-        SELECT 
-            COALESCE(c.Chefia, 'Sem Chefia') as Chefia,
-            COUNT(*) as quantidade
-        FROM Colaboradores c
-        WHERE c.Situacao = 'Ativo'
-        GROUP BY c.Chefia
-        ORDER BY quantidade DESC
-    """,
-    
-    'colaboradores_detalhado': """
-        SELECT 
-            c.Nome,
-            c.Matricula,
-            COALESCE(c.CCusto, 'Sem Setor') as Setor,
-            COALESCE(c.Chefia, 'Sem Chefia') as Chefia,
-            c.Situacao,
-            CASE 
-                WHEN comp.Serial IS NOT NULL THEN 'Com Equipamento'
-                ELSE 'Sem Equipamento'
-            END as StatusEquipamento,
-            comp.Modelo as ModeloComputador
-        FROM Colaboradores c
-        LEFT JOIN Computadores comp ON comp.Matricula = c.Matricula
-        WHERE c.Situacao = 'Ativo'
-        ORDER BY c.Nome
-    """,
-    
-    'equipamentos_detalhado': """
-        SELECT 
-            c.Serial,
-            c.Modelo,
-            COALESCE(c.Usuario, 'Sem Usuário') as Usuario,
-            COALESCE(c.Matricula, 'Sem Matrícula') as Matricula,
-            COALESCE(col.Nome, 'Não Alocado') as NomeColaborador,
-            CASE 
-                WHEN c.Usuario LIKE '%estoque%' THEN 'Estoque'
-                WHEN c.Matricula IS NOT NULL THEN 'Em Uso'
-                ELSE 'Descartado'
-            END as Status
-        FROM Computadores c
-        LEFT JOIN Colaboradores col ON col.Matricula = c.Matricula
-        ORDER BY c.Modelo, c.Serial
-    """,
-    
-    'equipamentos_por_status': """
-        SELECT 
-            CASE 
-                WHEN c.Usuario LIKE '%estoque%' THEN 'Estoque'
-                WHEN c.Matricula IS NOT NULL THEN 'Em Uso'
-                ELSE 'Sem Dono'
-            END as Status,
-            COUNT(*) as quantidade
-        FROM Computadores c
-        GROUP BY 
-            CASE 
-                WHEN c.Usuario LIKE '%estoque%' THEN 'Estoque'
-                WHEN c.Matricula IS NOT NULL THEN 'Em Uso'
-                ELSE 'Sem Dono'
-            END
-        ORDER BY quantidade DESC
-    """,
-    
-    'equipamentos_por_status': """
-        SELECT 
-            CASE 
-                WHEN UPPER(COALESCE(c.Usuario, 'SEM STATUS')) = 'EM ESTOQUE' THEN 'Em Estoque'
-                WHEN UPPER(COALESCE(c.Usuario, 'SEM STATUS')) = 'ACESSO REMOTO' THEN 'Acesso Remoto' 
-                WHEN UPPER(COALESCE(c.Usuario, 'SEM STATUS')) = 'DESCARTADO' THEN 'Descartado'
-                WHEN UPPER(COALESCE(c.Usuario, 'SEM STATUS')) = 'DEVOLVIDO' THEN 'Devolvido'
-                WHEN UPPER(COALESCE(c.Usuario, 'SEM STATUS')) = 'DANIFICADO' THEN 'Danificado'
-                WHEN UPPER(COALESCE(c.Usuario, 'SEM STATUS')) = 'EXTRAVIADO' THEN 'Extraviado'
-                WHEN UPPER(COALESCE(c.Usuario, 'SEM STATUS')) = 'ROUBADO' THEN 'Roubado'
-                WHEN c.Matricula IS NOT NULL THEN 'Em Uso'
-                ELSE 'Sem Status'
-            END as Status,
-            COUNT(*) as quantidade
-        FROM Computadores c
-        GROUP BY 
-            CASE 
-                WHEN UPPER(COALESCE(c.Usuario, 'SEM STATUS')) = 'EM ESTOQUE' THEN 'Em Estoque'
-                WHEN UPPER(COALESCE(c.Usuario, 'SEM STATUS')) = 'ACESSO REMOTO' THEN 'Acesso Remoto'
-                WHEN UPPER(COALESCE(c.Usuario, 'SEM STATUS')) = 'DESCARTADO' THEN 'Descartado'
-                WHEN UPPER(COALESCE(c.Usuario, 'SEM STATUS')) = 'DEVOLVIDO' THEN 'Devolvido'
-                WHEN UPPER(COALESCE(c.Usuario, 'SEM STATUS')) = 'DANIFICADO' THEN 'Danificado'
-                WHEN UPPER(COALESCE(c.Usuario, 'SEM STATUS')) = 'EXTRAVIADO' THEN 'Extraviado'
-                WHEN UPPER(COALESCE(c.Usuario, 'SEM STATUS')) = 'ROUBADO' THEN 'Roubado'
-                WHEN c.Matricula IS NOT NULL THEN 'Em Uso'
-                ELSE 'Sem Status'
-            END
-        ORDER BY quantidade DESC
-    """,
-    
-    'equipamentos_criticidade': """
-        SELECT 
-            c.Serial,
-            c.Modelo,
-            COALESCE(c.Usuario, 'Sem Usuário') as Usuario,
-            COALESCE(c.Matricula, 'Sem Matrícula') as Matricula,
-            COALESCE(col.Nome, 'Não Alocado') as NomeColaborador,
-            CASE 
-                WHEN c.Usuario LIKE '%estoque%' THEN 'Estoque'
-                WHEN c.Matricula IS NOT NULL THEN 'Em Uso'
-                ELSE 'Descartado'
-            END as Status
-        FROM Computadores c
-        LEFT JOIN Colaboradores col ON col.Matricula = c.Matricula
-        WHERE c.Serial IS NOT NULL
-        ORDER BY c.Modelo, c.Serial
-    """,
-    
-    # Novas queries para análises mais avançadas
-    'custos_por_setor': """
-        SELECT 
-            COALESCE(col.CCusto, 'Sem Setor') as Setor,
-            COUNT(DISTINCT c.Serial) as QuantidadeEquipamentos,
-            COUNT(DISTINCT col.Matricula) as QuantidadeColaboradores,
-            CASE 
-                WHEN COUNT(DISTINCT col.Matricula) > 0 
-                THEN ROUND(CAST(COUNT(DISTINCT c.Serial) AS FLOAT) / COUNT(DISTINCT col.Matricula), 2)
-                ELSE 0 
-            END as EquipamentoPorColaborador
-        FROM Colaboradores col
-        LEFT JOIN Computadores c ON c.Matricula = col.Matricula
-        WHERE col.Situacao = 'Ativo'
-        GROUP BY col.CCusto
-        ORDER BY QuantidadeEquipamentos DESC
-    """,
-    
-    'rotatividade_analise': """
-        SELECT 
-            YEAR(GETDATE()) as Ano,
-            COUNT(CASE WHEN Situacao = 'Demitido' THEN 1 END) as Demitidos,
-            COUNT(CASE WHEN Situacao = 'Aviso Prévio' THEN 1 END) as AvisoPrevio,
-            COUNT(CASE WHEN Situacao = 'Ativo' THEN 1 END) as Ativos,
-            ROUND(
-                (COUNT(CASE WHEN Situacao IN ('Demitido', 'Aviso Prévio') THEN 1 END) * 100.0) / 
-                NULLIF(COUNT(*), 0), 2
-            ) as TaxaRotatividade
-        FROM Colaboradores
-    """,
-    
-    'equipamentos_idade_critica': """
-        SELECT 
-            c.Serial,
-            c.Modelo,
-            COALESCE(col.Nome, 'Não Alocado') as Usuario,
-            COALESCE(col.CCusto, 'Sem Setor') as Setor,
-            NULL as IdadeAnos,
-            'Sem Data de Compra' as StatusIdade
-        FROM Computadores c
-        LEFT JOIN Colaboradores col ON col.Matricula = c.Matricula
-        WHERE c.Serial IS NOT NULL
-        ORDER BY c.Modelo, c.Serial
-    """,
-    
-    'performance_mensal': """
-        SELECT 
-            FORMAT(GETDATE(), 'yyyy-MM') as MesAtual,
-            COUNT(CASE WHEN c.Situacao = 'Ativo' THEN 1 END) as ColaboradoresAtivos,
-            COUNT(DISTINCT comp.Serial) as EquipamentosAlocados,
-            COUNT(CASE WHEN comp.Usuario LIKE '%estoque%' THEN 1 END) as EquipamentosEstoque,
-            COUNT(CASE WHEN comp.Matricula IS NULL AND (comp.Usuario IS NULL OR comp.Usuario NOT LIKE '%estoque%') THEN 1 END) as EquipamentosSemDono
-        FROM Colaboradores c
-        FULL OUTER JOIN Computadores comp ON comp.Matricula = c.Matricula
-    """,
-    
-    'alertas_sistema': """
-        SELECT 
-            'Colaboradores Demitidos com Equipamentos' as TipoAlerta,
-            COUNT(DISTINCT c.Matricula) as Quantidade,
-            'Alto' as Prioridade
-        FROM Colaboradores c 
-        LEFT JOIN Computadores comp ON comp.Matricula = c.Matricula 
-        WHERE c.Situacao = 'Demitido' AND comp.ID IS NOT NULL
-        
-        UNION ALL
-        
-        SELECT 
-            'Equipamentos Descartados/Danificados' as TipoAlerta,
-            COUNT(*) as Quantidade,
-            'Médio' as Prioridade
-        FROM Computadores 
-        WHERE Status IN (4, 6, 8, 9)  -- Extraviado, Roubado, Descartado, Danificado
-        
-        UNION ALL
-        
-        SELECT 
-            'Colaboradores Ativos Sem Equipamento' as TipoAlerta,
-            COUNT(*) as Quantidade,
-            'Baixo' as Prioridade
-        FROM Colaboradores c
-        LEFT JOIN Computadores comp ON comp.Matricula = c.Matricula
-        WHERE c.Situacao = 'Ativo' AND comp.Matricula IS NULL
-    """,
-    
-    'equipamentos_por_status_real': """
-        SELECT 
-            c.Status as StatusNumerico,
-            CASE 
-                WHEN c.Status = 1 THEN 'Em Estoque'
-                WHEN c.Status = 2 THEN 'Acesso Remoto'
-                WHEN c.Status = 3 THEN 'Em Uso'
-                WHEN c.Status = 4 THEN 'Extraviado'
-                WHEN c.Status = 5 THEN 'Reparo'
-                WHEN c.Status = 6 THEN 'Roubado'
-                WHEN c.Status = 7 THEN 'Devolvido'
-                WHEN c.Status = 8 THEN 'Descartado'
-                WHEN c.Status = 9 THEN 'Danificado'
-                ELSE 'Status Indefinido'
-            END as Status,
-            COUNT(*) as Quantidade,
-            ROUND((COUNT(*) * 100.0) / (SELECT COUNT(*) FROM Computadores), 2) as Percentual
-        FROM Computadores c
-        WHERE c.Status IS NOT NULL
-        GROUP BY c.Status
-        ORDER BY c.Status
-    """,
-    
-    'equipamentos_detalhado_status': """
-        SELECT 
-            c.Serial,
-            c.Modelo,
-            c.Status as StatusNumerico,
-            CASE 
-                WHEN c.Status = 1 THEN 'Em Estoque'
-                WHEN c.Status = 2 THEN 'Acesso Remoto'
-                WHEN c.Status = 3 THEN 'Em Uso'
-                WHEN c.Status = 4 THEN 'Extraviado'
-                WHEN c.Status = 5 THEN 'Reparo'
-                WHEN c.Status = 6 THEN 'Roubado'
-                WHEN c.Status = 7 THEN 'Devolvido'
-                WHEN c.Status = 8 THEN 'Descartado'
-                WHEN c.Status = 9 THEN 'Danificado'
-                ELSE 'Status Indefinido'
-            END as StatusRealizado,
-            COALESCE(c.Usuario, 'Sem Usuário') as Usuario,
-            COALESCE(c.Matricula, 'Sem Matrícula') as Matricula,
-            COALESCE(col.Nome, 'Não Alocado') as NomeColaborador,
-            COALESCE(col.CCusto, 'Sem Setor') as Setor
-        FROM Computadores c
-        LEFT JOIN Colaboradores col ON col.Matricula = c.Matricula
-        WHERE c.Serial IS NOT NULL
-        ORDER BY c.Status, c.Modelo, c.Serial
-    """,
-    
-    'equipamentos_criticos_por_status': """
-        SELECT 
-            CASE 
-                WHEN c.Status = 8 THEN 'Descartado'
-                WHEN c.Status = 9 THEN 'Danificado'
-                WHEN c.Status = 4 THEN 'Extraviado'
-                WHEN c.Status = 6 THEN 'Roubado'
-                ELSE 'Outros'
-            END as StatusCritico,
-            COUNT(*) as Quantidade,
-            NULL as IdadeMedia
-        FROM Computadores c
-        WHERE c.Status IN (4, 6, 8, 9)  -- Extraviado, Roubado, Descartado, Danificado
-        GROUP BY 
-            CASE 
-                WHEN c.Status = 8 THEN 'Descartado'
-                WHEN c.Status = 9 THEN 'Danificado'
-                WHEN c.Status = 4 THEN 'Extraviado'
-                WHEN c.Status = 6 THEN 'Roubado'
-                ELSE 'Outros'
-            END
-        ORDER BY Quantidade DESC
-    """,
-    
-    'diagnostico_status_simples': """
-        SELECT 
-            Status,
-            COUNT(*) as Quantidade
-        FROM Computadores
-        GROUP BY Status
-        ORDER BY Status
-    """
-}
+            conn.exec_driver_sql(f'DROP TABLE IF EXISTS "{tabela}"')
+            conn.exec_driver_sql(f'ALTER TABLE "{nova}" RENAME TO "{tabela}"')
+            for coluna in dict.fromkeys((chave, 'Matricula', 'Usuario')):
+                if coluna in colunas:
+                    conn.exec_driver_sql(f'CREATE INDEX "ix_{tabela}_{coluna}" ON "{tabela}" ("{coluna}")')
+
+    def _save_state(self, tabela, assinatura, prefixo=None):
+        """Grava a assinatura da tabela e o prefixo (chave, linhas, checksum) lido antes da cópia"""
+        if not prefixo or prefixo[0] is None:
+            prefixo = (None, None, None)
+        with self.engine.begin() as conn:
+            conn.execute(
+                text("""
+                    INSERT OR REPLACE INTO _sync_estado
+                    VALUES (:tabela, :linhas, :chave_max, :checksum, :prefixo_chave, :prefixo_linhas, :prefixo_checksum, :em)
+                """),
+                {
+                    'tabela': tabela, 'linhas': assinatura[0], 'chave_max': assinatura[1], 'checksum': assinatura[2],
+                    'prefixo_chave': prefixo[0], 'prefixo_linhas': prefixo[1], 'prefixo_checksum': prefixo[2],
+                    'em': datetime.now().isoformat(timespec='seconds')
+                }
+            )
+
+replica = LocalReplica()
 
 # ==================== FUNÇÕES DE REDUÇÃO DE CUSTOS ====================
 def load_desligamento_data():
@@ -686,12 +446,627 @@ def create_alert_card(title, count, priority, icon):
 VALOR_FIXO_MENSAL = 102359.03
 VALOR_FIXO_ANUAL = VALOR_FIXO_MENSAL * 12
 
-# ==================== INICIALIZAÇÃO DA APP ====================
-app = dash.Dash(__name__, 
-                external_stylesheets=[dbc.themes.BOOTSTRAP],
-                suppress_callback_exceptions=True)
+# ==================== SNAPSHOT DE DADOS ====================
+SNAPSHOT_REFRESH_SECONDS = 300   # Intervalo de verificação de novos dados no servidor
+SNAPSHOT_HISTORY_SIZE = 50       # Versões mantidas para calcular o que mudou desde o último push
+SSE_STREAM_SECONDS = 55          # Duração de cada conexão SSE antes do cliente reconectar
+SSE_KEEPALIVE_SECONDS = 15
+SSE_RETRY_MS = 5000
+
+def _is_result(df):
+    """
+    Resultado lido do banco, mesmo sem linhas. Erros chegam como None ou como
+    DataFrame sem colunas (execute_remote_query); uma query que não encontrou
+    nada ainda traz as colunas.
+    """
+    return df is not None and len(df.columns) > 0
+
+def frame_hash(df):
+    """Calcula um hash do conteúdo de um DataFrame para detectar mudanças"""
+    if df is None:
+        return None
+    digest = hashlib.sha1('|'.join(map(str, df.columns)).encode('utf-8'))
+    if not df.empty:
+        digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+class SnapshotStore:
+    """
+    Guarda o último resultado de cada fonte de dados (queries e planilhas) e
+    publica uma nova versão sempre que algum resultado muda.
+    """
+
+    def __init__(self, history_size=SNAPSHOT_HISTORY_SIZE):
+        self._loaders = {}
+        self._probes = {}
+        self._frames = {}
+        self._hashes = {}
+        self._signatures = {}
+        self._history = deque(maxlen=history_size)
+        self._history_base = 0  # Versão anterior à mais antiga do histórico
+        self._cond = threading.Condition()
+        self.version = 0
+        self.published_at = None
+
+    def register_source(self, key, loader, probe=None):
+        """
+        Registra uma fonte que não é uma entrada de QUERIES. `probe` é uma função
+        barata (ex.: mtime do arquivo) usada para saber se vale a pena recarregar.
+        """
+        self._loaders[key] = loader
+        if probe is not None:
+            self._probes[key] = probe
+
+    def _signature(self, key, table_signatures):
+        """Assinatura atual das origens de uma fonte; None = desconhecida"""
+        if key in self._loaders:
+            probe = self._probes.get(key)
+            return probe() if probe else None
+        if key not in QUERIES or table_signatures is None:
+            return None
+        return tuple(table_signatures.get(tabela) for tabela in QUERIES[key].sources)
+
+    def _run(self, key):
+        loader = self._loaders.get(key)
+        if loader is not None:
+            return loader()
+        query = QUERIES[key]
+        df = execute_query(query.sql, query.params, **query.read_options)
+        return query.prepare(df) if _is_result(df) else df
+
+    def _load(self, key, signature=None):
+        """
+        Executa a fonte. Com a assinatura das origens conhecida, o resultado vai
+        para o cache compartilhado (inclusive sem linhas; erros não) e os outros
+        workers não repetem a query.
+        """
+        if signature is None:
+            return self._run(key)
+        if key in QUERIES:
+            signature = (QUERIES[key].cache_key, signature)  # SQL/parâmetros alterados não leem o resultado antigo
+        chave = f"fonte:{key}:{hashlib.sha1(repr(signature).encode('utf-8')).hexdigest()}"
+        return cache_backend.get_or_compute(
+            chave, lambda: self._run(key), expire=SOURCE_CACHE_SECONDS, store_if=_is_result
+        )
+
+    def _ensure(self, key, table_signatures=None):
+        with self._cond:
+            df = self._frames.get(key)
+        if df is None:
+            if table_signatures is None and key not in self._loaders:
+                table_signatures = probe_source_tables()
+            signature = self._signature(key, table_signatures)
+            df = self._load(key, signature)
+            # Erros não entram no snapshot para serem recarregados; resultados vazios entram
+            if not _is_result(df):
+                return df
+            with self._cond:
+                if key not in self._frames:
+                    self._frames[key] = df
+                    self._hashes[key] = frame_hash(df)
+                    self._signatures[key] = signature
+                df = self._frames[key]
+        return df
+
+    def get(self, key):
+        """Retorna o DataFrame da fonte, carregando-o na primeira vez"""
+        df = self._ensure(key)
+        return None if df is None else df.copy()
+
+    async def prefetch_async(self, keys):
+        """Carrega em paralelo (asyncio.gather sobre o pool do banco) as fontes que ainda não estão no snapshot"""
+        with self._cond:
+            faltando = [key for key in keys if key not in self._frames]
+        table_signatures = None
+        if any(key not in self._loaders for key in faltando):
+            table_signatures = await run_in_db_pool(probe_source_tables)
+        await asyncio.gather(*(run_in_db_pool(self._ensure, key, table_signatures) for key in faltando))
+
+    def prefetch(self, keys):
+        """prefetch_async para código síncrono (callbacks do Dash 2 e o publicador)"""
+        asyncio.run(self.prefetch_async(keys))
+
+    async def _load_all(self, signatures):
+        """Carrega {fonte: assinatura} em paralelo; retorna {fonte: DataFrame}"""
+        dfs = await asyncio.gather(*(run_in_db_pool(self._load, key, sig) for key, sig in signatures.items()))
+        return dict(zip(signatures, dfs))
+
+    def missing(self, keys):
+        """Fontes de `keys` que ainda não estão no snapshot (erro na última leitura)"""
+        with self._cond:
+            return [key for key in keys if key not in self._frames]
+
+    def refresh(self, keys=None):
+        """
+        Recarrega as fontes cujas tabelas de origem mudaram desde a última leitura
+        e publica uma nova versão se algum resultado mudou. Fontes com origens
+        inalteradas continuam servindo o snapshot em cache.
+        """
+        with self._cond:
+            keys = list(self._frames) if keys is None else list(keys)
+        if not keys:
+            return []
+        table_signatures = None
+        if any(key not in self._loaders for key in keys):
+            table_signatures = probe_source_tables()
+        signatures = {}
+        for key in keys:
+            signature = self._signature(key, table_signatures)
+            if signature is not None and signature == self._signatures.get(key):
+                continue
+            signatures[key] = signature
+        changed = []
+        for key, df in asyncio.run(self._load_all(signatures)).items():
+            signature = signatures[key]
+            if not _is_result(df):
+                continue  # Erro de leitura: mantém o último resultado e tenta de novo na próxima verificação
+            new_hash = frame_hash(df)
+            with self._cond:
+                self._signatures[key] = signature
+                if self._hashes.get(key) != new_hash:
+                    self._frames[key] = df
+                    self._hashes[key] = new_hash
+                    changed.append(key)
+        if changed:
+            self._publish(changed)
+        return changed
+
+    def _publish(self, changed, dados=True):
+        with self._cond:
+            # Versão baseada em tempo para ser comparável entre workers
+            self.version = max(self.version + 1, int(time.time() * 1000))
+            if dados:
+                self.published_at = datetime.now()
+            if len(self._history) == self._history.maxlen:
+                self._history_base = self._history[0][0]
+            self._history.append((self.version, frozenset(changed)))
+            self._cond.notify_all()
+
+    def announce(self, keys):
+        """Publica uma versão sem dados novos (ex.: mudança no estado do banco)"""
+        self._publish(keys, dados=False)
+
+    def changes_since(self, version):
+        """Retorna (versão atual, chaves alteradas); None significa 'tudo mudou'"""
+        with self._cond:
+            if version >= self.version:
+                return self.version, []
+            if version < self._history_base:
+                return self.version, None
+            changed = set()
+            for v, keys in self._history:
+                if v > version:
+                    changed |= keys
+            return self.version, sorted(changed)
+
+    def wait_for_change(self, version, timeout):
+        """Bloqueia até existir uma versão mais nova que `version` ou o timeout"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version > version, timeout=timeout)
+        return self.changes_since(version)
+
+snapshot = SnapshotStore()
+
+# Chave publicada no push quando o circuito do banco abre/fecha (atualiza o aviso)
+DB_STATUS_KEY = 'banco'
+breaker.listeners.append(lambda estado: snapshot.announce([DB_STATUS_KEY]))
+snapshot.register_source(
+    'desligamento', load_desligamento_data,
+    probe=lambda: os.path.getmtime('desligamento.xlsx') if os.path.exists('desligamento.xlsx') else None
+)
+
+_publisher_lock = threading.Lock()
+_publisher_thread = None
+
+def _snapshot_publisher_loop():
+    if not warm_status['warm']:
+        warm_up()
+    while True:
+        try:
+            if USE_LOCAL_REPLICA:
+                replica.sync()
+            changed = snapshot.refresh()
+            if changed:
+                print(f"Snapshot v{snapshot.version} publicado: {', '.join(changed)}")
+            snapshot.prefetch(WARM_SOURCES)  # Tenta de novo as fontes que falharam (libera o /api/ready)
+            record_kpi_history()
+        except Exception as e:
+            print(f"Erro ao atualizar snapshot: {e}")
+        time.sleep(SNAPSHOT_REFRESH_SECONDS)
+
+def start_snapshot_publisher():
+    """Inicia (uma vez por processo) a thread que verifica novos dados"""
+    global _publisher_thread
+    if _background_job:
+        return
+    with _publisher_lock:
+        if _publisher_thread is None or not _publisher_thread.is_alive():
+            _publisher_thread = threading.Thread(
+                target=_snapshot_publisher_loop, name='snapshot-publisher', daemon=True
+            )
+            _publisher_thread.start()
+
+def skip_unless_changed(*keys):
+    """
+    Chamado no início dos callbacks de dados. Em um push do servidor, cancela o
+    callback (PreventUpdate) se nenhuma das fontes dele mudou; no botão
+    "Atualizar Dados", força a releitura das fontes.
+    """
+    ctx = dash.callback_context
+    trigger = ctx.triggered_id if ctx.triggered else None
+    if trigger == 'snapshot-version':
+        changed = (ctx.triggered[0]['value'] or {}).get('changed')
+        if changed is not None and not set(keys) & set(changed):
+            raise PreventUpdate
+        # O push pode ter sido publicado por outro worker, e este ainda não
+        # verificou os dados: confere as assinaturas antes de responder. O que
+        # mudou é lido do cache compartilhado, sem repetir a query.
+        snapshot.refresh(keys if changed is None else set(keys) & set(changed))
+    elif isinstance(trigger, str) and trigger.startswith('refresh-btn'):
+        if USE_LOCAL_REPLICA:
+            replica.sync()
+        snapshot.refresh(keys)
+
+_background_job = False
+
+def start_background_job():
+    """
+    Chamado no início dos background callbacks, que rodam em um processo filho
+    do worker: não inicia o publicador do snapshot nesse processo e descarta as
+    conexões, threads e locks herdados do pai. A sonda do circuito fica com os
+    workers (init_worker): um job de vida curta não a inicia.
+    """
+    global _background_job
+    _background_job = True
+    reset_after_fork(start_probe=False)
+
+def reset_after_fork(start_probe=True):
+    """Descarta threads, locks e conexões herdados do processo pai após um fork"""
+    reset_db_pool(start_probe)
+    cache_backend.reset()
+    snapshot._cond = threading.Condition()
+    for engine in (replica._engine, kpi_history._engine):
+        if engine is not None:
+            engine.dispose(close=False)
+
+def snapshot_df(key):
+    """Lê uma fonte do snapshot (cópia, pode ser alterada pelo callback)"""
+    start_snapshot_publisher()
+    return snapshot.get(key)
+
+def snapshot_time():
+    """Horário da última publicação do snapshot (ou agora, se ainda não houve)"""
+    return (snapshot.published_at or datetime.now()).strftime('%H:%M:%S - %d/%m/%Y')
+
+# ==================== TEMA DOS GRÁFICOS ====================
+# Estilo comum de todos os gráficos do portal; os callbacks só definem o que é
+# específico de cada figura. Substitui o template padrão do Plotly, que é
+# bem maior e ia junto no JSON de cada figura.
+EIXO_PORTAL = dict(
+    linecolor='#e9ecef',
+    gridcolor='rgba(233,236,239,0.5)',
+    zerolinecolor='#e9ecef',
+    automargin=True,
+    title=dict(font=dict(size=14))
+)
+
+pio.templates['portal'] = go.layout.Template(layout=dict(
+    font=dict(color='#1e1e1e', size=12, family='Inter'),
+    title=dict(font=dict(size=18, color='#1e1e1e', family='Inter'), x=0.5, y=0.95),
+    plot_bgcolor='rgba(0,0,0,0)',
+    paper_bgcolor='rgba(0,0,0,0)',
+    colorway=['#6366f1', '#8b5cf6', '#ec4899', '#ef4444', '#f97316', '#eab308', '#22c55e', '#06b6d4'],
+    height=400,
+    xaxis=EIXO_PORTAL,
+    yaxis=EIXO_PORTAL,
+    hoverlabel=dict(font=dict(family='Inter'))
+))
+
+# Variante de fundo branco usada nos gráficos da aba Redução de Custos
+pio.templates['portal_claro'] = go.layout.Template(pio.templates['portal'])
+pio.templates['portal_claro'].layout.update(
+    plot_bgcolor='white',
+    paper_bgcolor='white',
+    xaxis=dict(gridcolor='#f0f0f0'),
+    yaxis=dict(gridcolor='#f0f0f0')
+)
+pio.templates.default = 'portal'
+
+def empty_figure(texto="Sem dados disponíveis"):
+    """Figura vazia com a mensagem centralizada"""
+    return go.Figure().add_annotation(
+        text=texto,
+        showarrow=False,
+        font=dict(size=16, color='#6c757d')
+    )
+
+def donut_legend_layout(texto_centro, font_size=14):
+    """Layout dos gráficos de rosca: legenda vertical à direita e texto no centro"""
+    return dict(
+        showlegend=True,
+        legend=dict(
+            orientation="v",
+            yanchor="middle",
+            y=0.5,
+            xanchor="left",
+            x=1.05,
+            font=dict(size=10)
+        ),
+        margin=dict(t=60, b=40, l=40, r=150),
+        annotations=[
+            dict(
+                text=texto_centro,
+                x=0.5, y=0.5,
+                font_size=font_size,
+                font_color='#6c757d',
+                showarrow=False
+            )
+        ]
+    )
+
+# ==================== CACHE DE FIGURAS ====================
+FIGURE_CACHE_SIZE = 128  # Figuras mantidas em memória por processo
+
+class FigureCache:
+    """
+    Cache LRU de figuras já serializadas. A chave é o builder, o hash dos
+    DataFrames de entrada e os parâmetros; com os mesmos dados a figura não é
+    reconstruída nem validada de novo pelo Plotly. É o primeiro nível, em
+    memória; o segundo é o cache_backend, compartilhado entre os workers.
+    """
+
+    def __init__(self, maxsize=FIGURE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, builder, frames, params):
+        key = (
+            builder.__qualname__,
+            tuple(frame_hash(df) for df in frames),
+            json.dumps(params, sort_keys=True, default=str)
+        )
+        with self._lock:
+            figura = self._figures.get(key)
+            if figura is not None:
+                self._figures.move_to_end(key)
+                return figura
+        # JSON puro: o Dash só precisa reenviá-lo, sem validar o go.Figure.
+        # Figuras já montadas por outro worker vêm do cache compartilhado.
+        figura = cache_backend.get_or_compute(
+            f"figura:{hashlib.sha1(repr(key).encode('utf-8')).hexdigest()}",
+            lambda: json.loads(builder(*frames, **params).to_json()),
+            expire=SOURCE_CACHE_SECONDS
+        )
+        with self._lock:
+            self._figures[key] = figura
+            while len(self._figures) > self.maxsize:
+                self._figures.popitem(last=False)
+        return figura
+
+figure_cache = FigureCache()
+
+def cached_figure(builder):
+    """Memoiza um builder de figura `builder(df, ..., **params)` pelo conteúdo dos dados"""
+    @functools.wraps(builder)
+    def wrapper(*frames, **params):
+        return figure_cache.get_or_build(builder, frames, params)
+    return wrapper
+
+# ==================== HISTÓRICO DE KPIs ====================
+KPI_HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'historico', 'kpis.db')
+KPI_TREND_DAYS = 30  # Dias exibidos nas tendências dos cards de KPI
+
+class KpiHistory:
+    """
+    Série temporal diária dos KPIs (SQLite). Guarda um valor por KPI por dia
+    (o último calculado no dia) com chave (Kpi, Data), o que torna a gravação
+    e a leitura de um intervalo de datas baratas.
+    """
 
-app.index_string = '''
+    def __init__(self, path=KPI_HISTORY_PATH):
+        self.path = path
+        self._engine = None
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            engine = create_engine(f"sqlite:///{self.path}", connect_args={'timeout': 30, 'check_same_thread': False})
+            with engine.begin() as conn:
+                conn.exec_driver_sql("""
+                    CREATE TABLE IF NOT EXISTS kpi_historico (
+                        Kpi TEXT NOT NULL,
+                        Data TEXT NOT NULL,
+                        Valor REAL,
+                        PRIMARY KEY (Kpi, Data)
+                    ) WITHOUT ROWID
+                """)
+            self._engine = engine
+        return self._engine
+
+    def record(self, valores, dia=None):
+        """Grava (ou substitui) o valor do dia de cada KPI"""
+        dia = (dia or datetime.now()).strftime('%Y-%m-%d')
+        linhas = [
+            {'kpi': kpi, 'data': dia, 'valor': None if pd.isna(valor) else float(valor)}
+            for kpi, valor in valores.items()
+        ]
+        with self.engine.begin() as conn:
+            conn.execute(text("INSERT OR REPLACE INTO kpi_historico VALUES (:kpi, :data, :valor)"), linhas)
+
+    def series(self, kpis, dias=KPI_TREND_DAYS):
+        """Retorna {kpi: DataFrame(Data, Valor)} dos últimos `dias` dias"""
+        inicio = (datetime.now() - timedelta(days=dias)).strftime('%Y-%m-%d')
+        parametros = {f'k{i}': kpi for i, kpi in enumerate(kpis)}
+        filtro = ', '.join(f':{nome}' for nome in parametros)
+        try:
+            df = _read_sql(
+                self.engine,
+                f"SELECT Kpi, Data, Valor FROM kpi_historico WHERE Kpi IN ({filtro}) AND Data >= :inicio ORDER BY Kpi, Data",
+                params={**parametros, 'inicio': inicio}
+            )
+        except Exception as e:
+            print(f"Erro ao ler histórico de KPIs: {e}")
+            return {}
+        df['Data'] = pd.to_datetime(df['Data'])
+        return {kpi: grupo[['Data', 'Valor']] for kpi, grupo in df.groupby('Kpi')}
+
+kpi_history = KpiHistory()
+
+# Fontes do snapshot usadas pelos cards de KPI
+KPI_SOURCES = (
+    'total_computadores', 'kpi_terceirizados_inativos', 'kpi_terceirizados_ativos',
+    'kpi_colaboradores_demitidos', 'kpi_colaboradores_aviso_previo',
+    'kpi_demitidos_com_equipamentos',
+    'kpi_colaboradores_ativos_com_equipamentos', 'kpi_equipamentos_sem_dono',
+    'kpi_colaboradores_ativos_sem_computador', 'total_equipamentos_estoque',
+    'kpi_equipamentos_alocados', 'computadores_por_modelo', 'colaboradores_aviso_previo'
+)
+
+def _kpi_scalar(key, coluna):
+    """Primeiro valor de uma query de KPI do snapshot (0 se vazia)"""
+    df = snapshot_df(key)
+    if df.empty:
+        return 0
+    valor = df[coluna].tolist()[0]  # int/float do Python, não o escalar Int32 da coluna
+    return 0 if pd.isna(valor) else valor
+
+def compute_kpi_values():
+    """Valores numéricos dos cards de KPI, calculados a partir do snapshot"""
+    snapshot.prefetch(KPI_SOURCES)
+    valores = {
+        'total_computadores': _kpi_scalar('total_computadores', 'total_computadores'),
+        'terceirizados_inativos': _kpi_scalar('kpi_terceirizados_inativos', 'total'),
+        'terceirizados_ativos': _kpi_scalar('kpi_terceirizados_ativos', 'total'),
+        'colaboradores_demitidos': _kpi_scalar('kpi_colaboradores_demitidos', 'total'),
+        'colaboradores_aviso_previo': _kpi_scalar('kpi_colaboradores_aviso_previo', 'total'),
+        'demitidos_com_equipamentos': _kpi_scalar('kpi_demitidos_com_equipamentos', 'total_demitidos_com_equipamentos'),
+        'colaboradores_ativos_equipamentos': _kpi_scalar('kpi_colaboradores_ativos_com_equipamentos', 'total_colaboradores_ativos_com_equipamentos'),
+        'equipamentos_criticos': _kpi_scalar('kpi_equipamentos_sem_dono', 'total_equipamentos_descartados'),
+        'colaboradores_ativos_sem_pc': _kpi_scalar('kpi_colaboradores_ativos_sem_computador', 'total_colaboradores_ativos_sem_computador'),
+        'total_estoque': _kpi_scalar('total_equipamentos_estoque', 'TotalEmEstoque'),
+        'equipamentos_alocados': _kpi_scalar('kpi_equipamentos_alocados', 'total_equipamentos_alocados'),
+        'equipamentos_alugados': catalogo.total_alugados(snapshot_df('computadores_por_modelo'))
+    }
+    total_computadores_calc = valores['equipamentos_alocados'] + valores['total_estoque']
+    valores['taxa_alocacao'] = round((valores['equipamentos_alocados'] / total_computadores_calc) * 100, 1) if total_computadores_calc > 0 else 0
+    return valores
+
+# Regras da central de alertas, avaliadas sobre as fontes dos KPIs (nenhuma
+# query própria): (título, fonte, coluna, mínimo para alertar, prioridade, ícone)
+ALERT_RULES = (
+    ('Colaboradores Demitidos com Equipamentos', 'kpi_demitidos_com_equipamentos',
+     'total_demitidos_com_equipamentos', 1, 'Alto', 'fas fa-exclamation-triangle'),
+    ('Equipamentos Descartados/Danificados', 'kpi_equipamentos_sem_dono',
+     'total_equipamentos_descartados', 1, 'Médio', 'fas fa-desktop'),
+    ('Colaboradores Ativos Sem Equipamento', 'kpi_colaboradores_ativos_sem_computador',
+     'total_colaboradores_ativos_sem_computador', 1, 'Baixo', 'fas fa-user-slash')
+)
+ALERT_SOURCES = tuple(fonte for _, fonte, _, _, _, _ in ALERT_RULES)
+
+def compute_alerts():
+    """Alertas ativos: (título, quantidade, prioridade, ícone) das regras que atingiram o mínimo"""
+    snapshot.prefetch(ALERT_SOURCES)
+    alertas = []
+    for titulo, fonte, coluna, minimo, prioridade, icone in ALERT_RULES:
+        quantidade = _kpi_scalar(fonte, coluna)
+        if quantidade >= minimo:
+            alertas.append((titulo, quantidade, prioridade, icone))
+    return alertas
+
+def record_kpi_history():
+    """Grava os KPIs atuais no histórico do dia (não grava zeros se o banco estiver fora)"""
+    if snapshot_df('total_computadores').empty:
+        return
+    kpi_history.record(compute_kpi_values())
+
+# ==================== AQUECIMENTO (GUNICORN) ====================
+# Fontes lidas pelas páginas; carregadas antes do primeiro request
+WARM_SOURCES = KPI_SOURCES + (
+    'colaboradores_demitidos_com_equipamentos', 'colaboradores_detalhado', 'colaboradores_por_chefia',
+    'computadores_por_modelo', 'custos_por_setor', 'desligamento', 'equipamentos_criticidade',
+    'equipamentos_detalhado', 'equipamentos_detalhado_status',
+    'equipamentos_por_status', 'equipamentos_por_status_real', 'kpi_colaboradores_ativos',
+    'modelos_em_estoque', 'ocupacao_por_setor', 'terceirizados_inativos_com_equipamentos',
+    'usuarios_por_setor'
+)
+
+warm_status = {'warm': False, 'pid': None, 'finished_at': None, 'seconds': None, 'missing': []}
+_warm_lock = threading.Lock()
+
+def warm_up():
+    """
+    Sincroniza a réplica e carrega todas as fontes das páginas no snapshot.
+    Com `preload_app` (gunicorn.conf.py) roda uma vez no master e os workers
+    herdam o snapshot pronto via fork; sem preload, roda no início do
+    publicador de cada worker.
+    """
+    with _warm_lock:
+        if warm_status['warm']:
+            return
+        inicio = time.monotonic()
+        try:
+            if USE_LOCAL_REPLICA:
+                replica.sync()
+            snapshot.prefetch(WARM_SOURCES)
+        except Exception as e:
+            print(f"Erro no aquecimento: {e}")
+        warm_status.update(
+            warm=True,
+            pid=os.getpid(),
+            finished_at=datetime.now().isoformat(timespec='seconds'),
+            seconds=round(time.monotonic() - inicio, 2),
+            missing=snapshot.missing(WARM_SOURCES)
+        )
+        print(f"Aquecimento concluído em {warm_status['seconds']}s (pid {warm_status['pid']})")
+
+def init_worker():
+    """
+    Chamado pelo gunicorn em cada worker logo após o fork: recria o pool de
+    threads e as conexões do processo e inicia o publicador do snapshot.
+    """
+    reset_after_fork()
+    start_snapshot_publisher()
+
+def readiness():
+    """
+    Estado do aquecimento do worker; 503 até o aquecimento terminar e todas as
+    fontes de WARM_SOURCES estarem no snapshot (`missing` lista as que faltam)
+    """
+    corpo = dict(warm_status, worker=os.getpid(), snapshot_version=snapshot.version, banco=breaker.status())
+    corpo['missing'] = snapshot.missing(WARM_SOURCES)
+    pronto = warm_status['warm'] and not corpo['missing']
+    return jsonify(corpo), (200 if pronto else 503)
+
+# ==================== INICIALIZAÇÃO DA APP ====================
+# Jobs dos background callbacks (tabelas pesadas) ficam em disco, fora do worker HTTP
+BACKGROUND_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'jobs')
+
+# Bootstrap, Font Awesome e Inter servidos localmente (static/vendor), sem depender de CDN
+VENDOR_STYLESHEETS = [
+    'static/vendor/bootstrap-5.3.8/bootstrap.min.css',
+    'static/vendor/fontawesome-6.0.0/css/all.min.css',
+    'static/vendor/inter-3.19/inter.css'
+]
+STATIC_CACHE_SECONDS = 365 * 24 * 3600  # Arquivos versionados na URL podem ficar em cache por 1 ano
+
+def cache_static_files(response):
+    """
+    Cache longo para assets com versão na URL: os do Dash levam `?m=<mtime>` e
+    os de static/vendor ficam em pastas com a versão no nome.
+    """
+    if response.status_code == 200 and (
+        (request.path.startswith('/assets/') and request.args.get('m'))
+        or request.path.startswith('/static/vendor/')
+    ):
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_CACHE_SECONDS
+        response.cache_control.immutable = True
+        response.cache_control.no_cache = None
+    return response
+
+INDEX_STRING = '''
 <!DOCTYPE html>
 <html>
     <head>
@@ -699,368 +1074,6 @@ app.index_string = '''
         <title>{%title%}</title>
         {%favicon%}
         {%css%}
-        <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">
-        <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap" rel="stylesheet">
-        <style>
-            * {
-              margin: 0;
-              padding: 0;
-              box-sizing: border-box;
-            }
-            
-            body {
-              font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;
-              background: #f8f9fa;
-              color: #1e1e1e;
-              line-height: 1.6;
-              overflow-x: hidden;
-              font-weight: 400;
-            }
-            
-            .dashboard-container {
-              display: flex;
-              min-height: 100vh;
-            }
-            
-            .sidebar {
-              width: 260px;
-              background: linear-gradient(180deg, #1e1e1e 0%, #0f0f0f 100%);
-              color: white;
-              position: fixed;
-              height: 100vh;
-              left: 0;
-              top: 0;
-              z-index: 1000;
-              box-shadow: 4px 0 20px rgba(0,0,0,0.2);
-              border-right: 2px solid #333;
-            }
-            
-            .sidebar-header {
-              padding: 2.5rem 1.5rem 1.5rem 1.5rem;
-              border-bottom: 2px solid #333;
-              text-align: center;
-              background: linear-gradient(135deg, #ff6b6b 0%, #4ecdc4 100%);
-              -webkit-background-clip: text;
-              background-clip: text;
-            }
-            
-            .sidebar-header h1 {
-              font-size: 1.75rem;
-              font-weight: 900;
-              margin-bottom: 0.5rem;
-              color: white;
-              text-shadow: 0 2px 4px rgba(0,0,0,0.3);
-              letter-spacing: -0.5px;
-            }
-            
-            .sidebar-header p {
-              color: #ccc;
-              font-size: 0.9rem;
-              font-weight: 400;
-            }
-            
-            .sidebar-nav {
-              padding: 2rem 0;
-            }
-            
-            .nav-item {
-              display: flex;
-              align-items: center;
-              padding: 1.25rem 1.5rem;
-              color: #bbb;
-              transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-              border-left: 4px solid transparent;
-              cursor: pointer;
-              position: relative;
-            }
-            
-            .nav-item:hover, .nav-item.active {
-              background: linear-gradient(90deg, rgba(255,255,255,0.1) 0%, transparent 100%);
-              color: white;
-              border-left-color: #FFFFFF;
-              transform: translateX(5px);
-            }
-            
-            .nav-item:hover {
-              cursor: pointer;
-            }
-            
-            .nav-item i {
-              margin-right: 1rem;
-              width: 20px;
-              text-align: center;
-              font-size: 1.1rem;
-            }
-            
-            #nav-reducao-custos.active {
-              color: white !important;
-            }
-            
-            .alert-card {
-              background: white;
-              border-radius: 8px;
-              padding: 1rem;
-              margin: 0.5rem;
-              box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-              border: 1px solid #e9ecef;
-              transition: transform 0.2s;
-            }
-            
-            .alert-card:hover {
-              transform: translateY(-2px);
-              box-shadow: 0 4px 12px rgba(0,0,0,0.15);
-            }
-            
-            .alert-inner {
-              display: flex;
-              align-items: center;
-            }
-            
-            .alert-icon {
-              font-size: 2rem;
-              margin-right: 1rem;
-              color: #6c757d;
-            }
-            
-            .alert-count {
-              font-size: 1.5rem;
-              font-weight: 700;
-              margin: 0;
-              color: #1e1e1e;
-            }
-            
-            .alert-title {
-              font-size: 0.9rem;
-              margin: 0;
-              color: #6c757d;
-            }
-            
-            .alert-priority {
-              font-size: 0.8rem;
-              padding: 0.2rem 0.5rem;
-              border-radius: 4px;
-              background: #f8f9fa;
-              color: #495057;
-            }
-            
-            .alerts-grid {
-              display: grid;
-              grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
-              gap: 1rem;
-              margin: 2rem 0;
-            }
-            
-            .main-content {
-              margin-left: 260px;
-              padding: 2.5rem;
-              width: calc(100% - 260px);
-              min-height: 100vh;
-              background: #f8f9fa;
-            }
-            
-            .kpi-grid {
-              display: grid !important;
-              grid-template-columns: repeat(auto-fit, minmax(280px, 1fr)) !important;
-              gap: 2rem !important;
-              margin-bottom: 3rem !important;
-              width: 100% !important;
-              padding: 0 1rem !important;
-            }
-            
-            .kpi-card {
-              background: white;
-              border-radius: 12px;
-              padding: 2rem;
-              box-shadow: 0 8px 25px rgba(0,0,0,0.08);
-              border: 1px solid #e9ecef;
-              background: linear-gradient(145deg, #ffffff 0%, #f8f9fa 100%);
-              position: relative;
-              transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-              overflow: hidden;
-            }
-            
-            .kpi-card::before {
-              content: '';
-              position: absolute;
-              top: 0;
-              left: 0;
-              right: 0;
-              height: 4px;
-              background: linear-gradient(90deg, #000000 0%, #333333 25%, #666666 50%, #999999 75%, #cccccc 100%);
-              z-index: 1;
-            }
-            
-            .kpi-card:hover {
-              transform: translateY(-3px);
-              box-shadow: 0 15px 40px rgba(0,0,0,0.15);
-            }
-            
-            .kpi-card::after {
-              content: '';
-              position: absolute;
-              top: -50%;
-              right: -50%;
-              width: 100px;
-              height: 100px;
-              background: linear-gradient(45deg, rgba(255,107,107,0.1) 0%, rgba(78,205,196,0.1) 100%);
-              border-radius: 50%;
-              z-index: 0;
-            }
-            
-            .kpi-value {
-              font-size: 2.4rem;
-              font-weight: 600;
-              color: #1e1e1e;
-              margin-bottom: 0.5rem;
-              position: relative;
-              z-index: 2;
-              letter-spacing: -0.5px;
-              line-height: 1.1;
-              font-family: 'Inter', sans-serif;
-            }
-            
-            .kpi-label {
-              color: #6c757d;
-              font-size: 0.9rem;
-              font-weight: 500;
-              position: relative;
-              z-index: 2;
-              text-transform: none;
-              letter-spacing: 0.2px;
-              line-height: 1.3;
-              font-family: 'Inter', sans-serif;
-            }
-            
-            .chart-card {
-              background: white;
-              border-radius: 16px;
-              padding: 2.5rem;
-              box-shadow: 0 8px 25px rgba(0,0,0,0.08);
-              border: 1px solid #e9ecef;
-              margin-bottom: 2.5rem;
-              transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-            }
-            
-            .chart-card:hover {
-              box-shadow: 0 12px 35px rgba(0,0,0,0.12);
-            }
-            
-            .chart-card-black {
-              background: linear-gradient(145deg, #1e1e1e 0%, #0f0f0f 100%);
-              border-radius: 16px;
-              padding: 2.5rem;
-              box-shadow: 0 8px 25px rgba(0,0,0,0.3);
-              border: 1px solid #333;
-              margin-bottom: 2.5rem;
-              transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-              color: white;
-            }
-            
-            .chart-card-black:hover {
-              box-shadow: 0 12px 35px rgba(0,0,0,0.5);
-              transform: translateY(-2px);
-            }
-            
-            .chart-card-black h4,
-            .chart-card-black h5 {
-              color: white !important;
-            }
-            
-            .chart-card-black .plotly {
-              background: transparent !important;
-            }
-            
-            .status-card-white {
-              background: white !important;
-              border: 2px solid #000000 !important;
-              border-radius: 8px !important;
-              box-shadow: 0 2px 8px rgba(0,0,0,0.1) !important;
-            }
-            
-            .header {
-              background: white;
-              border-radius: 16px;
-              padding: 2rem 2.5rem;
-              margin-bottom: 2.5rem;
-              box-shadow: 0 8px 25px rgba(0,0,0,0.08);
-              border: 1px solid #e9ecef;
-              position: relative;
-              overflow: hidden;
-            }
-            
-            .header::before {
-              content: '';
-              position: absolute;
-              top: 0;
-              left: 0;
-              right: 0;
-              bottom: 0;
-              background: linear-gradient(135deg, rgba(255,107,107,0.02) 0%, rgba(78,205,196,0.02) 100%);
-              z-index: 0;
-            }
-            
-            .header-content {
-              display: flex;
-              justify-content: space-between;
-              align-items: center;
-              position: relative;
-              z-index: 1;
-            }
-            
-            .header-title h1 {
-              font-size: 2.25rem;
-              font-weight: 900;
-              color: #1e1e1e;
-              margin-bottom: 0.5rem;
-              letter-spacing: -0.5px;
-            }
-            
-            .header-title p {
-              color: #6c757d;
-              font-size: 1.1rem;
-              font-weight: 500;
-            }
-            
-            .header-actions {
-              display: flex;
-              gap: 1.5rem;
-              align-items: center;
-            }
-            
-            .time-badge {
-              background: linear-gradient(135deg, #1e1e1e 0%, #333 100%);
-              color: white;
-              padding: 0.75rem 1.5rem;
-              border-radius: 8px;
-              font-weight: 600;
-              font-size: 0.9rem;
-              box-shadow: 0 4px 15px rgba(0,0,0,0.2);
-              letter-spacing: 0.5px;
-            }
-            
-            .refresh-btn {
-              background: linear-gradient(135deg, #6c757d 0%, #495057 100%);
-              color: white;
-              border: none;
-              padding: 0.75rem 1.5rem;
-              border-radius: 8px;
-              cursor: pointer;
-              transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-              font-weight: 600;
-              box-shadow: 0 4px 15px rgba(0,0,0,0.2);
-              letter-spacing: 0.5px;
-            }
-            
-            .refresh-btn:hover {
-              background: linear-gradient(135deg, #1e1e1e 0%, #000 100%);
-              transform: translateY(-2px);
-              box-shadow: 0 8px 25px rgba(0,0,0,0.3);
-            }
-            
-            .refresh-btn i {
-              margin-right: 0.5rem;
-            }
-        </style>
     </head>
     <body>
         {%app_entry%}
@@ -1114,7 +1127,68 @@ def create_sidebar():
         ], className="sidebar-nav", id="sidebar-nav-container")
     ], className="sidebar")
 
-def create_kpi_card(title, value, icon_class, subtitle=None):
+def create_db_status_banner():
+    """Aviso exibido enquanto o SQL Server estiver fora (circuito aberto); None caso contrário"""
+    if not breaker.is_open:
+        return None
+    ultimo = breaker.last_success_at or snapshot.published_at
+    dados = f"dados de {ultimo.strftime('%H:%M - %d/%m/%Y')}" if ultimo else "a última cópia local"
+    return html.Div([
+        html.I(className="fas fa-exclamation-triangle"),
+        html.Span(
+            f"SQL Server indisponível desde {breaker.opened_at.strftime('%H:%M')}. "
+            f"Exibindo {dados}; a conexão é testada novamente a cada {breaker.retry_seconds}s."
+        )
+    ], className="db-status-banner")
+
+def create_data_table(df, columns, variant=None, highlights=(), **options):
+    """
+    DataTable no estilo padrão do portal. Cabeçalho, células e seleção vêm de
+    assets/tables.css; o callback só envia os dados, as colunas (nome, id), a
+    variante ('danger', 'compact') e os destaques por filtro. Tabelas com
+    `page_size` ganham filtro, ordenação e paginação nativos.
+    """
+    if 'page_size' in options:
+        options = dict(filter_action="native", sort_action="native", page_action="native", page_current=0, **options)
+    return html.Div(
+        dash_table.DataTable(
+            data=df.to_dict('records'),
+            columns=[{"name": nome, "id": coluna} for nome, coluna in columns],
+            style_data_conditional=[{'if': {'row_index': 'odd'}, 'backgroundColor': '#f8f9fa'}] + [
+                {'if': {'filter_query': filtro}, **estilo} for filtro, estilo in highlights
+            ],
+            **options
+        ),
+        className='portal-table' + (f' portal-table--{variant}' if variant else '')
+    )
+
+def create_table_progress(table_id):
+    """Barra de progresso exibida enquanto o background callback da tabela roda"""
+    return dbc.Progress(id=f'{table_id}-progress', value=0, striped=True, animated=True, style={'display': 'none'})
+
+def create_sparkline(serie):
+    """Mini gráfico de tendência para os cards de KPI (None se houver menos de 2 dias)"""
+    if serie is None or len(serie) < 2:
+        return None
+    fig = go.Figure(go.Scatter(
+        x=serie['Data'], y=serie['Valor'],
+        mode='lines',
+        line=dict(color='#00d4aa', width=2),
+        fill='tozeroy',
+        fillcolor='rgba(0, 212, 170, 0.1)',
+        hovertemplate='%{x|%d/%m}: %{y}<extra></extra>'
+    ))
+    fig.update_layout(
+        margin=dict(t=0, b=0, l=0, r=0),
+        height=40,
+        showlegend=False,
+        xaxis=dict(visible=False),
+        yaxis=dict(visible=False)
+    )
+    return dcc.Graph(figure=fig, config={'displayModeBar': False}, style={'height': '40px', 'marginTop': '0.5rem'})
+
+def create_kpi_card(title, value, icon_class, subtitle=None, trend=None):
+    sparkline = create_sparkline(trend)
     return html.Div([
         html.Div([
             html.Div([
@@ -1132,7 +1206,8 @@ def create_kpi_card(title, value, icon_class, subtitle=None):
             'font-size': '0.85rem', 
             'margin-top': '0.75rem',
             'font-weight': '500'
-        })
+        }),
+        sparkline
     ], className="kpi-card")
 
 def create_colaboradores_content():
@@ -1178,13 +1253,7 @@ def create_colaboradores_content():
                     'borderRadius': '8px'
                 })
             ], className="chart-card")
-        ]),
-        
-        dcc.Interval(
-            id='interval-colaboradores',
-            interval=300*1000,
-            n_intervals=0
-        )
+        ])
     ])
 
 def create_equipamentos_content():
@@ -1244,6 +1313,7 @@ def create_equipamentos_content():
                     'fontWeight': '600',
                     'fontSize': '1.1rem'
                 }),
+                create_table_progress("equipamentos-criticos-table"),
                 html.Div(id="equipamentos-criticos-table", style={
                     'maxHeight': '400px', 
                     'overflowY': 'auto',
@@ -1297,6 +1367,7 @@ def create_equipamentos_content():
                     'fontWeight': '600',
                     'fontSize': '1.1rem'
                 }),
+                create_table_progress("equipamentos-status-table"),
                 html.Div(id="equipamentos-status-table", style={
                     'maxHeight': '600px', 
                     'overflowY': 'auto',
@@ -1314,6 +1385,7 @@ def create_equipamentos_content():
                     'fontWeight': '600',
                     'fontSize': '1.1rem'
                 }),
+                create_table_progress("equipamentos-detalhado-table"),
                 html.Div(id="equipamentos-detalhado-table", style={
                     'maxHeight': '600px', 
                     'overflowY': 'auto',
@@ -1321,13 +1393,7 @@ def create_equipamentos_content():
                     'borderRadius': '8px'
                 })
             ], className="chart-card")
-        ]),
-        
-        dcc.Interval(
-            id='interval-equipamentos',
-            interval=300*1000,
-            n_intervals=0
-        )
+        ])
     ])
 
 def create_config_content():
@@ -1366,7 +1432,7 @@ def create_config_content():
                 }),
                 html.P("Versão: 2.0", style={'marginBottom': '0.5rem'}),
                 html.P("Última atualização: Setembro 2025", style={'marginBottom': '0.5rem'}),
-                html.P("Atualização automática: 5 minutos", style={'marginBottom': '1rem'}),
+                html.P("Atualização automática: push a cada nova versão dos dados (verificação a cada 5 minutos)", style={'marginBottom': '1rem'}),
                 html.Div([
                     html.P("Powered by Wood", style={
                         'marginBottom': '0.5rem',
@@ -1439,19 +1505,13 @@ def create_linhas_moveis_content():
                     { telefone: '22-99256-3638', uso: 0.0, sessoes: 0, usuario: 'SEM CONSUMO RELEVANTE' }
                 ];
             """)
-        ]),
-        
-        dcc.Interval(
-            id='interval-linhas',
-            interval=300*1000,
-            n_intervals=0
-        )
+        ])
     ])
 
 def create_reducao_custos_content():
     """Cria conteúdo da aba de Redução de Custos"""
     # Carrega dados de desligamento
-    df = load_desligamento_data()
+    df = snapshot_df('desligamento')
     
     if df is None:
         return html.Div([
@@ -1560,14 +1620,7 @@ def create_reducao_custos_content():
         ], className="chart-card"),
         
         # Store para dados
-        dcc.Store(id='reducao-data-store', data=df.to_dict('records')),
-        
-        # Interval para atualização automática
-        dcc.Interval(
-            id='interval-reducao-custos',
-            interval=300*1000,
-            n_intervals=0
-        )
+        dcc.Store(id='reducao-data-store', data=df.to_dict('records'))
     ])
 
 def create_dashboard_content():
@@ -1653,23 +1706,136 @@ def create_dashboard_content():
                 }),
                 html.Div(id="demitidos-equipamentos-table")
             ], className="chart-card", style={'width': '48%', 'display': 'inline-block', 'marginLeft': '2%'})
-        ]),
-        
-        dcc.Interval(
-            id='interval-component',
-            interval=300*1000,  
-            n_intervals=0
-        )
+        ])
     ])
 
-app.layout = html.Div([
-    create_sidebar(),
-    html.Div([
-        html.Div(id="page-content")
-    ], className="main-content")
-], className="dashboard-container")
+def create_app_layout():
+    return html.Div([
+        create_sidebar(),
+        html.Div([
+            html.Div(id="db-status-banner"),
+            html.Div(id="page-content")
+        ], className="main-content"),
+        
+        # Versão do snapshot recebida via push (assets/snapshot_push.js)
+        dcc.Store(id='snapshot-version'),
+        html.Button(id='snapshot-push-trigger', style={'display': 'none'})
+    ], className="dashboard-container")
+
+# ==================== PUSH DE ATUALIZAÇÕES (SSE) ====================
+def _sse_event(event, version, data):
+    return f"event: {event}\nid: {version}\ndata: {json.dumps(data)}\n\n"
+
+def snapshot_stream():
+    """Canal SSE que avisa os clientes quando uma nova versão do snapshot é publicada"""
+    start_snapshot_publisher()
+    last_id = request.headers.get('Last-Event-ID', '')
+    since = int(last_id) if last_id.isdigit() else None
+
+    def gerar():
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        versao = since
+        if versao is None:
+            versao = snapshot.version
+            yield _sse_event('hello', versao, {'version': versao})
+        fim = time.monotonic() + SSE_STREAM_SECONDS
+        while True:
+            restante = fim - time.monotonic()
+            if restante <= 0:
+                break
+            nova, changed = snapshot.wait_for_change(versao, min(restante, SSE_KEEPALIVE_SECONDS))
+            if nova > versao:
+                versao = nova
+                yield _sse_event('snapshot', versao, {'version': versao, 'changed': changed})
+            else:
+                yield ": keepalive\n\n"
+
+    return Response(stream_with_context(gerar()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+clientside_callback(
+    """
+    function(n_clicks) {
+        return window.portalSnapshot || window.dash_clientside.no_update;
+    }
+    """,
+    Output('snapshot-version', 'data'),
+    Input('snapshot-push-trigger', 'n_clicks'),
+    prevent_initial_call=True
+)
+
+# ==================== EXPORTAÇÃO (CSV) ====================
+EXPORT_QUERIES = tuple(nome for nome, query in QUERIES.items() if query.chunksize)  # Queries de detalhe
+
+def export_query_csv(key):
+    """CSV de uma query de detalhe, escrito bloco a bloco a partir de stream_query"""
+    if key not in EXPORT_QUERIES:
+        return jsonify({'erro': f"Query não exportável: {key}"}), 404
+
+    def gerar():
+        yield '\ufeff'  # BOM: o Excel abre o arquivo como UTF-8
+        cabecalho = True
+        for bloco in stream_query(key):
+            yield bloco.to_csv(index=False, header=cabecalho, sep=';', decimal=',')
+            cabecalho = False
 
-@app.callback(
+    return Response(stream_with_context(gerar()), mimetype='text/csv', headers={
+        'Content-Disposition': f'attachment; filename={key}.csv'
+    })
+
+# ==================== RESPOSTAS SEM MUDANÇA ====================
+# Cada output pesado tem um dcc.Store com o hash do último valor enviado ao
+# navegador. Se o callback produzir o mesmo conteúdo, a resposta é no_update.
+HASHED_OUTPUTS = []
+
+def output_hash(component_id):
+    """Output do Store que guarda o hash do último valor de `component_id`"""
+    if component_id not in HASHED_OUTPUTS:
+        HASHED_OUTPUTS.append(component_id)
+    return Output({'type': 'output-hash', 'id': component_id}, 'data')
+
+def last_output_hash(component_id):
+    return State({'type': 'output-hash', 'id': component_id}, 'data')
+
+def with_output_hash_stores(componente):
+    """
+    Coloca o Store do hash ao lado de cada output de HASHED_OUTPUTS presente em
+    `componente` (a página). Os Stores são recriados (vazios) a cada troca de
+    página, e os callbacks de outras páginas ficam sem nenhum output no layout,
+    então o dash-renderer os descarta em vez de dispará-los sem seus Inputs.
+    """
+    filhos = getattr(componente, 'children', None)
+    if isinstance(filhos, Component):
+        filhos = [filhos]
+    if isinstance(filhos, (list, tuple)):
+        novos = []
+        for filho in filhos:
+            novos.append(with_output_hash_stores(filho))
+            cid = getattr(filho, 'id', None)
+            if isinstance(cid, str) and cid in HASHED_OUTPUTS:
+                novos.append(dcc.Store(id={'type': 'output-hash', 'id': cid}))
+        if len(novos) != len(filhos):
+            componente.children = novos
+    return componente
+
+def skip_unchanged_output(func):
+    """
+    Para callbacks declarados com output_hash/last_output_hash: compara o hash
+    do JSON retornado com o que o navegador já tem e, se for igual, não reenvia.
+    """
+    @functools.wraps(func)
+    def wrapper(*args):
+        *args, hash_anterior = args
+        valor = func(*args)
+        novo_hash = hashlib.sha1(pio.json.to_json_plotly(valor).encode('utf-8')).hexdigest()
+        if novo_hash == hash_anterior:
+            return no_update, no_update
+        return valor, novo_hash
+    return wrapper
+
+@callback(
     Output('page-content', 'children'),
     [Input('nav-dashboard', 'n_clicks'),
      Input('nav-colaboradores', 'n_clicks'),
@@ -1679,6 +1845,9 @@ app.layout = html.Div([
      Input('nav-config', 'n_clicks')]
 )
 def display_page(dash_clicks, colab_clicks, equip_clicks, reducao_clicks, linhas_clicks, config_clicks):
+    return with_output_hash_stores(render_page())
+
+def render_page():
     ctx = dash.callback_context
     if not ctx.triggered:
         return create_dashboard_content()
@@ -1698,7 +1867,14 @@ def display_page(dash_clicks, colab_clicks, equip_clicks, reducao_clicks, linhas
     else:
         return create_dashboard_content()
 
-@app.callback(
+@callback(
+    Output('db-status-banner', 'children'),
+    Input('snapshot-version', 'data')
+)
+def update_db_status_banner(version):
+    return create_db_status_banner()
+
+@callback(
     [Output('nav-dashboard', 'className'),
      Output('nav-colaboradores', 'className'),
      Output('nav-equipamentos', 'className'),
@@ -1737,59 +1913,24 @@ def update_nav_classes(dash_clicks, colab_clicks, equip_clicks, reducao_clicks,
     else:
         return active_class, base_class, base_class, base_class, base_class, base_class
 
-@app.callback(
+@callback(
     Output('current-time', 'children'),
-    [Input('interval-component', 'n_intervals')]
+    [Input('snapshot-version', 'data')]
 )
 def update_time(n):
-    return datetime.now().strftime('%H:%M:%S - %d/%m/%Y')
+    return snapshot_time()
 
-@app.callback(
-    Output('kpi-cards', 'children'),
-    [Input('interval-component', 'n_intervals'),
-     Input('refresh-btn', 'n_clicks')]
+@callback(
+    [Output('kpi-cards', 'children'), output_hash('kpi-cards')],
+    [Input('snapshot-version', 'data'),
+     Input('refresh-btn', 'n_clicks')],
+    [last_output_hash('kpi-cards')]
 )
+@skip_unchanged_output
 def update_kpis(n, refresh_clicks):
-    df_total = execute_query(QUERIES['total_computadores'])
-    total_computadores = df_total.iloc[0]['total_computadores'] if not df_total.empty else 0
-    
-    df_terc_inativos = execute_query(QUERIES['kpi_terceirizados_inativos'])
-    terceirizados_inativos = df_terc_inativos.iloc[0]['total_terceirizados_inativos'] if not df_terc_inativos.empty else 0
-    
-    df_terc_ativos = execute_query(QUERIES['kpi_terceirizados_ativos'])
-    terceirizados_ativos = df_terc_ativos.iloc[0]['total_terceirizados_ativos'] if not df_terc_ativos.empty else 0
-    
-    df_demitidos = execute_query(QUERIES['kpi_colaboradores_demitidos'])
-    colaboradores_demitidos = df_demitidos.iloc[0]['total_colaboradores_demitidos'] if not df_demitidos.empty else 0
-    
-    df_aviso_previo = execute_query(QUERIES['kpi_colaboradores_aviso_previo'])
-    colaboradores_aviso_previo = df_aviso_previo.iloc[0]['total_colaboradores_aviso_previo'] if not df_aviso_previo.empty else 0
-    
-    df_demitidos_equip = execute_query(QUERIES['kpi_demitidos_com_equipamentos'])
-    demitidos_com_equipamentos = df_demitidos_equip.iloc[0]['total_demitidos_com_equipamentos'] if not df_demitidos_equip.empty else 0
-    df_demitidos_equip_detail = execute_query(QUERIES['colaboradores_demitidos_com_equipamentos'])
-    
-    df_colab_ativos_equip = execute_query(QUERIES['kpi_colaboradores_ativos_com_equipamentos'])
-    colaboradores_ativos_equipamentos = df_colab_ativos_equip.iloc[0]['total_colaboradores_ativos_com_equipamentos'] if not df_colab_ativos_equip.empty else 0
-    
-    df_equip_sem_dono = execute_query(QUERIES['kpi_equipamentos_sem_dono'])
-    equipamentos_descartados = df_equip_sem_dono.iloc[0]['total_equipamentos_descartados'] if not df_equip_sem_dono.empty else 0
-    
-    df_ativos_sem_pc = execute_query(QUERIES['kpi_colaboradores_ativos_sem_computador'])
-    colaboradores_ativos_sem_pc = df_ativos_sem_pc.iloc[0]['total_colaboradores_ativos_sem_computador'] if not df_ativos_sem_pc.empty else 0
-    
-    df_estoque_total = execute_query(QUERIES['total_equipamentos_estoque'])
-    total_estoque = df_estoque_total.iloc[0]['TotalEmEstoque'] if not df_estoque_total.empty and df_estoque_total.iloc[0]['TotalEmEstoque'] is not None else 0
-    
-    df_equip_alocados = execute_query(QUERIES['kpi_equipamentos_alocados'])
-    equipamentos_alocados = df_equip_alocados.iloc[0]['total_equipamentos_alocados'] if not df_equip_alocados.empty else 0
-    taxa_alocacao = 0
-    if (equipamentos_alocados or 0) + (total_estoque or 0) > 0:
-        total_computadores_calc = equipamentos_alocados + total_estoque
-        taxa_alocacao = round((equipamentos_alocados / total_computadores_calc) * 100, 1)
-    
-    df_equip_alugados = execute_query(QUERIES['kpi_equipamentos_alugados'])
-    equipamentos_alugados = df_equip_alugados.iloc[0]['total_equipamentos_alugados'] if not df_equip_alugados.empty else 0
+    skip_unless_changed(*KPI_SOURCES)
+    kpis = compute_kpi_values()
+    tendencias = kpi_history.series(list(kpis))
     
     idade_path = os.path.join(os.path.dirname(__file__), 'idade_computadores.xlsx')
     media_idade_anos = None
@@ -1820,49 +1961,22 @@ def update_kpis(n, refresh_clicks):
         except Exception as _:
             media_idade_anos = None
     
-    detalhes_children = []
-    if not df_demitidos_equip_detail.empty:
-        registros = df_demitidos_equip_detail.to_dict('records')
-        agrupado = {}
-        for row in registros:
-            nome = row.get('Colaborador', 'Sem Nome')
-            chefia = row.get('Chefia', '-')
-            comp = (row.get('ModeloComputador') or '').strip()
-            perif = (row.get('ModeloPeriferico') or '').strip()
-            chave = (nome, chefia)
-            if chave not in agrupado:
-                agrupado[chave] = []
-            for equip in [comp, perif]:
-                if equip and equip not in agrupado[chave]:
-                    agrupado[chave].append(equip)
-        itens = []
-        for (nome, chefia), equipamentos_list in list(agrupado.items())[:10]:
-            equipamentos = ' / '.join(equipamentos_list)
-            descricao = f"{nome} — {chefia}" + (f" — {equipamentos}" if equipamentos else "")
-            itens.append(html.Li(descricao, style={'borderBottom': '1px solid #e5e5e5', 'padding': '4px 0'}))
-        detalhes_children = [
-            html.Div("Ex funcionario com equipamento", style={'fontWeight': 'bold', 'marginBottom': '0.5rem'}),
-            html.Ul(itens, style={'listStyleType': 'none', 'paddingLeft': 0, 'margin': 0})
-        ]
-    else:
-        detalhes_children = [html.Div("Sem demitidos com equipamentos", style={'fontStyle': 'italic'})]
-
-    card_total = create_kpi_card("Total de Computadores", total_computadores, "fas fa-desktop", "Total no sistema")
-    card_terc_inativos = create_kpi_card("Terceirizados Inativos", terceirizados_inativos, "fas fa-user-times", "Com equipamentos")
-    card_terc_ativos = create_kpi_card("Terceirizados Ativos", terceirizados_ativos, "fas fa-user-check", "Com equipamentos")
-    card_demitidos = create_kpi_card("Colaboradores Demitidos", colaboradores_demitidos, "fas fa-user-slash", f"{demitidos_com_equipamentos} com equipamentos")
-    card_aviso_wrapped = html.Div(create_kpi_card("Aviso Prévio", colaboradores_aviso_previo, "fas fa-clock", "Colaboradores"), id='kpi-aviso')
-    card_colab_ativos = create_kpi_card("Colaboradores c/ Equipamentos", colaboradores_ativos_equipamentos, "fas fa-users", "Ativos com equipamentos")
-    card_equip_nao_controlados = create_kpi_card("Equipamentos Críticos", equipamentos_descartados, "fas fa-exclamation-triangle", "Descartados/Danificados/Extraviados")
-    card_ativos_sem_pc = create_kpi_card("Ativos sem computador", colaboradores_ativos_sem_pc, "fas fa-user", "Colaboradores ativos")
-    card_taxa_aloc = create_kpi_card("Taxa de alocação", f"{taxa_alocacao}%", "fas fa-chart-line", "Equip. alocados / total")
+    card_total = create_kpi_card("Total de Computadores", kpis['total_computadores'], "fas fa-desktop", "Total no sistema", tendencias.get('total_computadores'))
+    card_terc_inativos = create_kpi_card("Terceirizados Inativos", kpis['terceirizados_inativos'], "fas fa-user-times", "Com equipamentos", tendencias.get('terceirizados_inativos'))
+    card_terc_ativos = create_kpi_card("Terceirizados Ativos", kpis['terceirizados_ativos'], "fas fa-user-check", "Com equipamentos", tendencias.get('terceirizados_ativos'))
+    card_demitidos = create_kpi_card("Colaboradores Demitidos", kpis['colaboradores_demitidos'], "fas fa-user-slash", f"{kpis['demitidos_com_equipamentos']} com equipamentos", tendencias.get('colaboradores_demitidos'))
+    card_aviso_wrapped = html.Div(create_kpi_card("Aviso Prévio", kpis['colaboradores_aviso_previo'], "fas fa-clock", "Colaboradores", tendencias.get('colaboradores_aviso_previo')), id='kpi-aviso')
+    card_colab_ativos = create_kpi_card("Colaboradores c/ Equipamentos", kpis['colaboradores_ativos_equipamentos'], "fas fa-users", "Ativos com equipamentos", tendencias.get('colaboradores_ativos_equipamentos'))
+    card_equip_nao_controlados = create_kpi_card("Equipamentos Críticos", kpis['equipamentos_criticos'], "fas fa-exclamation-triangle", "Descartados/Danificados/Extraviados", tendencias.get('equipamentos_criticos'))
+    card_ativos_sem_pc = create_kpi_card("Ativos sem computador", kpis['colaboradores_ativos_sem_pc'], "fas fa-user", "Colaboradores ativos", tendencias.get('colaboradores_ativos_sem_pc'))
+    card_taxa_aloc = create_kpi_card("Taxa de alocação", f"{kpis['taxa_alocacao']}%", "fas fa-chart-line", "Equip. alocados / total", tendencias.get('taxa_alocacao'))
     card_media_idade = create_kpi_card("Média idade PCs", media_idade_anos if media_idade_anos is not None else '-', "fas fa-hourglass-half", "Anos")
-    card_equip_alugados = create_kpi_card("Equipamentos Alugados", equipamentos_alugados, "fas fa-handshake", "Computadores Samsung")
+    card_equip_alugados = create_kpi_card("Equipamentos Alugados", kpis['equipamentos_alugados'], "fas fa-handshake", "Modelos de locação", tendencias.get('equipamentos_alugados'))
 
-    df_aviso_detail = execute_query(QUERIES['colaboradores_aviso_previo'])
+    df_aviso_detail = snapshot_df('colaboradores_aviso_previo')
     aviso_children = []
     if not df_aviso_detail.empty:
-        nomes = df_aviso_detail['Nome'].dropna().astype(str).head(15).tolist()
+        nomes = df_aviso_detail['Nome'].astype(str).tolist()
         itens_aviso = [html.Li(nome, style={'borderBottom': '1px solid #e5e5e5', 'padding': '4px 0'}) for nome in nomes]
         aviso_children = [
             html.Div("Colaboradores em aviso prévio", style={'fontWeight': 'bold', 'marginBottom': '0.5rem'}),
@@ -1892,26 +2006,26 @@ def update_kpis(n, refresh_clicks):
         popover_aviso
     ]
 
-@app.callback(
-    Output('colaboradores-situacao', 'figure'),
-    [Input('interval-component', 'n_intervals'),
-     Input('refresh-btn', 'n_clicks')]
+@callback(
+    [Output('colaboradores-situacao', 'figure'), output_hash('colaboradores-situacao')],
+    [Input('snapshot-version', 'data'),
+     Input('refresh-btn', 'n_clicks')],
+    [last_output_hash('colaboradores-situacao')]
 )
+@skip_unchanged_output
 def update_colaboradores_situacao(n, refresh_clicks):
-    df_demitidos = execute_query(QUERIES['kpi_colaboradores_demitidos'])
-    df_aviso_previo = execute_query(QUERIES['kpi_colaboradores_aviso_previo'])
-    df_ativos = execute_query(QUERIES['kpi_colaboradores_ativos'])
+    import plotly.express as px  # Só os gráficos de pizza/barra usam o express; adiado para acelerar o boot
+    skip_unless_changed('kpi_colaboradores_demitidos', 'kpi_colaboradores_aviso_previo', 'kpi_colaboradores_ativos')
+    df_demitidos = snapshot_df('kpi_colaboradores_demitidos')
+    df_aviso_previo = snapshot_df('kpi_colaboradores_aviso_previo')
+    df_ativos = snapshot_df('kpi_colaboradores_ativos')
     
-    demitidos = df_demitidos.iloc[0]['total_colaboradores_demitidos'] if not df_demitidos.empty else 0
-    aviso_previo = df_aviso_previo.iloc[0]['total_colaboradores_aviso_previo'] if not df_aviso_previo.empty else 0
-    ativos = df_ativos.iloc[0]['total_colaboradores_ativos'] if not df_ativos.empty else 0
+    demitidos = df_demitidos.iloc[0]['total'] if not df_demitidos.empty else 0
+    aviso_previo = df_aviso_previo.iloc[0]['total'] if not df_aviso_previo.empty else 0
+    ativos = df_ativos.iloc[0]['total'] if not df_ativos.empty else 0
     
     if demitidos == 0 and aviso_previo == 0 and ativos == 0:
-        return go.Figure().add_annotation(
-            text="Sem dados disponíveis", 
-            showarrow=False,
-            font=dict(size=16, color='#6c757d')
-        )
+        return empty_figure("Sem dados disponíveis")
     
     categories = ['Ativos', 'Demitidos', 'Aviso Prévio']
     values = [ativos, demitidos, aviso_previo]
@@ -1929,14 +2043,6 @@ def update_colaboradores_situacao(n, refresh_clicks):
     )
     
     fig.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#1e1e1e', size=12, family='Inter'),
-        title=dict(
-            font=dict(size=18, color='#1e1e1e', family='Inter'),
-            x=0.5,
-            y=0.95
-        ),
         showlegend=True,
         legend=dict(
             orientation="h",
@@ -1947,26 +2053,26 @@ def update_colaboradores_situacao(n, refresh_clicks):
             font=dict(size=11)
         ),
         margin=dict(t=60, b=60, l=20, r=20),
-        height=400
     )
     
     return fig
 
 
-@app.callback(
-    Output('computadores-por-modelo', 'figure'),
-    [Input('interval-component', 'n_intervals'),
-     Input('refresh-btn', 'n_clicks')]
+@callback(
+    [Output('computadores-por-modelo', 'figure'), output_hash('computadores-por-modelo')],
+    [Input('snapshot-version', 'data'),
+     Input('refresh-btn', 'n_clicks')],
+    [last_output_hash('computadores-por-modelo')]
 )
+@skip_unchanged_output
 def update_computadores_por_modelo(n, refresh_clicks):
-    df = execute_query(QUERIES['computadores_por_modelo'])
-    
+    skip_unless_changed('computadores_por_modelo')
+    return build_computadores_por_modelo_figure(catalogo.annotate(snapshot_df('computadores_por_modelo')))
+
+@cached_figure
+def build_computadores_por_modelo_figure(df):
     if df.empty:
-        return go.Figure().add_annotation(
-            text="Sem dados disponíveis", 
-            showarrow=False,
-            font=dict(size=16, color='#6c757d')
-        )
+        return empty_figure("Sem dados disponíveis")
     
     df_top = df.head(8)
     
@@ -1976,66 +2082,54 @@ def update_computadores_por_modelo(n, refresh_clicks):
         go.Bar(
             x=df_top['Modelo'], 
             y=df_top['quantidade'],
+            customdata=df_top[['Fabricante', 'Propriedade']],
             marker=dict(
                 color=colors[:len(df_top)],
                 line=dict(color='rgba(255,255,255,0.8)', width=2)
             ),
-            hovertemplate='<b>%{x}</b><br>Quantidade: %{y}<extra></extra>'
+            hovertemplate='<b>%{x}</b><br>%{customdata[0]} · %{customdata[1]}<br>Quantidade: %{y}<extra></extra>'
         )
     ])
     
     fig.update_layout(
-        title=dict(
-            text='<b>Top 8 Modelos de Computadores</b>',
-            font=dict(size=18, color='#1e1e1e', family='Inter'),
-            x=0.5,
-            y=0.95
-        ),
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#1e1e1e', size=12, family='Inter'),
+        title='<b>Top 8 Modelos de Computadores</b>',
         showlegend=False,
         margin=dict(t=60, b=80, l=60, r=40),
-        height=400,
         xaxis=dict(
             showgrid=False,
             tickangle=-45,
-            title=dict(text='<b>Modelo</b>', font=dict(size=14)),
-            linecolor='#e9ecef',
+            title='<b>Modelo</b>',
             tickfont=dict(size=10)
         ),
         yaxis=dict(
             showgrid=True,
-            gridcolor='rgba(233,236,239,0.5)',
-            title=dict(text='<b>Quantidade</b>', font=dict(size=14)),
-            linecolor='#e9ecef'
+            title='<b>Quantidade</b>'
         )
     )
     
     return fig
 
-@app.callback(
-    Output('ocupacao-por-setor', 'figure'),
-    [Input('interval-component', 'n_intervals'),
-     Input('refresh-btn', 'n_clicks')]
+@callback(
+    [Output('ocupacao-por-setor', 'figure'), output_hash('ocupacao-por-setor')],
+    [Input('snapshot-version', 'data'),
+     Input('refresh-btn', 'n_clicks')],
+    [last_output_hash('ocupacao-por-setor')]
 )
+@skip_unchanged_output
 def update_ocupacao_por_setor(n, refresh_clicks):
-    df = execute_query(QUERIES['ocupacao_por_setor'])
-    
+    skip_unless_changed('ocupacao_por_setor')
+    return build_ocupacao_por_setor_figure(snapshot_df('ocupacao_por_setor'))
+
+@cached_figure
+def build_ocupacao_por_setor_figure(df):
     if df.empty:
-        return go.Figure().add_annotation(
-            text="Sem dados disponíveis", 
-            showarrow=False,
-            font=dict(size=16, color='#6c757d')
-        )
+        return empty_figure("Sem dados disponíveis")
 
-    df_top = df.head(10)
-    
     fig = go.Figure()
     
     fig.add_trace(go.Bar(
-        y=df_top['Setor'],
-        x=df_top['TotalColaboradores'],
+        y=df['Setor'],
+        x=df['TotalColaboradores'],
         orientation='h',
         name='Total Colaboradores',
         marker=dict(color='#e9ecef'),
@@ -2044,25 +2138,17 @@ def update_ocupacao_por_setor(n, refresh_clicks):
     
     # Barras de colaboradores com equipamento (frente)
     fig.add_trace(go.Bar(
-        y=df_top['Setor'],
-        x=df_top['ComEquipamento'],
+        y=df['Setor'],
+        x=df['ComEquipamento'],
         orientation='h',
         name='Com Equipamento',
         marker=dict(color='#6366f1'),
         hovertemplate='<b>%{y}</b><br>Com Equipamento: %{x}<br>Taxa: %{customdata}%<extra></extra>',
-        customdata=df_top['TaxaOcupacao']
+        customdata=df['TaxaOcupacao']
     ))
     
     fig.update_layout(
-        title=dict(
-            text='<b>Taxa de Ocupação de Equipamentos por Setor</b>',
-            font=dict(size=18, color='#1e1e1e', family='Inter'),
-            x=0.5,
-            y=0.95
-        ),
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#1e1e1e', size=12, family='Inter'),
+        title='<b>Taxa de Ocupação de Equipamentos por Setor</b>',
         showlegend=True,
         legend=dict(
             orientation="h",
@@ -2073,17 +2159,13 @@ def update_ocupacao_por_setor(n, refresh_clicks):
             font=dict(size=11)
         ),
         margin=dict(t=60, b=80, l=150, r=40),
-        height=400,
         xaxis=dict(
             showgrid=True,
-            gridcolor='rgba(233,236,239,0.5)',
-            title=dict(text='<b>Quantidade de Colaboradores</b>', font=dict(size=14)),
-            linecolor='#e9ecef'
+            title='<b>Quantidade de Colaboradores</b>'
         ),
         yaxis=dict(
             showgrid=False,
-            title=dict(text='<b>Setor</b>', font=dict(size=14)),
-            linecolor='#e9ecef',
+            title='<b>Setor</b>',
             tickfont=dict(size=10)
         ),
         barmode='overlay'
@@ -2091,20 +2173,19 @@ def update_ocupacao_por_setor(n, refresh_clicks):
     
     return fig
 
-@app.callback(
-    Output('estoque-modelos-idade', 'figure'),
-    [Input('interval-component', 'n_intervals'),
-     Input('refresh-btn', 'n_clicks')]
+@callback(
+    [Output('estoque-modelos-idade', 'figure'), output_hash('estoque-modelos-idade')],
+    [Input('snapshot-version', 'data'),
+     Input('refresh-btn', 'n_clicks')],
+    [last_output_hash('estoque-modelos-idade')]
 )
+@skip_unchanged_output
 def update_estoque_modelos_idade(n, refresh_clicks):
+    skip_unless_changed('modelos_em_estoque')
     # 1) Quantidade por modelo no estoque (DB)
-    df_estoque = execute_query(QUERIES['modelos_em_estoque'])
+    df_estoque = snapshot_df('modelos_em_estoque')
     if df_estoque.empty:
-        return go.Figure().add_annotation(
-            text="Sem dados de estoque", 
-            showarrow=False,
-            font=dict(size=16, color='#6c757d')
-        )
+        return empty_figure("Sem dados de estoque")
     df_estoque['Modelo'] = df_estoque['Modelo'].astype(str).str.strip()
 
     # 2) Idade média por modelo (Excel)
@@ -2140,18 +2221,10 @@ def update_estoque_modelos_idade(n, refresh_clicks):
 
     # 3) Join por modelo e montar donut chart (somente modelos presentes no Excel)
     if df_idade is None or df_idade.empty:
-        return go.Figure().add_annotation(
-            text="Excel sem dados válidos (Modelo + AnoCompra/DataCompra)", 
-            showarrow=False,
-            font=dict(size=16, color='#6c757d')
-        )
+        return empty_figure("Excel sem dados válidos (Modelo + AnoCompra/DataCompra)")
     df_merge = pd.merge(df_estoque, df_idade, on='Modelo', how='inner')
     if df_merge.empty:
-        return go.Figure().add_annotation(
-            text="Nenhum modelo do Excel encontrado no estoque", 
-            showarrow=False,
-            font=dict(size=16, color='#6c757d')
-        )
+        return empty_figure("Nenhum modelo do Excel encontrado no estoque")
 
     # Cores modernas para o donut chart
     colors = ['#6366f1', '#8b5cf6', '#ec4899', '#ef4444', '#f97316', '#eab308', '#22c55e', '#06b6d4']
@@ -2171,233 +2244,93 @@ def update_estoque_modelos_idade(n, refresh_clicks):
     )])
     
     fig.update_layout(
-        title=dict(
-            text='<b>Estoque por Modelo (com idade média)</b>',
-            font=dict(size=18, color='#1e1e1e', family='Inter'),
-            x=0.5,
-            y=0.95
-        ),
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#1e1e1e', size=12, family='Inter'),
-        showlegend=True,
-        legend=dict(
-            orientation="v",
-            yanchor="middle",
-            y=0.5,
-            xanchor="left",
-            x=1.05,
-            font=dict(size=10)
-        ),
-        margin=dict(t=60, b=40, l=40, r=150),
-        height=400,
-        annotations=[
-            dict(
-                text="<b>Estoque<br>Total</b>",
-                x=0.5, y=0.5,
-                font_size=16,
-                font_color='#6c757d',
-                showarrow=False
-            )
-        ]
+        title='<b>Estoque por Modelo (com idade média)</b>',
+        **donut_legend_layout("<b>Estoque<br>Total</b>", font_size=16)
     )
     
     return fig
 
-@app.callback(
-    Output('terceirizados-inativos-table', 'children'),
-    [Input('interval-component', 'n_intervals'),
-     Input('refresh-btn', 'n_clicks')]
+@callback(
+    [Output('terceirizados-inativos-table', 'children'), output_hash('terceirizados-inativos-table')],
+    [Input('snapshot-version', 'data'),
+     Input('refresh-btn', 'n_clicks')],
+    [last_output_hash('terceirizados-inativos-table')]
 )
+@skip_unchanged_output
 def update_terceirizados_inativos_table(n, refresh_clicks):
-    df = execute_query(QUERIES['terceirizados_inativos_com_equipamentos'])
+    skip_unless_changed('terceirizados_inativos_com_equipamentos')
+    df = snapshot_df('terceirizados_inativos_com_equipamentos')
     
     if df.empty:
         return html.P("Nenhum terceirizado inativo com equipamentos", 
                      style={'text-align': 'center', 'color': '#6c757d', 'fontStyle': 'italic'})
     
-    df_top = df.head(8)
-    
-    return dash_table.DataTable(
-        data=df_top.to_dict('records'),
-        columns=[
-            {"name": "Serial", "id": "Serial"},
-            {"name": "Modelo", "id": "Modelo"},
-            {"name": "Nome", "id": "Nome"},
-            {"name": "Matrícula", "id": "Matricula_Terc"},
-            {"name": "Chefia", "id": "Chefia"}
-        ],
-        style_table={
-            'overflowX': 'auto',
-            'maxWidth': '100%',
-            'borderRadius': '8px',
-            'overflow': 'hidden'
-        },
-        style_cell={
-            'textAlign': 'left',
-            'padding': '12px 16px',
-            'fontFamily': 'Segoe UI, sans-serif',
-            'fontSize': '0.875rem',
-            'whiteSpace': 'normal',
-            'height': 'auto',
-            'border': 'none',
-            'borderBottom': '1px solid #e9ecef'
-        },
-        style_header={
-            'backgroundColor': '#1e1e1e',
-            'color': 'white',
-            'fontWeight': '600',
-            'textTransform': 'uppercase',
-            'letterSpacing': '0.5px',
-            'fontSize': '0.8rem',
-            'border': 'none'
-        },
-        style_data={
-            'backgroundColor': '#ffffff',
-            'border': 'none'
-        },
-        style_data_conditional=[
-            {
-                'if': {'row_index': 'odd'},
-                'backgroundColor': '#f8f9fa'
-            },
-            {
-                'if': {'state': 'active'},
-                'backgroundColor': 'rgba(99, 102, 241, 0.1)',
-                'border': '1px solid #6366f1'
-            }
-        ]
-    )
+    return create_data_table(df, [
+        ("Serial", "Serial"),
+        ("Modelo", "Modelo"),
+        ("Nome", "Nome"),
+        ("Matrícula", "Matricula_Terc"),
+        ("Chefia", "Chefia")
+    ])
 
-@app.callback(
-    Output('demitidos-equipamentos-table', 'children'),
-    [Input('interval-component', 'n_intervals'),
-     Input('refresh-btn', 'n_clicks')]
+@callback(
+    [Output('demitidos-equipamentos-table', 'children'), output_hash('demitidos-equipamentos-table')],
+    [Input('snapshot-version', 'data'),
+     Input('refresh-btn', 'n_clicks')],
+    [last_output_hash('demitidos-equipamentos-table')]
 )
+@skip_unchanged_output
 def update_demitidos_equipamentos_table(n, refresh_clicks):
-    df = execute_query(QUERIES['colaboradores_demitidos_com_equipamentos'])
+    skip_unless_changed('colaboradores_demitidos_com_equipamentos')
+    df = snapshot_df('colaboradores_demitidos_com_equipamentos')
     
     if df.empty:
         return html.P("Nenhum colaborador demitido com equipamentos", 
                      style={'text-align': 'center', 'color': '#6c757d', 'fontStyle': 'italic'})
     
-    # Agrupa por colaborador para que o nome apareça uma única vez
-    def _join_unique(series):
-        valores = [str(x).strip() for x in series if pd.notna(x) and str(x).strip() != '']
-        if not valores:
-            return ''
-        # Mantém ordem de aparição, removendo duplicados
-        vistos = set()
-        ordenado_sem_dup = []
-        for v in valores:
-            if v not in vistos:
-                vistos.add(v)
-                ordenado_sem_dup.append(v)
-        return ' / '.join(ordenado_sem_dup)
-
-    colunas_chave = ['Colaborador', 'CCusto', 'Chefia']
-    for col in colunas_chave:
-        if col not in df.columns:
-            df[col] = None
-
-    df_grouped = (
-        df.groupby(colunas_chave, dropna=False)
-          .agg({
-              'ModeloComputador': _join_unique if 'ModeloComputador' in df.columns else lambda s: '',
-              'ModeloPeriferico': _join_unique if 'ModeloPeriferico' in df.columns else lambda s: ''
-          })
-          .reset_index()
-    )
-
-    df_top = df_grouped.head(8)
+    # Uma linha por colaborador, só as exibidas (parâmetro limite da query); os modelos já vêm agregados (STRING_AGG) da query
+    df = df.fillna({'ModeloPeriferico': ''})
     
-    return dash_table.DataTable(
-        data=df_top.to_dict('records'),
-        columns=[
-            {"name": "Colaborador", "id": "Colaborador"},
-            {"name": "Centro Custo", "id": "CCusto"},
-            {"name": "Chefia", "id": "Chefia"},
-            {"name": "Computador", "id": "ModeloComputador"},
-            {"name": "Periférico", "id": "ModeloPeriferico"}
-        ],
-        style_table={
-            'overflowX': 'auto',
-            'maxWidth': '100%',
-            'borderRadius': '8px',
-            'overflow': 'hidden'
-        },
-        style_cell={
-            'textAlign': 'left',
-            'padding': '12px 16px',
-            'fontFamily': 'Segoe UI, sans-serif',
-            'fontSize': '0.875rem',
-            'whiteSpace': 'normal',
-            'height': 'auto',
-            'border': 'none',
-            'borderBottom': '1px solid #e9ecef'
-        },
-        style_header={
-            'backgroundColor': '#1e1e1e',
-            'color': 'white',
-            'fontWeight': '600',
-            'textTransform': 'uppercase',
-            'letterSpacing': '0.5px',
-            'fontSize': '0.8rem',
-            'border': 'none'
-        },
-        style_data={
-            'backgroundColor': '#ffffff',
-            'border': 'none'
-        },
-        style_data_conditional=[
-            {
-                'if': {'row_index': 'odd'},
-                'backgroundColor': '#f8f9fa'
-            },
-            {
-                'if': {'state': 'active'},
-                'backgroundColor': 'rgba(99, 102, 241, 0.1)',
-                'border': '1px solid #6366f1'
-            }
-        ]
-    )
+    return create_data_table(df, [
+        ("Colaborador", "Colaborador"),
+        ("Centro Custo", "CCusto"),
+        ("Chefia", "Chefia"),
+        ("Computador", "ModeloComputador"),
+        ("Periférico", "ModeloPeriferico")
+    ])
 
 # ==================== CALLBACKS PARA ABA COLABORADORES ====================
-@app.callback(
+@callback(
     Output('current-time-colab', 'children'),
-    [Input('interval-colaboradores', 'n_intervals')]
+    [Input('snapshot-version', 'data')]
 )
 def update_time_colab(n):
-    return datetime.now().strftime('%H:%M:%S - %d/%m/%Y')
+    return snapshot_time()
 
-@app.callback(
-    Output('colaboradores-por-setor', 'figure'),
-    [Input('interval-colaboradores', 'n_intervals'),
-     Input('refresh-btn-colab', 'n_clicks')]
+@callback(
+    [Output('colaboradores-por-setor', 'figure'), output_hash('colaboradores-por-setor')],
+    [Input('snapshot-version', 'data'),
+     Input('refresh-btn-colab', 'n_clicks')],
+    [last_output_hash('colaboradores-por-setor')]
 )
+@skip_unchanged_output
 def update_colaboradores_por_setor(n, refresh_clicks):
-    df = execute_query(QUERIES['usuarios_por_setor'])
+    skip_unless_changed('usuarios_por_setor')
+    df = snapshot_df('usuarios_por_setor')
     
     if df.empty:
-        return go.Figure().add_annotation(
-            text="Sem dados disponíveis", 
-            showarrow=False,
-            font=dict(size=16, color='#6c757d')
-        )
-    
-    # Pegar top 10 setores
-    df_top = df.head(10)
+        return empty_figure("Sem dados disponíveis")
     
     # Cores vibrantes para setores
     colors = ['#6366f1', '#8b5cf6', '#ec4899', '#ef4444', '#f97316', '#eab308', '#22c55e', '#06b6d4', '#84cc16', '#f59e0b']
     
     fig = go.Figure(data=[
         go.Bar(
-            y=df_top['Setor'], 
-            x=df_top['quantidade'],
+            y=df['Setor'], 
+            x=df['quantidade'],
             orientation='h',
             marker=dict(
-                color=colors[:len(df_top)],
+                color=colors[:len(df)],
                 line=dict(color='rgba(255,255,255,0.8)', width=2)
             ),
             hovertemplate='<b>%{y}</b><br>Colaboradores: %{x}<extra></extra>'
@@ -2405,54 +2338,43 @@ def update_colaboradores_por_setor(n, refresh_clicks):
     ])
     
     fig.update_layout(
-        title=dict(
-            text='<b>Colaboradores por Setor</b>',
-            font=dict(size=18, color='#1e1e1e', family='Inter'),
-            x=0.5,
-            y=0.95
-        ),
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#1e1e1e', size=12, family='Inter'),
+        title='<b>Colaboradores por Setor</b>',
         showlegend=False,
         margin=dict(t=60, b=60, l=150, r=40),
-        height=400,
         xaxis=dict(
             showgrid=True,
-            gridcolor='rgba(233,236,239,0.5)',
-            title=dict(text='<b>Quantidade</b>', font=dict(size=14)),
-            linecolor='#e9ecef'
+            title='<b>Quantidade</b>'
         ),
         yaxis=dict(
             showgrid=False,
-            title=dict(text='<b>Setor</b>', font=dict(size=14)),
-            linecolor='#e9ecef',
+            title='<b>Setor</b>',
             tickfont=dict(size=10)
         )
     )
     
     return fig
 
-@app.callback(
-    Output('colaboradores-por-chefia', 'figure'),
-    [Input('interval-colaboradores', 'n_intervals'),
-     Input('refresh-btn-colab', 'n_clicks')]
+@callback(
+    [Output('colaboradores-por-chefia', 'figure'), output_hash('colaboradores-por-chefia')],
+    [Input('snapshot-version', 'data'),
+     Input('refresh-btn-colab', 'n_clicks')],
+    [last_output_hash('colaboradores-por-chefia')]
 )
+@skip_unchanged_output
 def update_colaboradores_por_chefia(n, refresh_clicks):
-    df = execute_query(QUERIES['colaboradores_por_chefia'])
+    skip_unless_changed('colaboradores_por_chefia', 'kpi_colaboradores_ativos')
+    df_top = snapshot_df('colaboradores_por_chefia')
     
-    if df.empty:
-        return go.Figure().add_annotation(
-            text="Sem dados disponíveis", 
-            showarrow=False,
-            font=dict(size=16, color='#6c757d')
-        )
+    if df_top.empty:
+        return empty_figure("Sem dados disponíveis")
     
-    # Pegar top 8 chefias
-    df_top = df.head(8)
+    # A query traz só as maiores chefias; as demais viram uma fatia a partir do total de ativos
+    outras = _kpi_scalar('kpi_colaboradores_ativos', 'total') - df_top['quantidade'].sum()
+    if outras > 0:
+        df_top = pd.concat([df_top, pd.DataFrame({'Chefia': ['Outras'], 'quantidade': [outras]})], ignore_index=True)
     
     # Cores para o donut
-    colors = ['#6366f1', '#8b5cf6', '#ec4899', '#ef4444', '#f97316', '#eab308', '#22c55e', '#06b6d4']
+    colors = ['#6366f1', '#8b5cf6', '#ec4899', '#ef4444', '#f97316', '#eab308', '#22c55e', '#06b6d4', '#adb5bd']
     
     fig = go.Figure(data=[go.Pie(
         labels=df_top['Chefia'],
@@ -2468,115 +2390,41 @@ def update_colaboradores_por_chefia(n, refresh_clicks):
     )])
     
     fig.update_layout(
-        title=dict(
-            text='<b>Colaboradores por Chefia</b>',
-            font=dict(size=18, color='#1e1e1e', family='Inter'),
-            x=0.5,
-            y=0.95
-        ),
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#1e1e1e', size=12, family='Inter'),
-        showlegend=True,
-        legend=dict(
-            orientation="v",
-            yanchor="middle",
-            y=0.5,
-            xanchor="left",
-            x=1.05,
-            font=dict(size=10)
-        ),
-        margin=dict(t=60, b=40, l=40, r=150),
-        height=400,
-        annotations=[
-            dict(
-                text="<b>Total<br>Colaboradores</b>",
-                x=0.5, y=0.5,
-                font_size=14,
-                font_color='#6c757d',
-                showarrow=False
-            )
-        ]
+        title='<b>Colaboradores por Chefia</b>',
+        **donut_legend_layout("<b>Total<br>Colaboradores</b>")
     )
     
     return fig
 
-@app.callback(
-    Output('colaboradores-detalhado-table', 'children'),
-    [Input('interval-colaboradores', 'n_intervals'),
-     Input('refresh-btn-colab', 'n_clicks')]
+@callback(
+    [Output('colaboradores-detalhado-table', 'children'), output_hash('colaboradores-detalhado-table')],
+    [Input('snapshot-version', 'data'),
+     Input('refresh-btn-colab', 'n_clicks')],
+    [last_output_hash('colaboradores-detalhado-table')]
 )
+@skip_unchanged_output
 def update_colaboradores_detalhado_table(n, refresh_clicks):
-    df = execute_query(QUERIES['colaboradores_detalhado'])
+    skip_unless_changed('colaboradores_detalhado')
+    df = snapshot_df('colaboradores_detalhado')
     
     if df.empty:
         return html.P("Nenhum colaborador encontrado", 
                      style={'text-align': 'center', 'color': '#6c757d', 'fontStyle': 'italic'})
     
-    return dash_table.DataTable(
-        data=df.to_dict('records'),
-        columns=[
-            {"name": "Nome", "id": "Nome"},
-            {"name": "Matrícula", "id": "Matricula"},
-            {"name": "Setor", "id": "Setor"},
-            {"name": "Chefia", "id": "Chefia"},
-            {"name": "Status Equipamento", "id": "StatusEquipamento"},
-            {"name": "Modelo Computador", "id": "ModeloComputador"}
+    return create_data_table(
+        df,
+        [
+            ("Nome", "Nome"),
+            ("Matrícula", "Matricula"),
+            ("Setor", "Setor"),
+            ("Chefia", "Chefia"),
+            ("Status Equipamento", "StatusEquipamento"),
+            ("Modelo Computador", "ModeloComputador")
         ],
-        style_table={
-            'overflowX': 'auto',
-            'maxWidth': '100%',
-            'borderRadius': '8px',
-            'overflow': 'hidden'
-        },
-        style_cell={
-            'textAlign': 'left',
-            'padding': '12px 16px',
-            'fontFamily': 'Segoe UI, sans-serif',
-            'fontSize': '0.875rem',
-            'whiteSpace': 'normal',
-            'height': 'auto',
-            'border': 'none',
-            'borderBottom': '1px solid #e9ecef'
-        },
-        style_header={
-            'backgroundColor': '#1e1e1e',
-            'color': 'white',
-            'fontWeight': '600',
-            'textTransform': 'uppercase',
-            'letterSpacing': '0.5px',
-            'fontSize': '0.8rem',
-            'border': 'none'
-        },
-        style_data={
-            'backgroundColor': '#ffffff',
-            'border': 'none'
-        },
-        style_data_conditional=[
-            {
-                'if': {'row_index': 'odd'},
-                'backgroundColor': '#f8f9fa'
-            },
-            {
-                'if': {'filter_query': 'StatusEquipamento = "Sem Equipamento"'},
-                'backgroundColor': '#fff3cd',
-                'color': '#856404'
-            },
-            {
-                'if': {'filter_query': 'StatusEquipamento = "Com Equipamento"'},
-                'backgroundColor': '#d1edff',
-                'color': '#0c5460'
-            },
-            {
-                'if': {'state': 'active'},
-                'backgroundColor': 'rgba(99, 102, 241, 0.1)',
-                'border': '1px solid #6366f1'
-            }
+        highlights=[
+            ('StatusEquipamento = "Sem Equipamento"', {'backgroundColor': '#fff3cd', 'color': '#856404'}),
+            ('StatusEquipamento = "Com Equipamento"', {'backgroundColor': '#d1edff', 'color': '#0c5460'})
         ],
-        filter_action="native",
-        sort_action="native",
-        page_action="native",
-        page_current=0,
         page_size=50
     )
 
@@ -2586,7 +2434,7 @@ def calcular_criticidade_equipamentos():
     Retorna DataFrame com criticidade calculada.
     """
     # Buscar equipamentos do banco
-    df_equipamentos = execute_query(QUERIES['equipamentos_criticidade'])
+    df_equipamentos = snapshot_df('equipamentos_criticidade')
     
     if df_equipamentos.empty:
         return pd.DataFrame()
@@ -2629,7 +2477,11 @@ def calcular_criticidade_equipamentos():
         # Calcular idade média por modelo
         idade_media = plan.groupby('Modelo', as_index=False)['idade_anos'].mean()
         
-        # Merge com equipamentos - INNER JOIN para manter apenas equipamentos com dados de idade
+        # Merge com equipamentos - INNER JOIN para manter apenas equipamentos com dados de idade.
+        # A planilha usa as mesmas categorias de Modelo do snapshot: a junção é feita pelos
+        # códigos das categorias; modelos que não estão no banco viram NaN e são descartados
+        idade_media['Modelo'] = idade_media['Modelo'].astype(df_equipamentos['Modelo'].dtype)
+        idade_media = idade_media.dropna(subset=['Modelo'])
         df_merge = pd.merge(df_equipamentos, idade_media, on='Modelo', how='inner')
         
         # Melhorar informações de status
@@ -2669,27 +2521,44 @@ def calcular_criticidade_equipamentos():
         return pd.DataFrame()
 
 # ==================== CALLBACKS PARA ABA EQUIPAMENTOS ====================
-@app.callback(
+NAV_INPUTS = [
+    Input(f'nav-{pagina}', 'n_clicks')
+    for pagina in ('dashboard', 'colaboradores', 'equipamentos', 'reducao-custos', 'linhas-moveis', 'config')
+]
+
+def background_table_options(table_id):
+    """
+    Opções dos background callbacks das tabelas pesadas: progresso na barra
+    `<table_id>-progress` e cancelamento do job quando o usuário troca de página.
+    """
+    progresso = f'{table_id}-progress'
+    return dict(
+        background=True,
+        progress=[Output(progresso, 'value'), Output(progresso, 'label')],
+        running=[(Output(progresso, 'style'), {'display': 'flex', 'marginBottom': '1rem'}, {'display': 'none'})],
+        cancel=NAV_INPUTS
+    )
+
+@callback(
     Output('current-time-equip', 'children'),
-    [Input('interval-equipamentos', 'n_intervals')]
+    [Input('snapshot-version', 'data')]
 )
 def update_time_equip(n):
-    return datetime.now().strftime('%H:%M:%S - %d/%m/%Y')
+    return snapshot_time()
 
-@app.callback(
-    Output('equipamentos-por-status', 'figure'),
-    [Input('interval-equipamentos', 'n_intervals'),
-     Input('refresh-btn-equip', 'n_clicks')]
+@callback(
+    [Output('equipamentos-por-status', 'figure'), output_hash('equipamentos-por-status')],
+    [Input('snapshot-version', 'data'),
+     Input('refresh-btn-equip', 'n_clicks')],
+    [last_output_hash('equipamentos-por-status')]
 )
+@skip_unchanged_output
 def update_equipamentos_por_status(n, refresh_clicks):
-    df = execute_query(QUERIES['equipamentos_por_status'])
+    skip_unless_changed('equipamentos_por_status')
+    df = snapshot_df('equipamentos_por_status')
     
     if df.empty:
-        return go.Figure().add_annotation(
-            text="Sem dados disponíveis", 
-            showarrow=False,
-            font=dict(size=16, color='#6c757d')
-        )
+        return empty_figure("Sem dados disponíveis")
     
     colors = ['#22c55e', '#6366f1', '#ef4444']  # Verde para alocado, azul para estoque, vermelho para Descartado
     
@@ -2707,15 +2576,7 @@ def update_equipamentos_por_status(n, refresh_clicks):
     )])
     
     fig.update_layout(
-        title=dict(
-            text='<b>Status dos Equipamentos</b>',
-            font=dict(size=18, color='#1e1e1e', family='Inter'),
-            x=0.5,
-            y=0.95
-        ),
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#1e1e1e', size=12, family='Inter'),
+        title='<b>Status dos Equipamentos</b>',
         showlegend=True,
         legend=dict(
             orientation="h",
@@ -2726,7 +2587,6 @@ def update_equipamentos_por_status(n, refresh_clicks):
             font=dict(size=11)
         ),
         margin=dict(t=60, b=60, l=20, r=20),
-        height=400,
         annotations=[
             dict(
                 text="<b>Total<br>Equipamentos</b>",
@@ -2740,20 +2600,24 @@ def update_equipamentos_por_status(n, refresh_clicks):
     
     return fig
 
-@app.callback(
-    Output('equipamentos-criticidade', 'figure'),
-    [Input('interval-equipamentos', 'n_intervals'),
-     Input('refresh-btn-equip', 'n_clicks')]
+@callback(
+    [Output('equipamentos-criticidade', 'figure'), output_hash('equipamentos-criticidade')],
+    [Input('snapshot-version', 'data'),
+     Input('refresh-btn-equip', 'n_clicks')],
+    [last_output_hash('equipamentos-criticidade')]
 )
+@skip_unchanged_output
 def update_equipamentos_criticidade(n, refresh_clicks):
+    skip_unless_changed('equipamentos_criticidade')
     df = calcular_criticidade_equipamentos()
-    
+    # Só a contagem por nível entra no gráfico (e na chave do cache)
+    criticidade = df[['Criticidade']] if not df.empty else df
+    return build_equipamentos_criticidade_figure(criticidade)
+
+@cached_figure
+def build_equipamentos_criticidade_figure(df):
     if df.empty:
-        return go.Figure().add_annotation(
-            text="Sem dados de idade disponíveis", 
-            showarrow=False,
-            font=dict(size=16, color='#6c757d')
-        )
+        return empty_figure("Sem dados de idade disponíveis")
     
     # Contar equipamentos por criticidade (Sem Dados já foi removido pela função calcular_criticidade_equipamentos)
     criticidade_counts = df['Criticidade'].value_counts()
@@ -2787,46 +2651,26 @@ def update_equipamentos_criticidade(n, refresh_clicks):
     )])
     
     fig.update_layout(
-        title=dict(
-            text='<b>Análise de Criticidade por Idade</b>',
-            font=dict(size=18, color='#1e1e1e', family='Inter'),
-            x=0.5,
-            y=0.95
-        ),
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#1e1e1e', size=12, family='Inter'),
-        showlegend=True,
-        legend=dict(
-            orientation="v",
-            yanchor="middle",
-            y=0.5,
-            xanchor="left",
-            x=1.05,
-            font=dict(size=10)
-        ),
-        margin=dict(t=60, b=40, l=40, r=150),
-        height=400,
-        annotations=[
-            dict(
-                text="<b>Total<br>Analisados</b>",
-                x=0.5, y=0.5,
-                font_size=14,
-                font_color='#6c757d',
-                showarrow=False
-            )
-        ]
+        title='<b>Análise de Criticidade por Idade</b>',
+        **donut_legend_layout("<b>Total<br>Analisados</b>")
     )
     
     return fig
 
-@app.callback(
-    Output('equipamentos-criticos-table', 'children'),
-    [Input('interval-equipamentos', 'n_intervals'),
-     Input('refresh-btn-equip', 'n_clicks')]
+@callback(
+    [Output('equipamentos-criticos-table', 'children'), output_hash('equipamentos-criticos-table')],
+    [Input('snapshot-version', 'data'),
+     Input('refresh-btn-equip', 'n_clicks')],
+    [last_output_hash('equipamentos-criticos-table')],
+    **background_table_options('equipamentos-criticos-table')
 )
-def update_equipamentos_criticos_table(n, refresh_clicks):
+@skip_unchanged_output
+def update_equipamentos_criticos_table(set_progress, n, refresh_clicks):
+    start_background_job()
+    skip_unless_changed('equipamentos_criticidade')
+    set_progress((10, "Carregando equipamentos..."))
     df = calcular_criticidade_equipamentos()
+    set_progress((60, "Calculando criticidade..."))
     
     if df.empty:
         return html.P("Sem dados de idade disponíveis", 
@@ -2844,97 +2688,41 @@ def update_equipamentos_criticos_table(n, refresh_clicks):
         return html.P("Nenhum equipamento crítico encontrado! 🎉", 
                      style={'text-align': 'center', 'color': '#28a745', 'fontWeight': '600'})
     
-    return dash_table.DataTable(
-        data=df_criticos.to_dict('records'),
-        columns=[
-            {"name": "Serial", "id": "Serial"},
-            {"name": "Modelo", "id": "Modelo"},
-            {"name": "Idade", "id": "IdadeFormatada"},
-            {"name": "Criticidade", "id": "Criticidade"},
-            {"name": "Status", "id": "Status"},
-            {"name": "Usuário", "id": "Usuario"},
-            {"name": "Colaborador", "id": "NomeColaborador"}
+    return create_data_table(
+        df_criticos,
+        [
+            ("Serial", "Serial"),
+            ("Modelo", "Modelo"),
+            ("Idade", "IdadeFormatada"),
+            ("Criticidade", "Criticidade"),
+            ("Status", "Status"),
+            ("Usuário", "Usuario"),
+            ("Colaborador", "NomeColaborador")
         ],
-        style_table={
-            'overflowX': 'auto',
-            'maxWidth': '100%',
-            'borderRadius': '8px',
-            'overflow': 'hidden'
-        },
-        style_cell={
-            'textAlign': 'left',
-            'padding': '12px 16px',
-            'fontFamily': 'Segoe UI, sans-serif',
-            'fontSize': '0.875rem',
-            'whiteSpace': 'normal',
-            'height': 'auto',
-            'border': 'none',
-            'borderBottom': '1px solid #e9ecef'
-        },
-        style_header={
-            'backgroundColor': '#dc3545',
-            'color': 'white',
-            'fontWeight': '600',
-            'textTransform': 'uppercase',
-            'letterSpacing': '0.5px',
-            'fontSize': '0.8rem',
-            'border': 'none'
-        },
-        style_data={
-            'backgroundColor': '#ffffff',
-            'border': 'none'
-        },
-        style_data_conditional=[
-            {
-                'if': {'row_index': 'odd'},
-                'backgroundColor': '#f8f9fa'
-            },
-            {
-                'if': {'filter_query': 'Criticidade = "Muito Crítico"'},
-                'backgroundColor': '#f8d7da',
-                'color': '#721c24',
-                'fontWeight': '600'
-            },
-            {
-                'if': {'filter_query': 'Criticidade = "Crítico"'},
-                'backgroundColor': '#ffeaa7',
-                'color': '#856404',
-                'fontWeight': '600'
-            },
-            {
-                'if': {'filter_query': 'Criticidade = "Atenção"'},
-                'backgroundColor': '#fff3cd',
-                'color': '#856404'
-            },
-            {
-                'if': {'state': 'active'},
-                'backgroundColor': 'rgba(99, 102, 241, 0.1)',
-                'border': '1px solid #6366f1'
-            }
+        variant='danger',
+        highlights=[
+            ('Criticidade = "Muito Crítico"', {'backgroundColor': '#f8d7da', 'color': '#721c24', 'fontWeight': '600'}),
+            ('Criticidade = "Crítico"', {'backgroundColor': '#ffeaa7', 'color': '#856404', 'fontWeight': '600'}),
+            ('Criticidade = "Atenção"', {'backgroundColor': '#fff3cd', 'color': '#856404'})
         ],
-        filter_action="native",
-        sort_action="native",
-        page_action="native",
-        page_current=0,
         page_size=25
     )
 
-@app.callback(
-    Output('equipamentos-por-modelo-full', 'figure'),
-    [Input('interval-equipamentos', 'n_intervals'),
-     Input('refresh-btn-equip', 'n_clicks')]
+@callback(
+    [Output('equipamentos-por-modelo-full', 'figure'), output_hash('equipamentos-por-modelo-full')],
+    [Input('snapshot-version', 'data'),
+     Input('refresh-btn-equip', 'n_clicks')],
+    [last_output_hash('equipamentos-por-modelo-full')]
 )
+@skip_unchanged_output
 def update_equipamentos_por_modelo_full(n, refresh_clicks):
-    df = execute_query(QUERIES['computadores_por_modelo'])
+    skip_unless_changed('computadores_por_modelo')
+    df = snapshot_df('computadores_por_modelo')
     
     if df.empty:
-        return go.Figure().add_annotation(
-            text="Sem dados disponíveis", 
-            showarrow=False,
-            font=dict(size=16, color='#6c757d')
-        )
+        return empty_figure("Sem dados disponíveis")
     
-    df_top = df.head(15)
+    df_top = catalogo.annotate(df.head(15))
     
     colors = ['#6366f1', '#8b5cf6', '#ec4899', '#ef4444', '#f97316', '#eab308', '#22c55e', '#06b6d4', '#84cc16', '#f59e0b', '#8b5a2b', '#6b21a8', '#dc2626', '#059669', '#0284c7']
     
@@ -2943,128 +2731,70 @@ def update_equipamentos_por_modelo_full(n, refresh_clicks):
             y=df_top['Modelo'], 
             x=df_top['quantidade'],
             orientation='h',
+            customdata=df_top[['Fabricante', 'Propriedade']],
             marker=dict(
                 color=colors[:len(df_top)],
                 line=dict(color='rgba(255,255,255,0.8)', width=2)
             ),
-            hovertemplate='<b>%{y}</b><br>Quantidade: %{x}<extra></extra>'
+            hovertemplate='<b>%{y}</b><br>%{customdata[0]} · %{customdata[1]}<br>Quantidade: %{x}<extra></extra>'
         )
     ])
     
     fig.update_layout(
-        title=dict(
-            text='<b>Top 15 Modelos de Equipamentos</b>',
-            font=dict(size=18, color='#1e1e1e', family='Inter'),
-            x=0.5,
-            y=0.95
-        ),
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#1e1e1e', size=12, family='Inter'),
+        title='<b>Top 15 Modelos de Equipamentos</b>',
         showlegend=False,
         margin=dict(t=60, b=60, l=200, r=40),
-        height=400,
         xaxis=dict(
             showgrid=True,
-            gridcolor='rgba(233,236,239,0.5)',
-            title=dict(text='<b>Quantidade</b>', font=dict(size=14)),
-            linecolor='#e9ecef'
+            title='<b>Quantidade</b>'
         ),
         yaxis=dict(
             showgrid=False,
-            title=dict(text='<b>Modelo</b>', font=dict(size=14)),
-            linecolor='#e9ecef',
+            title='<b>Modelo</b>',
             tickfont=dict(size=9)
         )
     )
     
     return fig
 
-@app.callback(
-    Output('equipamentos-detalhado-table', 'children'),
-    [Input('interval-equipamentos', 'n_intervals'),
-     Input('refresh-btn-equip', 'n_clicks')]
+@callback(
+    [Output('equipamentos-detalhado-table', 'children'), output_hash('equipamentos-detalhado-table')],
+    [Input('snapshot-version', 'data'),
+     Input('refresh-btn-equip', 'n_clicks')],
+    [last_output_hash('equipamentos-detalhado-table')],
+    **background_table_options('equipamentos-detalhado-table')
 )
-def update_equipamentos_detalhado_table(n, refresh_clicks):
-    df = execute_query(QUERIES['equipamentos_detalhado'])
+@skip_unchanged_output
+def update_equipamentos_detalhado_table(set_progress, n, refresh_clicks):
+    start_background_job()
+    skip_unless_changed('equipamentos_detalhado')
+    set_progress((10, "Carregando equipamentos..."))
+    df = snapshot_df('equipamentos_detalhado')
+    set_progress((60, "Montando tabela..."))
     
     if df.empty:
         return html.P("Nenhum equipamento encontrado", 
                      style={'text-align': 'center', 'color': '#6c757d', 'fontStyle': 'italic'})
     
-    return dash_table.DataTable(
-        data=df.to_dict('records'),
-        columns=[
-            {"name": "Serial", "id": "Serial"},
-            {"name": "Modelo", "id": "Modelo"},
-            {"name": "Usuário", "id": "Usuario"},
-            {"name": "Matrícula", "id": "Matricula"},
-            {"name": "Colaborador", "id": "NomeColaborador"},
-            {"name": "Status", "id": "Status"}
+    return create_data_table(
+        df,
+        [
+            ("Serial", "Serial"),
+            ("Modelo", "Modelo"),
+            ("Usuário", "Usuario"),
+            ("Matrícula", "Matricula"),
+            ("Colaborador", "NomeColaborador"),
+            ("Status", "Status")
         ],
-        style_table={
-            'overflowX': 'auto',
-            'maxWidth': '100%',
-            'borderRadius': '8px',
-            'overflow': 'hidden'
-        },
-        style_cell={
-            'textAlign': 'left',
-            'padding': '12px 16px',
-            'fontFamily': 'Segoe UI, sans-serif',
-            'fontSize': '0.875rem',
-            'whiteSpace': 'normal',
-            'height': 'auto',
-            'border': 'none',
-            'borderBottom': '1px solid #e9ecef'
-        },
-        style_header={
-            'backgroundColor': '#1e1e1e',
-            'color': 'white',
-            'fontWeight': '600',
-            'textTransform': 'uppercase',
-            'letterSpacing': '0.5px',
-            'fontSize': '0.8rem',
-            'border': 'none'
-        },
-        style_data={
-            'backgroundColor': '#ffffff',
-            'border': 'none'
-        },
-        style_data_conditional=[
-            {
-                'if': {'row_index': 'odd'},
-                'backgroundColor': '#f8f9fa'
-            },
-            {
-                'if': {'filter_query': 'Status = "Estoque"'},
-                'backgroundColor': '#cff4fc',
-                'color': '#055160'
-            },
-            {
-                'if': {'filter_query': 'Status = "Alocado"'},
-                'backgroundColor': '#d1edff',
-                'color': '#0c5460'
-            },
-            {
-                'if': {'filter_query': 'Status = "Descartado"'},
-                'backgroundColor': '#fff3cd',
-                'color': '#856404'
-            },
-            {
-                'if': {'state': 'active'},
-                'backgroundColor': 'rgba(99, 102, 241, 0.1)',
-                'border': '1px solid #6366f1'
-            }
+        highlights=[
+            ('Status = "Estoque"', {'backgroundColor': '#cff4fc', 'color': '#055160'}),
+            ('Status = "Alocado"', {'backgroundColor': '#d1edff', 'color': '#0c5460'}),
+            ('Status = "Descartado"', {'backgroundColor': '#fff3cd', 'color': '#856404'})
         ],
-        filter_action="native",
-        sort_action="native",
-        page_action="native",
-        page_current=0,
         page_size=50
     )
 
-@app.callback(
+@callback(
     Output('connection-status', 'children'),
     [Input('test-connection-btn', 'n_clicks')]
 )
@@ -3105,21 +2835,20 @@ if __name__ == '__main__':
 
 # ==================== CALLBACKS PARA REDUÇÃO DE CUSTOS ====================
 
-@app.callback(
-    Output('custos-por-setor', 'figure'),
-    [Input('interval-equipamentos', 'n_intervals'),
-     Input('refresh-btn-equip', 'n_clicks')]
+@callback(
+    [Output('custos-por-setor', 'figure'), output_hash('custos-por-setor')],
+    [Input('snapshot-version', 'data'),
+     Input('refresh-btn-equip', 'n_clicks')],
+    [last_output_hash('custos-por-setor')]
 )
+@skip_unchanged_output
 def update_custos_por_setor(n, refresh_clicks):
     """Atualiza gráfico de análise de custos por setor"""
-    df = execute_query(QUERIES['custos_por_setor'])
+    skip_unless_changed('custos_por_setor')
+    df = snapshot_df('custos_por_setor')
     
     if df.empty:
-        return go.Figure().add_annotation(
-            text="Sem dados disponíveis", 
-            showarrow=False,
-            font=dict(size=16, color='#6c757d')
-        )
+        return empty_figure("Sem dados disponíveis")
     
     # Top 10 setores
     df_top = df.head(10)
@@ -3159,15 +2888,7 @@ def update_custos_por_setor(n, refresh_clicks):
     ))
     
     fig.update_layout(
-        title=dict(
-            text='<b>Análise de Custos e Eficiência por Setor</b>',
-            font=dict(size=18, color='#1e1e1e', family='Inter'),
-            x=0.5,
-            y=0.95
-        ),
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#1e1e1e', size=12, family='Inter'),
+        title='<b>Análise de Custos e Eficiência por Setor</b>',
         legend=dict(
             orientation="h",
             yanchor="bottom",
@@ -3179,20 +2900,17 @@ def update_custos_por_setor(n, refresh_clicks):
         height=500,
         xaxis=dict(
             showgrid=False,
-            title=dict(text='<b>Setor</b>', font=dict(size=14)),
-            linecolor='#e9ecef',
+            title='<b>Setor</b>',
             tickangle=-45
         ),
         yaxis=dict(
             showgrid=True,
-            gridcolor='rgba(233,236,239,0.5)',
-            title=dict(text='<b>Quantidade</b>', font=dict(size=14)),
-            linecolor='#e9ecef',
+            title='<b>Quantidade</b>',
             side='left'
         ),
         yaxis2=dict(
             showgrid=False,
-            title=dict(text='<b>Equipamento/Colaborador</b>', font=dict(size=14)),
+            title='<b>Equipamento/Colaborador</b>',
             overlaying='y',
             side='right',
             linecolor='#ef4444',
@@ -3202,37 +2920,23 @@ def update_custos_por_setor(n, refresh_clicks):
     
     return fig
 
-@app.callback(
-    Output('equipamentos-status-chart', 'figure'),
-    [Input('interval-equipamentos', 'n_intervals'),
-     Input('refresh-btn-equip', 'n_clicks')]
+@callback(
+    [Output('equipamentos-status-chart', 'figure'), output_hash('equipamentos-status-chart')],
+    [Input('snapshot-version', 'data'),
+     Input('refresh-btn-equip', 'n_clicks')],
+    [last_output_hash('equipamentos-status-chart')]
 )
+@skip_unchanged_output
 def update_equipamentos_status_chart(n, refresh_clicks):
     """Atualiza gráfico de equipamentos por status real"""
-    df = execute_query(QUERIES['equipamentos_por_status_real'])
+    import plotly.express as px
+    skip_unless_changed('equipamentos_por_status_real')
+    df = snapshot_df('equipamentos_por_status_real')
     
     if df.empty:
-        return go.Figure().add_annotation(
-            text="Sem dados disponíveis", 
-            showarrow=False,
-            font=dict(size=16, color='#6c757d')
-        )
-    
-    # Cores específicas para cada status
-    color_map = {
-        'Em Uso': '#28a745',
-        'Em Estoque': '#007bff', 
-        'Acesso Remoto': '#6f42c1',
-        'Devolvido': '#20c997',
-        'Descartado': '#dc3545',
-        'Danificado': '#fd7e14',
-        'Extraviado': '#ffc107',
-        'Roubado': '#6c757d',
-        'Sem Status': '#e9ecef',
-        'Sem Dono': '#868e96'
-    }
+        return empty_figure("Sem dados disponíveis")
     
-    colors = [color_map.get(status, '#6c757d') for status in df['Status']]
+    colors = cores_status(df['Status'])
     
     fig = px.pie(
         df, 
@@ -3250,14 +2954,8 @@ def update_equipamentos_status_chart(n, refresh_clicks):
     )
     
     fig.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#1e1e1e', size=10, family='Inter'),
-        title=dict(
-            font=dict(size=14, color='#1e1e1e', family='Inter'),
-            x=0.5,
-            y=0.95
-        ),
+        font=dict(size=10),
+        title=dict(font=dict(size=14)),
         showlegend=True,
         legend=dict(
             orientation="v",
@@ -3268,55 +2966,28 @@ def update_equipamentos_status_chart(n, refresh_clicks):
             font=dict(size=9)
         ),
         margin=dict(t=40, b=20, l=20, r=150),
-        height=400
     )
     
     return fig
 
-@app.callback(
-    Output('equipamentos-status-resumo', 'children'),
-    [Input('interval-equipamentos', 'n_intervals'),
-     Input('refresh-btn-equip', 'n_clicks')]
+@callback(
+    [Output('equipamentos-status-resumo', 'children'), output_hash('equipamentos-status-resumo')],
+    [Input('snapshot-version', 'data'),
+     Input('refresh-btn-equip', 'n_clicks')],
+    [last_output_hash('equipamentos-status-resumo')]
 )
+@skip_unchanged_output
 def update_equipamentos_status_resumo(n, refresh_clicks):
     """Atualiza resumo de equipamentos por status"""
-    df = execute_query(QUERIES['equipamentos_por_status_real'])
+    skip_unless_changed('equipamentos_por_status_real')
+    df = snapshot_df('equipamentos_por_status_real')
     
     if df.empty:
         return html.Div("Sem dados disponíveis", style={'color': '#6c757d', 'fontStyle': 'italic'})
     
     cards = []
-    color_map = {
-        'Em Uso': '#28a745',
-        'Em Estoque': '#007bff', 
-        'Acesso Remoto': '#6f42c1',
-        'Devolvido': '#20c997',
-        'Descartado': '#dc3545',
-        'Danificado': '#fd7e14',
-        'Extraviado': '#ffc107',
-        'Roubado': '#6c757d',
-        'Reparo': '#ff6b35',
-        'Status Indefinido': '#e9ecef'
-    }
-    
-    icon_map = {
-        'Em Uso': '✅',
-        'Em Estoque': '📦',
-        'Acesso Remoto': '🌐',
-        'Devolvido': '↩️',
-        'Descartado': '🗑️',
-        'Danificado': '🔧',
-        'Extraviado': '❓',
-        'Roubado': '🚨',
-        'Reparo': '🔧',
-        'Sem Status': '❗',
-        'Sem Dono': '❗',
-        'Status Indefinido': '❗'
-    }
-    
     for _, row in df.iterrows():
-        color = color_map.get(row['Status'], '#6c757d')
-        icon = icon_map.get(row['Status'], '📊')
+        icon = ICONES_STATUS[row['Status']]
         
         card = html.Div([
             html.Div([
@@ -3358,14 +3029,20 @@ def update_equipamentos_status_resumo(n, refresh_clicks):
     
     return html.Div(cards, style={'display': 'grid', 'gridTemplateColumns': 'repeat(auto-fit, minmax(120px, 1fr))', 'gap': '0.5rem'})
 
-@app.callback(
-    Output('equipamentos-criticos-status-chart', 'figure'),
-    [Input('interval-equipamentos', 'n_intervals'),
-     Input('refresh-btn-equip', 'n_clicks')]
+@callback(
+    [Output('equipamentos-criticos-status-chart', 'figure'), output_hash('equipamentos-criticos-status-chart')],
+    [Input('snapshot-version', 'data'),
+     Input('refresh-btn-equip', 'n_clicks')],
+    [last_output_hash('equipamentos-criticos-status-chart')]
 )
+@skip_unchanged_output
 def update_equipamentos_criticos_status_chart(n, refresh_clicks):
     """Atualiza gráfico de equipamentos críticos por status"""
-    df = execute_query(QUERIES['equipamentos_criticos_por_status'])
+    skip_unless_changed('equipamentos_por_status_real')
+    df = snapshot_df('equipamentos_por_status_real')
+    # Mesma distribuição do resumo e do gráfico de status, só os códigos críticos
+    if not df.empty:
+        df = df[df['StatusNumerico'].isin(STATUS_CRITICOS)].sort_values('Quantidade', ascending=False)
     
     if df.empty:
         return go.Figure().add_annotation(
@@ -3374,168 +3051,98 @@ def update_equipamentos_criticos_status_chart(n, refresh_clicks):
             font=dict(size=16, color='#28a745')
         )
     
-    colors = ['#dc3545', '#fd7e14', '#ffc107', '#6c757d', '#e9ecef']
-    
     fig = go.Figure()
     
     # Barras de quantidade
     fig.add_trace(go.Bar(
-        x=df['StatusCritico'],
+        x=df['Status'],
         y=df['Quantidade'],
         name='Quantidade',
-        marker=dict(color=colors[:len(df)]),
+        marker=dict(color=cores_status(df['Status'])),
         text=df['Quantidade'],
         textposition='outside',
-        hovertemplate='<b>%{x}</b><br>Quantidade: %{y}<br>Idade Média: %{customdata:.1f} anos<extra></extra>',
-        customdata=df['IdadeMedia']
+        hovertemplate='<b>%{x}</b><br>Quantidade: %{y}<extra></extra>'
     ))
     
     fig.update_layout(
-        title=dict(
-            text='<b>Equipamentos em Situação Crítica</b>',
-            font=dict(size=16, color='#1e1e1e', family='Inter'),
-            x=0.5,
-            y=0.95
-        ),
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#1e1e1e', size=12, family='Inter'),
+        title=dict(text='<b>Equipamentos em Situação Crítica</b>', font=dict(size=16)),
         showlegend=False,
         margin=dict(t=60, b=60, l=60, r=40),
         height=350,
         xaxis=dict(
             showgrid=False,
-            title=dict(text='<b>Status</b>', font=dict(size=14)),
-            linecolor='#e9ecef'
+            title='<b>Status</b>'
         ),
         yaxis=dict(
             showgrid=True,
-            gridcolor='rgba(233,236,239,0.5)',
-            title=dict(text='<b>Quantidade</b>', font=dict(size=14)),
-            linecolor='#e9ecef'
+            title='<b>Quantidade</b>'
         )
     )
     
     return fig
 
-@app.callback(
-    Output('equipamentos-status-table', 'children'),
-    [Input('interval-equipamentos', 'n_intervals'),
-     Input('refresh-btn-equip', 'n_clicks')]
+@callback(
+    [Output('equipamentos-status-table', 'children'), output_hash('equipamentos-status-table')],
+    [Input('snapshot-version', 'data'),
+     Input('refresh-btn-equip', 'n_clicks')],
+    [last_output_hash('equipamentos-status-table')],
+    **background_table_options('equipamentos-status-table')
 )
-def update_equipamentos_status_table(n, refresh_clicks):
+@skip_unchanged_output
+def update_equipamentos_status_table(set_progress, n, refresh_clicks):
     """Atualiza tabela detalhada de equipamentos por status"""
-    df = execute_query(QUERIES['equipamentos_detalhado_status'])
+    start_background_job()
+    skip_unless_changed('equipamentos_detalhado_status')
+    set_progress((10, "Carregando equipamentos..."))
+    df = snapshot_df('equipamentos_detalhado_status')
+    set_progress((60, "Montando tabela..."))
     
     if df.empty:
         return html.P("Nenhum equipamento encontrado", 
                      style={'text-align': 'center', 'color': '#6c757d', 'fontStyle': 'italic'})
     
-    return dash_table.DataTable(
-        data=df.to_dict('records'),
-        columns=[
-            {"name": "Serial", "id": "Serial"},
-            {"name": "Modelo", "id": "Modelo"}, 
-            {"name": "Status", "id": "StatusRealizado"},
-            {"name": "Campo Usuário", "id": "Usuario"},
-            {"name": "Matrícula", "id": "Matricula"},
-            {"name": "Colaborador", "id": "NomeColaborador"},
-            {"name": "Setor", "id": "Setor"},
-            {"name": "Idade (Anos)", "id": "IdadeAnos"}
+    return create_data_table(
+        df,
+        [
+            ("Serial", "Serial"),
+            ("Modelo", "Modelo"),
+            ("Status", "StatusRealizado"),
+            ("Campo Usuário", "Usuario"),
+            ("Matrícula", "Matricula"),
+            ("Colaborador", "NomeColaborador"),
+            ("Setor", "Setor"),
+            ("Idade (Anos)", "IdadeAnos")
         ],
-        style_table={
-            'overflowX': 'auto',
-            'maxWidth': '100%',
-            'borderRadius': '8px',
-            'overflow': 'hidden'
-        },
-        style_cell={
-            'textAlign': 'left',
-            'padding': '10px 12px',
-            'fontFamily': 'Segoe UI, sans-serif',
-            'fontSize': '0.85rem',
-            'whiteSpace': 'normal',
-            'height': 'auto',
-            'border': 'none',
-            'borderBottom': '1px solid #e9ecef'
-        },
-        style_header={
-            'backgroundColor': '#1e1e1e',
-            'color': 'white',
-            'fontWeight': '600',
-            'textTransform': 'uppercase',
-            'letterSpacing': '0.5px',
-            'fontSize': '0.75rem',
-            'border': 'none'
-        },
-        style_data={
-            'backgroundColor': '#ffffff',
-            'border': 'none'
-        },
-        style_data_conditional=[
-            {
-                'if': {'row_index': 'odd'},
-                'backgroundColor': '#f8f9fa'
-            },
-            {
-                'if': {'filter_query': 'StatusRealizado = "Descartado"'},
-                'backgroundColor': '#f8d7da',
-                'color': '#721c24'
-            },
-            {
-                'if': {'filter_query': 'StatusRealizado = "Danificado"'},
-                'backgroundColor': '#fff3cd',
-                'color': '#856404'
-            },
-            {
-                'if': {'filter_query': 'StatusRealizado = "Extraviado"'},
-                'backgroundColor': '#fff3cd',
-                'color': '#856404'
-            },
-            {
-                'if': {'filter_query': 'StatusRealizado = "Roubado"'},
-                'backgroundColor': '#f8d7da',
-                'color': '#721c24'
-            },
-            {
-                'if': {'filter_query': 'StatusRealizado = "Em Estoque"'},
-                'backgroundColor': '#d1ecf1',
-                'color': '#0c5460'
-            },
-            {
-                'if': {'filter_query': 'StatusRealizado = "Alocado"'},
-                'backgroundColor': '#d4edda',
-                'color': '#155724'
-            },
-            {
-                'if': {'state': 'active'},
-                'backgroundColor': 'rgba(30, 30, 30, 0.1)',
-                'border': '1px solid #1e1e1e'
-            }
+        variant='compact',
+        highlights=[
+            ('StatusRealizado = "Descartado"', {'backgroundColor': '#f8d7da', 'color': '#721c24'}),
+            ('StatusRealizado = "Danificado"', {'backgroundColor': '#fff3cd', 'color': '#856404'}),
+            ('StatusRealizado = "Extraviado"', {'backgroundColor': '#fff3cd', 'color': '#856404'}),
+            ('StatusRealizado = "Roubado"', {'backgroundColor': '#f8d7da', 'color': '#721c24'}),
+            ('StatusRealizado = "Em Estoque"', {'backgroundColor': '#d1ecf1', 'color': '#0c5460'}),
+            ('StatusRealizado = "Alocado"', {'backgroundColor': '#d4edda', 'color': '#155724'})
         ],
-        filter_action="native",
-        sort_action="native",
-        page_action="native",
-        page_current=0,
         page_size=25,
-        tooltip_data=[
-            {
-                'StatusRealizado': {'value': 'Status atual do equipamento no sistema', 'type': 'markdown'},
-                'Usuario': {'value': 'Campo Usuario na base de dados', 'type': 'markdown'},
-                'IdadeAnos': {'value': 'Idade em anos desde a compra', 'type': 'markdown'}
-            } for _ in range(len(df))
-        ],
+        # Mesmo tooltip para a coluna inteira (antes era repetido em cada linha)
+        tooltip={
+            'StatusRealizado': {'value': 'Status atual do equipamento no sistema', 'type': 'markdown'},
+            'Usuario': {'value': 'Campo Usuario na base de dados', 'type': 'markdown'},
+            'IdadeAnos': {'value': 'Idade em anos desde a compra', 'type': 'markdown'}
+        },
         tooltip_duration=None
     )
 
-@app.callback(
-    Output('timeline-reducao-chart', 'figure'),
+@callback(
+    [Output('timeline-reducao-chart', 'figure'), output_hash('timeline-reducao-chart')],
     [Input('refresh-btn-reducao', 'n_clicks'),
-     Input('interval-reducao-custos', 'n_intervals')]
+     Input('snapshot-version', 'data')],
+    [last_output_hash('timeline-reducao-chart')]
 )
+@skip_unchanged_output
 def update_timeline_reducao_chart(refresh_clicks, n):
     """Atualiza gráfico de evolução da redução de custos"""
-    df = load_desligamento_data()
+    skip_unless_changed('desligamento')
+    df = snapshot_df('desligamento')
     if df is None:
         return {}
     
@@ -3552,11 +3159,7 @@ def update_timeline_reducao_chart(refresh_clicks, n):
             x=0.5, y=0.5, showarrow=False,
             font=dict(size=16, color="#666")
         )
-        fig.update_layout(
-            plot_bgcolor='white',
-            paper_bgcolor='white',
-            height=400
-        )
+        fig.update_layout(template='portal_claro')
         return fig
     
     devolvidos = devolvidos.dropna(subset=['Data_Devolucao']).sort_values('Data_Devolucao')
@@ -3579,24 +3182,24 @@ def update_timeline_reducao_chart(refresh_clicks, n):
         title="Evolução da Redução de Custos",
         xaxis_title="Data de Devolução",
         yaxis_title="Custo Mensal (R$)",
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        height=400,
-        font=dict(size=12),
-        yaxis=dict(tickformat=',.0f', gridcolor='#f0f0f0'),
-        xaxis=dict(gridcolor='#f0f0f0')
+        template='portal_claro',
+        yaxis=dict(tickformat=',.0f')
     )
     
     return fig
 
-@app.callback(
-    Output('status-reducao-pie-chart', 'figure'),
+@callback(
+    [Output('status-reducao-pie-chart', 'figure'), output_hash('status-reducao-pie-chart')],
     [Input('refresh-btn-reducao', 'n_clicks'),
-     Input('interval-reducao-custos', 'n_intervals')]
+     Input('snapshot-version', 'data')],
+    [last_output_hash('status-reducao-pie-chart')]
 )
+@skip_unchanged_output
 def update_status_reducao_pie(refresh_clicks, n):
     """Atualiza gráfico de pizza dos status"""
-    df = load_desligamento_data()
+    import plotly.express as px
+    skip_unless_changed('desligamento')
+    df = snapshot_df('desligamento')
     if df is None:
         return {}
     
@@ -3620,21 +3223,22 @@ def update_status_reducao_pie(refresh_clicks, n):
     
     fig.update_layout(
         title="Distribuição dos Equipamentos",
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        height=400
+        template='portal_claro'
     )
     
     return fig
 
-@app.callback(
-    Output('tipo-reducao-bar-chart', 'figure'),
+@callback(
+    [Output('tipo-reducao-bar-chart', 'figure'), output_hash('tipo-reducao-bar-chart')],
     [Input('refresh-btn-reducao', 'n_clicks'),
-     Input('interval-reducao-custos', 'n_intervals')]
+     Input('snapshot-version', 'data')],
+    [last_output_hash('tipo-reducao-bar-chart')]
 )
+@skip_unchanged_output
 def update_tipo_reducao_bar(refresh_clicks, n):
     """Atualiza gráfico de barras por tipo de equipamento"""
-    df = load_desligamento_data()
+    skip_unless_changed('desligamento')
+    df = snapshot_df('desligamento')
     if df is None:
         return {}
     
@@ -3660,22 +3264,24 @@ def update_tipo_reducao_bar(refresh_clicks, n):
         title="Economia Mensal por Tipo de Equipamento",
         xaxis_title="Economia Mensal (R$)",
         yaxis_title="Tipo de Equipamento",
-        plot_bgcolor='white',
-        paper_bgcolor='white',
+        template='portal_claro',
         height=500,
         margin=dict(l=150)
     )
     
     return fig
 
-@app.callback(
-    Output('reducao-data-table', 'children'),
+@callback(
+    [Output('reducao-data-table', 'children'), output_hash('reducao-data-table')],
     [Input('refresh-btn-reducao', 'n_clicks'),
-     Input('interval-reducao-custos', 'n_intervals')]
+     Input('snapshot-version', 'data')],
+    [last_output_hash('reducao-data-table')]
 )
+@skip_unchanged_output
 def update_reducao_data_table(refresh_clicks, n):
     """Atualiza tabela detalhada de redução de custos"""
-    df = load_desligamento_data()
+    skip_unless_changed('desligamento')
+    df = snapshot_df('desligamento')
     if df is None:
         return html.Div("Dados não disponíveis")
     
@@ -3715,47 +3321,33 @@ def update_reducao_data_table(refresh_clicks, n):
     
     return table
 
-@app.callback(
+@callback(
     Output('current-time-reducao', 'children'),
-    [Input('interval-reducao-custos', 'n_intervals')]
+    [Input('snapshot-version', 'data')]
 )
 def update_time_reducao(n):
     """Atualiza horário na aba de redução de custos"""
-    return datetime.now().strftime('%d/%m/%Y %H:%M:%S')
+    return snapshot_time()
 
-@app.callback(
-    Output('alerts-section', 'children'),
-    [Input('interval-component', 'n_intervals'),
-     Input('refresh-btn', 'n_clicks')]
+@callback(
+    [Output('alerts-section', 'children'), output_hash('alerts-section')],
+    [Input('snapshot-version', 'data'),
+     Input('refresh-btn', 'n_clicks')],
+    [last_output_hash('alerts-section')]
 )
+@skip_unchanged_output
 def update_alerts_section(n, refresh_clicks):
-    """Atualiza seção de alertas"""
-    df_alertas = execute_query(QUERIES['alertas_sistema'])
+    """Atualiza seção de alertas (calculada a partir das fontes dos KPIs, sem query própria)"""
+    skip_unless_changed(*ALERT_SOURCES)
+    alertas = compute_alerts()
     
-    if df_alertas.empty:
+    if not alertas:
         return [html.Div("Nenhum alerta no momento", style={'text-align': 'center', 'color': '#6c757d'})]
     
-    alerts = []
-    icon_map = {
-        'Colaboradores Demitidos com Equipamentos': 'fas fa-exclamation-triangle',
-        'Equipamentos Descartados/Danificados': 'fas fa-desktop',
-        'Colaboradores Ativos Sem Equipamento': 'fas fa-user-slash'
-    }
-    
-    for _, row in df_alertas.iterrows():
-        icon = icon_map.get(row['TipoAlerta'], 'fas fa-info-circle')
-        alert_card = create_alert_card(
-            row['TipoAlerta'],
-            row['Quantidade'],
-            row['Prioridade'],
-            icon
-        )
-        alerts.append(alert_card)
-    
-    return alerts
+    return [create_alert_card(titulo, quantidade, prioridade, icone) for titulo, quantidade, prioridade, icone in alertas]
 
 # ==================== CALLBACKS LINHAS MÓVEIS ====================
-@app.callback(
+@callback(
     Output('linhas-content', 'children'),
     Input('linhas-tabs', 'value')
 )
@@ -4086,6 +3678,7 @@ def create_linhas_com_uso_content():
 
 def create_linhas_metricas_content():
     """Cria conteúdo da aba de métricas"""
+    import plotly.express as px
     
     return html.Div([
         # Cards de métricas principais
@@ -4127,7 +3720,6 @@ def create_linhas_metricas_content():
                     ).update_layout(
                         font_family="Inter, sans-serif",
                         showlegend=True,
-                        height=400
                     )
                 )
             ], className="chart-card", style={'width': '48%', 'display': 'inline-block', 'marginRight': '2%'}),
@@ -4142,7 +3734,6 @@ def create_linhas_metricas_content():
                     ).update_layout(
                         font_family="Inter, sans-serif",
                         showlegend=False,
-                        height=400,
                         xaxis_title="Faixas de Consumo",
                         yaxis_title="Número de Linhas"
                     )
@@ -4151,5 +3742,30 @@ def create_linhas_metricas_content():
         ])
     ])
 
+# ==================== FÁBRICA DA APP ====================
+def create_app():
+    """
+    Monta a aplicação Dash: layout, rotas do servidor Flask e gerenciador dos
+    background callbacks. Os callbacks são globais (`dash.callback`) e valem
+    para qualquer app criada por esta função.
+    """
+    import diskcache  # Só o gerenciador dos background callbacks usa
+
+    app = dash.Dash(__name__,
+                    external_stylesheets=VENDOR_STYLESHEETS,
+                    compress=True,
+                    suppress_callback_exceptions=True,
+                    background_callback_manager=DiskcacheManager(diskcache.Cache(BACKGROUND_CACHE_DIR)))
+    app.index_string = INDEX_STRING
+    app.layout = create_app_layout()
+    app.server.after_request(cache_static_files)
+    app.server.add_url_rule('/api/snapshot/stream', view_func=snapshot_stream)
+    app.server.add_url_rule('/api/ready', view_func=readiness)
+    app.server.add_url_rule('/api/export/<key>.csv', view_func=export_query_csv)
+    return app
+
+app = create_app()
+server = app.server  # gunicorn app:server
+
 if __name__ == '__main__':
     app.run(debug=False, host='0.0.0.0', port=8050)
@@ -0,0 +1,17 @@
+// Recebe do servidor (SSE) as novas versões do snapshot de dados e repassa
+// para o Dash através do botão oculto #snapshot-push-trigger.
+(function () {
+    if (!window.EventSource) {
+        return;
+    }
+
+    var fonte = new EventSource('/api/snapshot/stream');
+
+    fonte.addEventListener('snapshot', function (evento) {
+        window.portalSnapshot = JSON.parse(evento.data);
+        var gatilho = document.getElementById('snapshot-push-trigger');
+        if (gatilho) {
+            gatilho.click();
+        }
+    });
+})();
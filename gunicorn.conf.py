@@ -0,0 +1,27 @@
+"""
+Configuração do Gunicorn (carregada automaticamente por `gunicorn app:server`).
+
+Com preload_app o master importa o app e executa o aquecimento uma única vez;
+os workers são criados por fork já com o snapshot carregado (compartilhado
+por copy-on-write) e só recriam as conexões e threads do próprio processo.
+"""
+import os
+
+bind = '0.0.0.0:8050'
+# Número de workers: variável de ambiente PORTAL_WORKERS (padrão 4); `-w` na linha de comando tem precedência
+workers = int(os.environ.get('PORTAL_WORKERS', '4'))
+worker_class = 'gthread'
+threads = 32
+preload_app = True
+
+
+def when_ready(server):
+    # Roda no master antes de criar os workers
+    if server.cfg.preload_app:
+        import app
+        app.warm_up()
+
+
+def post_fork(server, worker):
+    import app
+    app.init_worker()
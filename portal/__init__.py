@@ -0,0 +1 @@
+"""Portal do TI - módulos compartilhados pelo dashboard e pelos scripts de apoio."""
@@ -0,0 +1,148 @@
+"""
+Backends de cache do Portal do TI para resultados de queries, figuras e
+sondas do banco. A interface é a mesma nos dois:
+
+- MemoryCacheBackend: LRU em memória, vale só para o processo atual.
+- DiskCacheBackend: diskcache em disco local, compartilhado por todos os
+  workers do gunicorn no mesmo servidor.
+
+`get_or_compute` é single-flight: se vários threads ou processos pedirem a
+mesma chave ao mesmo tempo, só um calcula o valor e os demais esperam e leem
+o resultado do cache.
+"""
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+LOCK_EXPIRE_SECONDS = 300   # Libera o lock de um processo que morreu calculando uma chave
+
+
+def _sempre(valor):
+    return valor is not None
+
+
+class CacheBackend:
+    """Base dos backends: single-flight sobre get/set/lock das subclasses"""
+
+    def __init__(self):
+        self._locks_lock = threading.Lock()
+        self._locks = {}  # chave -> (lock, threads usando ou esperando)
+
+    @contextmanager
+    def _thread_lock(self, key):
+        """Lock da chave enquanto houver quem o use; depois sai do dicionário (as chaves não se repetem)"""
+        with self._locks_lock:
+            lock, usos = self._locks.get(key, (None, 0))
+            if lock is None:
+                lock = threading.Lock()
+            self._locks[key] = (lock, usos + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._locks_lock:
+                lock, usos = self._locks[key]
+                if usos == 1:
+                    del self._locks[key]
+                else:
+                    self._locks[key] = (lock, usos - 1)
+
+    def get_or_compute(self, key, compute, expire=None, store_if=_sempre):
+        """Lê `key` do cache ou calcula com `compute()` uma única vez entre os concorrentes"""
+        valor = self.get(key)
+        if valor is not None:
+            return valor
+        with self.lock(key):
+            valor = self.get(key)
+            if valor is None:
+                valor = compute()
+                if store_if(valor):
+                    self.set(key, valor, expire)
+        return valor
+
+    def reset(self):
+        """Recria os locks após um fork (podem ter sido copiados travados)"""
+        self._locks_lock = threading.Lock()
+        self._locks = {}
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Cache LRU do processo; locks por chave com threading.Lock"""
+
+    def __init__(self, maxsize=512):
+        super().__init__()
+        self.maxsize = maxsize
+        self._valores = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._valores.get(key)
+            if item is None:
+                return None
+            valor, expira = item
+            if expira is not None and expira < time.monotonic():
+                del self._valores[key]
+                return None
+            self._valores.move_to_end(key)
+            return valor
+
+    def set(self, key, valor, expire=None):
+        expira = None if expire is None else time.monotonic() + expire
+        with self._lock:
+            self._valores[key] = (valor, expira)
+            self._valores.move_to_end(key)
+            while len(self._valores) > self.maxsize:
+                self._valores.popitem(last=False)
+
+    def lock(self, key):
+        return self._thread_lock(key)
+
+    def reset(self):
+        super().reset()
+        self._lock = threading.Lock()
+
+
+class DiskCacheBackend(CacheBackend):
+    """
+    Cache em disco (diskcache/SQLite) compartilhado entre processos. Os locks
+    por chave são diskcache.Lock, visíveis a todos os workers; dentro de cada
+    processo um threading.Lock evita que vários threads fiquem girando no
+    mesmo lock de disco.
+    """
+
+    def __init__(self, directory, size_limit=512 * 1024 ** 2):
+        super().__init__()
+        self.directory = directory
+        self.size_limit = size_limit
+        self._cache = None
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            import diskcache
+
+            self._cache = diskcache.Cache(
+                self.directory, size_limit=self.size_limit, eviction_policy='least-recently-used'
+            )
+        return self._cache
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, valor, expire=None):
+        self.cache.set(key, valor, expire=expire)
+
+    @contextmanager
+    def lock(self, key):
+        import diskcache
+
+        with self._thread_lock(key):
+            with diskcache.Lock(self.cache, f'lock:{key}', expire=LOCK_EXPIRE_SECONDS):
+                yield
+
+    def reset(self):
+        """Após um fork, abre conexões novas com o SQLite do cache em vez de reusar as do pai"""
+        super().reset()
+        self._cache = None
@@ -0,0 +1,133 @@
+"""
+Catálogo de modelos de computador: fabricante, propriedade (próprio ou
+alugado), custo mensal de locação e vida útil de cada Modelo distinto.
+
+Cada modelo é classificado uma única vez e guardado em memória; as consultas
+seguintes são buscas em dicionário. Os valores vêm das regras abaixo e podem
+ser corrigidos pela planilha opcional `catalogo_modelos.xlsx` (colunas Modelo,
+Fabricante, Propriedade, CustoMensal, VidaUtilAnos), relida quando é alterada.
+"""
+import os
+import re
+import threading
+
+CATALOGO_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'catalogo_modelos.xlsx')
+
+# Nomes de fabricante no nome do modelo; conferidos antes das linhas de produto
+FABRICANTES = {
+    'SAMSUNG': 'Samsung', 'DELL': 'Dell', 'HP': 'HP', 'LENOVO': 'Lenovo', 'APPLE': 'Apple',
+    'POSITIVO': 'Positivo', 'ACER': 'Acer', 'ASUS': 'Asus'
+}
+# Linhas de produto, para modelos cadastrados sem o nome do fabricante
+LINHAS_PRODUTO = {
+    'LATITUDE': 'Dell', 'OPTIPLEX': 'Dell', 'VOSTRO': 'Dell', 'INSPIRON': 'Dell', 'PRECISION': 'Dell',
+    'ELITEBOOK': 'HP', 'PROBOOK': 'HP', 'ELITEDESK': 'HP', 'PRODESK': 'HP', 'COMPAQ': 'HP',
+    'THINKPAD': 'Lenovo', 'THINKCENTRE': 'Lenovo', 'IDEAPAD': 'Lenovo',
+    'MACBOOK': 'Apple', 'IMAC': 'Apple',
+    'ASPIRE': 'Acer', 'VIVOBOOK': 'Asus'
+}
+FABRICANTES_LOCACAO = {'Samsung'}  # Computadores desses fabricantes são alugados
+VIDA_UTIL_PADRAO_ANOS = 5
+
+PROPRIO = 'Próprio'
+ALUGADO = 'Alugado'
+
+
+def _chave(modelo):
+    return str(modelo).strip().upper()
+
+
+# Fabricantes antes das linhas de produto ("Samsung Latitude" é Samsung) e, em cada
+# grupo, as palavras mais longas primeiro. Palavras de até 2 letras (HP) só valem no
+# início de uma palavra do nome; as demais em qualquer posição ("SAMSUNG550", "NBSAMSUNG")
+_PALAVRAS = [
+    (palavra, grupo[palavra])
+    for grupo in (FABRICANTES, LINHAS_PRODUTO)
+    for palavra in sorted(grupo, key=len, reverse=True)
+]
+
+
+def _fabricante(modelo):
+    chave = _chave(modelo)
+    palavras_modelo = re.split(r'[^0-9A-Z]+', chave)
+    for palavra, fabricante in _PALAVRAS:
+        if len(palavra) > 2:
+            encontrada = palavra in chave
+        else:
+            encontrada = any(parte.startswith(palavra) for parte in palavras_modelo)
+        if encontrada:
+            return fabricante
+    return 'Outros'
+
+
+class ModelCatalog:
+    """Classificação dos modelos em memória, por processo; thread-safe"""
+
+    def __init__(self, path=CATALOGO_PATH):
+        self.path = path
+        self._modelos = {}
+        self._ajustes = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _carregar_ajustes(self):
+        """Relê a planilha de ajustes se ela mudou; o cache é refeito com os novos valores"""
+        mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+        if mtime == self._mtime:
+            return
+        ajustes = {}
+        if mtime is not None:
+            try:
+                import pandas as pd
+
+                planilha = pd.read_excel(self.path)
+                for row in planilha.to_dict('records'):
+                    if pd.notna(row.get('Modelo')):
+                        ajustes[_chave(row['Modelo'])] = {
+                            campo: valor for campo, valor in row.items()
+                            if campo != 'Modelo' and pd.notna(valor)
+                        }
+            except Exception as e:
+                print(f"Erro ao ler o catálogo de modelos: {e}")
+        self._ajustes = ajustes
+        self._modelos = {}
+        self._mtime = mtime
+
+    def _classificar(self, modelo):
+        fabricante = _fabricante(modelo)
+        info = {
+            'Fabricante': fabricante,
+            'Propriedade': ALUGADO if fabricante in FABRICANTES_LOCACAO else PROPRIO,
+            'CustoMensal': None,
+            'VidaUtilAnos': VIDA_UTIL_PADRAO_ANOS
+        }
+        info.update(self._ajustes.get(_chave(modelo), {}))
+        return info
+
+    def lookup(self, modelos):
+        """Retorna {modelo: info}; só modelos ainda não vistos são classificados"""
+        with self._lock:
+            self._carregar_ajustes()
+            for modelo in modelos:
+                if modelo not in self._modelos:
+                    self._modelos[modelo] = self._classificar(modelo)
+            return {modelo: self._modelos[modelo] for modelo in modelos}
+
+    def annotate(self, df, coluna='Modelo'):
+        """Cópia de `df` com as colunas do catálogo para cada valor de `coluna`"""
+        df = df.copy()
+        infos = self.lookup(df[coluna].dropna().unique())
+        for campo in ('Fabricante', 'Propriedade', 'CustoMensal', 'VidaUtilAnos'):
+            df[campo] = df[coluna].map({modelo: info[campo] for modelo, info in infos.items()})
+        return df
+
+    def total_alugados(self, df, coluna='Modelo', quantidade='quantidade'):
+        """Soma de `quantidade` dos modelos alugados em uma contagem por modelo"""
+        if df is None or df.empty:
+            return 0
+        infos = self.lookup(df[coluna].dropna().unique())
+        alugados = [modelo for modelo, info in infos.items() if info['Propriedade'] == ALUGADO]
+        return int(df.loc[df[coluna].isin(alugados), quantidade].sum())
+
+
+catalogo = ModelCatalog()
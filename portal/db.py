@@ -0,0 +1,970 @@
+"""
+Acesso ao SQL Server do Portal do TI: conexão, pool de queries e o catálogo
+QUERIES. Não importa Dash nem Plotly, para que scripts de linha de comando
+(verificar_estoque.py, diagnósticos) possam usá-lo sem carregar o dashboard.
+"""
+import hashlib
+import re
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+from portal.status import STATUS_CRITICOS, STATUS_FORA_DE_USO, rotular_status, sql_lista
+
+# ==================== CONFIGURAÇÕES DE CONEXÃO ====================
+DB_CONFIG = {
+    'server': 'rio01p-sql01',
+    'database': 'ControleTI',
+    'username': 'RM',
+    'password': 'rm',
+    'port': '1433'
+}
+
+DB_LOGIN_TIMEOUT_SECONDS = 5  # Tempo máximo de cada tentativa de conexão
+
+# ===================================================================
+
+
+def get_engine(**engine_options):
+    """Cria engine SQLAlchemy para SQL Server - Compatível com Linux"""
+    try:
+        password_encoded = urllib.parse.quote_plus(DB_CONFIG['password'])
+        username_encoded = urllib.parse.quote_plus(DB_CONFIG['username'])
+        
+        connection_attempts = [
+            {
+                'driver': 'ODBC Driver 18 for SQL Server',
+                'method': 'pyodbc'
+            },
+            {
+                'driver': 'ODBC Driver 17 for SQL Server', 
+                'method': 'pyodbc'
+            },
+            {
+                'driver': 'FreeTDS',
+                'method': 'pyodbc'
+            },
+            # Método 2: pymssql (não precisa de ODBC)
+            {
+                'method': 'pymssql'
+            }
+        ]
+        
+        for attempt in connection_attempts:
+            try:
+                if attempt['method'] == 'pyodbc':
+                    driver_encoded = urllib.parse.quote_plus(attempt['driver'])
+                    connection_string = f"""mssql+pyodbc://{username_encoded}:{password_encoded}@{DB_CONFIG['server']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}?driver={driver_encoded}&TrustServerCertificate=yes"""
+                    connect_args = {'timeout': DB_LOGIN_TIMEOUT_SECONDS}
+                elif attempt['method'] == 'pymssql':
+                    connection_string = f"""mssql+pymssql://{username_encoded}:{password_encoded}@{DB_CONFIG['server']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"""
+                    connect_args = {'login_timeout': DB_LOGIN_TIMEOUT_SECONDS}
+                
+                print(f"Tentando conexão com: {attempt}")
+                engine = create_engine(connection_string, connect_args=connect_args, **engine_options)
+                
+                # Testa a conexão
+                with engine.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+                
+                print(f"Conexão bem-sucedida com: {attempt}")
+                return engine
+                
+            except Exception as e:
+                print(f"Falha com {attempt}: {e}")
+                continue
+        
+        raise Exception("Nenhum método de conexão funcionou")
+        
+    except Exception as e:
+        print(f"Erro na criação da engine: {e}")
+        return None
+
+# Máximo de queries simultâneas por processo (threads do pool e conexões do SQL Server)
+DB_MAX_CONCURRENCY = 8
+
+# ==================== CIRCUIT BREAKER ====================
+CIRCUIT_FAILURE_THRESHOLD = 3   # Falhas de conexão seguidas até abrir o circuito
+CIRCUIT_RETRY_SECONDS = 30      # Intervalo da sonda de recuperação com o circuito aberto
+
+class CircuitBreaker:
+    """
+    Protege o processo de um SQL Server fora do ar. Depois de
+    CIRCUIT_FAILURE_THRESHOLD falhas de conexão seguidas o circuito abre: as
+    queries falham na hora (sem as tentativas de conexão e seus timeouts) e
+    uma thread em background testa a conexão a cada CIRCUIT_RETRY_SECONDS,
+    fechando o circuito quando o banco volta.
+    """
+
+    def __init__(self, threshold=CIRCUIT_FAILURE_THRESHOLD, retry_seconds=CIRCUIT_RETRY_SECONDS):
+        self.threshold = threshold
+        self.retry_seconds = retry_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.last_success_at = None
+        self.last_error = None
+        self.listeners = []  # Chamados com o novo estado ('aberto'/'fechado') quando ele muda
+        self._lock = threading.Lock()
+        self._probe_thread = None
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.last_success_at = datetime.now()
+            fechou = self.opened_at is not None
+            self.opened_at = None
+        if fechou:
+            print("SQL Server respondeu: circuito fechado")
+            self._notify('fechado')
+
+    def record_failure(self, erro):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(erro)
+            abriu = self.opened_at is None and self.failures >= self.threshold
+            if abriu:
+                self.opened_at = datetime.now()
+        if abriu:
+            print(f"SQL Server indisponível após {self.failures} falhas: circuito aberto")
+            self._start_probe()
+            self._notify('aberto')
+
+    def _notify(self, estado):
+        for listener in self.listeners:
+            try:
+                listener(estado)
+            except Exception as e:
+                print(f"Erro ao notificar mudança do circuito: {e}")
+
+    def _start_probe(self):
+        with self._lock:
+            if self._probe_thread is None or not self._probe_thread.is_alive():
+                self._probe_thread = threading.Thread(target=self._probe_loop, name='db-recovery', daemon=True)
+                self._probe_thread.start()
+
+    def _probe_loop(self):
+        while self.is_open:
+            time.sleep(self.retry_seconds)
+            # A engine compartilhada pode existir com o banco fora: só um SELECT 1 prova que ele voltou
+            engine = _connect_shared_engine()
+            if engine is None:
+                self.record_failure("Nenhum método de conexão funcionou")
+                continue
+            try:
+                with engine.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+            except Exception as e:
+                self.record_failure(e)
+                continue
+            self.record_success()
+
+    def reset_after_fork(self, start_probe=True):
+        """
+        Threads não sobrevivem ao fork: recria o lock e, com `start_probe`, a sonda
+        se o circuito estiver aberto
+        """
+        self._lock = threading.Lock()
+        self._probe_thread = None
+        if start_probe and self.is_open:
+            self._start_probe()
+
+    def status(self):
+        return {
+            'estado': 'aberto' if self.is_open else 'fechado',
+            'falhas': self.failures,
+            'aberto_desde': self.opened_at.isoformat(timespec='seconds') if self.opened_at else None,
+            'ultimo_sucesso': self.last_success_at.isoformat(timespec='seconds') if self.last_success_at else None,
+            'ultimo_erro': self.last_error
+        }
+
+breaker = CircuitBreaker()
+
+def is_connection_error(erro):
+    """True para erros de conexão/rede (contam para o circuito); erros de SQL não contam"""
+    return isinstance(erro, (OperationalError, InterfaceError)) or (
+        isinstance(erro, DBAPIError) and erro.connection_invalidated
+    )
+
+_shared_engine = None
+_shared_engine_lock = threading.Lock()
+_db_executor = ThreadPoolExecutor(max_workers=DB_MAX_CONCURRENCY, thread_name_prefix='db')
+
+def _connect_shared_engine():
+    """Cria a engine compartilhada se ainda não existir; None se o banco não responder"""
+    global _shared_engine
+    with _shared_engine_lock:
+        if _shared_engine is None:
+            _shared_engine = get_engine(pool_size=DB_MAX_CONCURRENCY, max_overflow=0, pool_pre_ping=True)
+        return _shared_engine
+
+def get_shared_engine():
+    """
+    Engine do processo, com pool de conexões reutilizado entre as queries.
+    Retorna None imediatamente enquanto o circuito estiver aberto.
+    """
+    if breaker.is_open:
+        return None
+    engine = _connect_shared_engine()
+    if engine is None:
+        breaker.record_failure("Nenhum método de conexão funcionou")
+    return engine
+
+def submit_db(func, *args):
+    """Executa func(*args) no pool de threads do banco; retorna um Future"""
+    return _db_executor.submit(func, *args)
+
+def reset_db_pool(start_probe=True):
+    """
+    Recria o pool de threads e descarta as conexões herdadas. Usado em processos
+    filhos (fork), que não podem reaproveitar threads nem sockets do pai. Sem
+    `start_probe`, a sonda do circuito não é iniciada neste processo.
+    """
+    global _db_executor, _shared_engine_lock
+    _db_executor = ThreadPoolExecutor(max_workers=DB_MAX_CONCURRENCY, thread_name_prefix='db')
+    _shared_engine_lock = threading.Lock()
+    if _shared_engine is not None:
+        _shared_engine.dispose(close=False)
+    breaker.reset_after_fork(start_probe)
+
+def concat_frames(blocos):
+    """
+    Junta blocos lidos separadamente. Colunas categóricas continuam categóricas
+    (as categorias dos blocos são unidas antes; o pd.concat direto as
+    transformaria em texto).
+    """
+    import pandas as pd
+
+    if len(blocos) == 1:
+        return blocos[0]
+    for coluna in blocos[0].columns:
+        if isinstance(blocos[0][coluna].dtype, pd.CategoricalDtype):
+            # Blocos só com NULL têm categorias vazias (e de outro tipo): ficam de fora da união
+            categorias = [bloco[coluna].cat.categories for bloco in blocos if len(bloco[coluna].cat.categories)]
+            if not categorias:
+                continue
+            categorias = categorias[0].append(categorias[1:]).unique()
+            for bloco in blocos:
+                bloco[coluna] = bloco[coluna].cat.set_categories(categorias)
+    return pd.concat(blocos, ignore_index=True)
+
+def iter_frames(connection, query, params, chunksize, max_rows=None, convert=None):
+    """
+    Blocos de até `chunksize` linhas, lidos do cursor à medida que são pedidos
+    (só um bloco em memória por vez), cada um passado por `convert`. Para em
+    `max_rows` linhas. Uma query sem linhas gera um único bloco vazio.
+    """
+    import pandas as pd
+
+    total = 0
+    for bloco in pd.read_sql(text(query), connection, params=params, chunksize=chunksize):
+        truncado = max_rows is not None and total + len(bloco) > max_rows
+        if truncado:
+            bloco = bloco.iloc[:max_rows - total].copy()
+            print(f"Resultado limitado a {max_rows} linhas; o restante não foi lido")
+        total += len(bloco)
+        yield convert(bloco) if convert else bloco
+        if truncado:
+            return
+
+def read_frame(connection, query, params=None, chunksize=None, max_rows=None, convert=None):
+    """
+    pd.read_sql com os tipos aplicados por `convert`. Com `chunksize` o cursor é
+    lido em blocos (iter_frames), cada um convertido antes do próximo, e a
+    leitura para em `max_rows` linhas.
+    """
+    import pandas as pd
+
+    if not chunksize:
+        df = pd.read_sql(text(query), connection, params=params)
+        return convert(df) if convert else df
+    blocos = list(iter_frames(connection, query, params, chunksize, max_rows, convert))
+    return concat_frames(blocos) if blocos else pd.DataFrame()
+
+def execute_remote_query(query, params=None, **leitura):
+    """
+    Executa query diretamente no SQL Server e retorna DataFrame usando SQLAlchemy.
+    `leitura` vai para read_frame (chunksize, max_rows, convert).
+    """
+    import pandas as pd  # Importado sob demanda: scripts que só usam a engine não pagam o pandas
+
+    engine = get_shared_engine()
+    if engine:
+        try:
+            with engine.connect() as connection:
+                df = read_frame(connection, query, params, **leitura)
+            breaker.record_success()
+            return df
+        except Exception as e:
+            if is_connection_error(e):
+                breaker.record_failure(e)
+            print(f"Erro na query: {e}")
+            print(f"Query executada: {query}")
+            return pd.DataFrame()
+    return pd.DataFrame()
+
+def stream_remote_query(query, params=None, chunksize=None, **leitura):
+    """
+    Versão em blocos de execute_remote_query para consumidores incrementais
+    (exportação, sincronização): gera os blocos de iter_frames com a conexão
+    aberta até o último. Erros são repassados em vez de virar resultado vazio,
+    para que uma leitura interrompida não pareça completa.
+    """
+    engine = get_shared_engine()
+    if engine is None:
+        raise ConnectionError("SQL Server indisponível")
+    try:
+        with engine.connect() as connection:
+            yield from iter_frames(connection, query, params, chunksize, **leitura)
+        breaker.record_success()
+    except Exception as e:
+        if is_connection_error(e):
+            breaker.record_failure(e)
+        print(f"Erro na query: {e}")
+        print(f"Query executada: {query}")
+        raise
+
+# Classificação do local do equipamento pelo campo Usuario. O LIKE com curinga
+# inicial não usa índice, então é avaliado uma vez por valor distinto de Usuario
+# (poucas dezenas) e as queries juntam por igualdade em Usuario.
+LOCAL_USUARIO_CTE = """
+        WITH LocalUsuario AS (
+            SELECT
+                Usuario,
+                CASE WHEN Usuario LIKE '%estoque%' THEN 1 ELSE 0 END AS EmEstoque,
+                CASE UPPER(Usuario)
+                    WHEN 'EM ESTOQUE' THEN 'Em Estoque'
+                    WHEN 'ACESSO REMOTO' THEN 'Acesso Remoto'
+                    WHEN 'DESCARTADO' THEN 'Descartado'
+                    WHEN 'DEVOLVIDO' THEN 'Devolvido'
+                    WHEN 'DANIFICADO' THEN 'Danificado'
+                    WHEN 'EXTRAVIADO' THEN 'Extraviado'
+                    WHEN 'ROUBADO' THEN 'Roubado'
+                END AS Situacao
+            FROM (SELECT DISTINCT Usuario FROM Computadores WHERE Usuario IS NOT NULL) u
+        ),
+        UsuariosEstoque AS (
+            SELECT Usuario FROM LocalUsuario WHERE EmEstoque = 1
+        )"""
+
+# Filtros de Status montados a partir do registro de códigos (portal/status.py)
+FORA_DE_USO = sql_lista(STATUS_FORA_DE_USO)   # Extraviado, Roubado, Descartado, Danificado, Reparo
+CRITICOS = sql_lista(STATUS_CRITICOS)         # Extraviado, Roubado, Descartado, Danificado
+
+def top_n(select, ordem, colunas, ctes=''):
+    """
+    Só as `:limite` primeiras linhas de `select` na `ordem` dada (o limite é um
+    parâmetro da Query). O SQL Server e o SQLite da réplica não têm TOP/LIMIT em
+    comum, então a posição é numerada com ROW_NUMBER. O resultado traz só as
+    `colunas` de `select` (a posição não sai da query). `select` não pode ter
+    ORDER BY; CTEs usadas por ele vão em `ctes`.
+    """
+    return ctes + f"""
+        SELECT {', '.join(colunas)} FROM (
+            SELECT q.*, ROW_NUMBER() OVER (ORDER BY {ordem}) AS Posicao
+            FROM ({select}) q
+        ) t
+        WHERE Posicao <= :limite
+        ORDER BY Posicao
+    """
+
+# Tabelas de origem e a chave usada na sonda de mudanças
+SOURCE_TABLES = {
+    'Computadores': 'ID',
+    'Colaboradores': 'Matricula',
+    'Terceirizados': 'Matricula',
+    'Perifericos': 'ID'
+}
+
+# Tipos de coluna aceitos em Query.columns: (verificação, dtype aplicado ao
+# resultado). None = não verificado / mantém o dtype do driver. Inteiros são
+# nullable (NULL vira <NA> em vez de passar a coluna para float) e com a menor
+# largura que cabe nos valores; textos de poucos valores distintos repetidos em
+# muitas linhas (Modelo, Setor, Chefia, Usuario...) são categóricos.
+COLUMN_TYPES = {
+    'int': ('is_numeric_dtype', 'Int32'),      # contagens
+    'int8': ('is_numeric_dtype', 'Int8'),      # códigos (Status)
+    'float': ('is_numeric_dtype', 'float64'),  # float32 aparece com casas a mais nas tabelas
+    'str': ('is_string_dtype', None),
+    'category': (None, 'category'),
+    'datetime': ('is_datetime64_any_dtype', None),
+    None: (None, None)
+}
+
+# Leitura em blocos das queries de detalhe (uma linha por equipamento/colaborador)
+DETAIL_CHUNK_ROWS = 5000      # Linhas por bloco lido do cursor
+DETAIL_MAX_ROWS = 100000      # Teto de linhas por resultado; o excedente é descartado com aviso
+
+_PARAMETRO = re.compile(r'(?<![:\w]):(\w+)')
+
+class Query:
+    """
+    Entrada do registro QUERIES: SQL com parâmetros nomeados (:nome) e seus
+    valores, tabelas lidas (para invalidar o snapshot) e colunas esperadas no
+    resultado com o tipo de cada uma. Os valores sempre vão como parâmetros,
+    nunca no texto do SQL: entradas que só mudam um valor usam o mesmo SQL e o
+    SQL Server reaproveita o plano. Com `chunksize` o resultado é lido em blocos
+    já convertidos para os tipos declarados, até `max_rows` linhas.
+    """
+
+    def __init__(self, name, sql, sources, columns, params=None, status_column=None,
+                 chunksize=None, max_rows=None):
+        self.name = name
+        self.sql = sql
+        self.sources = tuple(sources)
+        self.columns = dict(columns)
+        self.params = dict(params or {})
+        self.status_column = status_column  # Coluna de rótulo criada a partir de StatusNumerico
+        self.chunksize = chunksize
+        self.max_rows = max_rows
+
+    @property
+    def cache_key(self):
+        """Muda quando o SQL, os parâmetros ou os tipos mudam (entra na chave do cache compartilhado)"""
+        return hashlib.sha1(repr((
+            self.sql, sorted(self.params.items()), sorted(self.columns.items(), key=repr), self.max_rows
+        )).encode('utf-8')).hexdigest()
+
+    @property
+    def read_options(self):
+        """Argumentos de leitura repassados a read_frame"""
+        return {'chunksize': self.chunksize, 'max_rows': self.max_rows, 'convert': self.convert}
+
+    def validate(self):
+        """Erros de declaração da entrada (lista vazia = ok)"""
+        erros = []
+        usados = set(_PARAMETRO.findall(self.sql))
+        if usados != set(self.params):
+            erros.append(f"parâmetros no SQL {sorted(usados)} != declarados {sorted(self.params)}")
+        desconhecidas = set(self.sources) - set(SOURCE_TABLES)
+        if not self.sources or desconhecidas:
+            erros.append(f"tabelas de origem inválidas: {self.sources}")
+        if not self.columns:
+            erros.append("nenhuma coluna declarada")
+        tipos = set(self.columns.values()) - set(COLUMN_TYPES)
+        if tipos:
+            erros.append(f"tipos de coluna desconhecidos: {sorted(map(str, tipos))}")
+        if self.max_rows is not None and not self.chunksize:
+            erros.append("max_rows sem chunksize")
+        return erros
+
+    def convert(self, df):
+        """
+        Aplica os tipos declarados a `df` (o resultado inteiro ou um bloco). Uma
+        coluna que não converte fica como veio, com aviso: um driver pode trazer
+        um tipo diferente sem quebrar os callbacks.
+        """
+        import pandas as pd
+
+        for coluna, tipo in self.columns.items():
+            if coluna not in df.columns:
+                continue
+            verificar, dtype = COLUMN_TYPES[tipo]
+            try:
+                valores = df[coluna]
+                if verificar and valores.notna().any() and not getattr(pd.api.types, verificar)(valores.dropna().infer_objects()):
+                    raise TypeError(f"tipo {valores.dtype}")
+                if dtype in ('Int8', 'Int32', 'float64'):
+                    valores = pd.to_numeric(valores)  # Decimal do driver vira número
+                if dtype:
+                    df[coluna] = valores.astype(dtype)
+            except (TypeError, ValueError) as e:
+                print(f"Query {self.name}: coluna {coluna} não convertida para {tipo}: {e}")
+        return df
+
+    def prepare(self, df):
+        """Confere as colunas declaradas no resultado e cria o rótulo de Status"""
+        faltando = [coluna for coluna in self.columns if coluna not in df.columns]
+        if faltando:
+            print(f"Query {self.name}: colunas esperadas ausentes no resultado: {faltando}")
+        if self.status_column and 'StatusNumerico' in df.columns:
+            rotular_status(df, self.status_column)
+        return df
+
+
+def _registro(*queries):
+    """Monta QUERIES validando as entradas; um erro aqui impede o import do módulo"""
+    registro = {}
+    erros = []
+    for query in queries:
+        if query.name in registro:
+            erros.append(f"{query.name}: nome duplicado")
+        registro[query.name] = query
+        erros.extend(f"{query.name}: {erro}" for erro in query.validate())
+    if erros:
+        raise ValueError("Registro QUERIES inválido:\n" + "\n".join(erros))
+    return registro
+
+# SQL compartilhado por entradas que só mudam o valor de um parâmetro
+TERCEIRIZADOS_COM_EQUIPAMENTOS_SQL = """
+        SELECT 
+            C.Serial, 
+            C.Modelo, 
+            C.Matricula AS Matricula_Comp,        
+            T.Nome, 
+            T.Matricula AS Matricula_Terc, 
+            T.Chefia 
+        FROM Computadores C 
+        JOIN Terceirizados T ON C.Matricula = T.Matricula 
+        WHERE T.Situacao = :situacao
+    """
+TERCEIRIZADOS_COM_EQUIPAMENTOS_COLUNAS = {
+    'Serial': 'str', 'Modelo': 'category', 'Matricula_Comp': None, 'Nome': 'str', 'Matricula_Terc': None,
+    'Chefia': 'category'
+}
+
+KPI_TERCEIRIZADOS_SQL = """
+        SELECT COUNT(*) as total
+        FROM Computadores C 
+        JOIN Terceirizados T ON C.Matricula = T.Matricula 
+        WHERE T.Situacao = :situacao
+    """
+
+KPI_COLABORADORES_SQL = """
+        SELECT COUNT(*) as total
+        FROM Colaboradores  
+        WHERE Situacao = :situacao
+    """
+
+LOCAL_STATUS_COLUNAS = {
+    'Serial': 'str', 'Modelo': 'category', 'Usuario': 'category', 'Matricula': None, 'NomeColaborador': 'str',
+    'Status': 'category'
+}
+
+# Queries de detalhe: lidas em blocos, com teto de linhas
+DETAIL_READ = {'chunksize': DETAIL_CHUNK_ROWS, 'max_rows': DETAIL_MAX_ROWS}
+
+QUERIES = _registro(
+    # Terceirizados inativos com equipamentos (primeiros por nome)
+    Query('terceirizados_inativos_com_equipamentos',
+          top_n(TERCEIRIZADOS_COM_EQUIPAMENTOS_SQL, 'Nome, Serial', TERCEIRIZADOS_COM_EQUIPAMENTOS_COLUNAS),
+          ('Computadores', 'Terceirizados'), TERCEIRIZADOS_COM_EQUIPAMENTOS_COLUNAS,
+          params={'situacao': 0, 'limite': 8}),
+    
+    # Terceirizados ativos com equipamentos
+    Query('terceirizados_ativos_com_equipamentos', TERCEIRIZADOS_COM_EQUIPAMENTOS_SQL,
+          ('Computadores', 'Terceirizados'), TERCEIRIZADOS_COM_EQUIPAMENTOS_COLUNAS,
+          params={'situacao': 1}),
+    
+    # Colaboradores demitidos
+    Query('colaboradores_demitidos', """
+        SELECT Colaboradores.Nome 
+        FROM Colaboradores  
+        WHERE Colaboradores.Situacao = 'Demitido'
+    """, ('Colaboradores',), {'Nome': 'str'}),
+    
+    # Colaboradores aviso prévio (nomes do popover do KPI; sem nome não entra na lista)
+    Query('colaboradores_aviso_previo', top_n("""
+        SELECT Colaboradores.Nome 
+        FROM Colaboradores  
+        WHERE Colaboradores.Situacao = 'Aviso Prévio'
+            AND Colaboradores.Nome IS NOT NULL
+    """, 'Nome', ('Nome',)), ('Colaboradores',), {'Nome': 'str'}, params={'limite': 15}),
+    
+    # Colaboradores demitidos com equipamentos (primeiros por nome)
+    Query('colaboradores_demitidos_com_equipamentos', top_n("""
+        SELECT
+            c.Matricula,
+            c.Nome AS Colaborador,
+            c.CCusto,
+            c.Chefia,
+            comp.ModeloComputador,
+            p.ModeloPeriferico
+        FROM Colaboradores c
+        JOIN ComputadoresPorMatricula comp ON comp.Matricula = c.Matricula
+        LEFT JOIN PerifericosPorMatricula p ON p.Matricula = c.Matricula
+        WHERE c.Situacao = 'Demitido'
+            AND c.Nome IS NOT NULL
+    """, 'Colaborador', ('Matricula', 'Colaborador', 'CCusto', 'Chefia', 'ModeloComputador', 'ModeloPeriferico'), ctes="""
+        WITH ComputadoresPorMatricula AS (
+            SELECT Matricula, STRING_AGG(Modelo, ' / ') AS ModeloComputador
+            FROM (SELECT DISTINCT Matricula, Modelo FROM Computadores WHERE Modelo IS NOT NULL) m
+            GROUP BY Matricula
+        ),
+        PerifericosPorMatricula AS (
+            SELECT Matricula, STRING_AGG(Modelo, ' / ') AS ModeloPeriferico
+            FROM (SELECT DISTINCT Matricula, Modelo FROM Perifericos WHERE Modelo IS NOT NULL) m
+            GROUP BY Matricula
+        )"""),
+          ('Colaboradores', 'Computadores', 'Perifericos'),
+          {'Matricula': None, 'Colaborador': 'str', 'CCusto': 'str', 'Chefia': 'str',
+           'ModeloComputador': 'str', 'ModeloPeriferico': 'str'},
+          params={'limite': 8}),
+    
+    # Total em estoque
+    Query('total_equipamentos_estoque', LOCAL_USUARIO_CTE + f"""
+        SELECT COUNT(*) AS TotalEmEstoque
+        FROM Computadores
+        WHERE Usuario IN (SELECT Usuario FROM UsuariosEstoque)
+          AND Status NOT IN ({FORA_DE_USO})
+    """, ('Computadores',), {'TotalEmEstoque': 'int'}),
+    
+    # Modelos em estoque
+    Query('modelos_em_estoque', LOCAL_USUARIO_CTE + f"""
+        SELECT 
+            Modelo, 
+            COUNT(*) AS Quantidade
+        FROM Computadores
+        WHERE Usuario IN (SELECT Usuario FROM UsuariosEstoque)
+          AND Status NOT IN ({FORA_DE_USO})
+        GROUP BY Modelo
+        ORDER BY Quantidade DESC
+    """, ('Computadores',), {'Modelo': 'str', 'Quantidade': 'int'}),
+    
+    # Colaboradores ativos com equipamentos
+    Query('colaboradores_ativos_com_equipamentos', """
+        SELECT 
+            Computadores.Serial, 
+            Computadores.Modelo, 
+            Computadores.Matricula, 
+            Colaboradores.Nome 
+        FROM Computadores 
+        LEFT JOIN Colaboradores ON Computadores.Matricula = Colaboradores.Matricula
+        WHERE Computadores.Matricula IS NOT NULL
+            AND Colaboradores.Nome IS NOT NULL
+    """, ('Computadores', 'Colaboradores'), {'Serial': 'str', 'Modelo': 'category', 'Matricula': None, 'Nome': 'str'}),
+    
+    # KPIs de contagem
+    Query('kpi_terceirizados_inativos', KPI_TERCEIRIZADOS_SQL,
+          ('Computadores', 'Terceirizados'), {'total': 'int'}, params={'situacao': 0}),
+    
+    Query('kpi_terceirizados_ativos', KPI_TERCEIRIZADOS_SQL,
+          ('Computadores', 'Terceirizados'), {'total': 'int'}, params={'situacao': 1}),
+    
+    Query('kpi_colaboradores_demitidos', KPI_COLABORADORES_SQL,
+          ('Colaboradores',), {'total': 'int'}, params={'situacao': 'Demitido'}),
+    
+    Query('kpi_colaboradores_aviso_previo', KPI_COLABORADORES_SQL,
+          ('Colaboradores',), {'total': 'int'}, params={'situacao': 'Aviso Prévio'}),
+    
+    Query('kpi_colaboradores_ativos', KPI_COLABORADORES_SQL,
+          ('Colaboradores',), {'total': 'int'}, params={'situacao': 'Ativo'}),
+    
+    Query('lista_computadores', f"""
+        SELECT Serial
+        FROM Computadores
+        WHERE Serial IS NOT NULL
+          AND Status NOT IN ({FORA_DE_USO})
+    """, ('Computadores',), {'Serial': 'str'}),
+    
+    # Equipamentos alocados (não estoque, com matrícula)
+    Query('kpi_equipamentos_alocados', LOCAL_USUARIO_CTE + f"""
+        SELECT COUNT(*) as total_equipamentos_alocados
+        FROM Computadores
+        WHERE Matricula IS NOT NULL
+          AND (Usuario IS NULL OR Usuario NOT IN (SELECT Usuario FROM UsuariosEstoque))
+          AND Status NOT IN ({FORA_DE_USO})
+    """, ('Computadores',), {'total_equipamentos_alocados': 'int'}),
+    
+    Query('kpi_equipamentos_sem_dono', f"""
+        SELECT COUNT(*) as total_equipamentos_descartados
+        FROM Computadores
+        WHERE Status IN ({CRITICOS})
+    """, ('Computadores',), {'total_equipamentos_descartados': 'int'}),
+    
+    Query('kpi_colaboradores_ativos_sem_computador', """
+        SELECT COUNT(*) as total_colaboradores_ativos_sem_computador
+        FROM Colaboradores c
+        LEFT JOIN Computadores comp ON comp.Matricula = c.Matricula
+        WHERE c.Situacao = 'Ativo'
+          AND comp.Matricula IS NULL
+    """, ('Colaboradores', 'Computadores'), {'total_colaboradores_ativos_sem_computador': 'int'}),
+    
+    Query('kpi_demitidos_com_equipamentos', """
+        SELECT COUNT(*) as total_demitidos_com_equipamentos
+        FROM Colaboradores c
+        WHERE c.Situacao = 'Demitido'
+            AND c.Nome IS NOT NULL
+            AND EXISTS (
+                SELECT 1 FROM Computadores comp
+                WHERE comp.Matricula = c.Matricula AND comp.Modelo IS NOT NULL
+            )
+    """, ('Colaboradores', 'Computadores'), {'total_demitidos_com_equipamentos': 'int'}),
+    
+    Query('kpi_colaboradores_ativos_com_equipamentos', """
+        SELECT COUNT(*) as total_colaboradores_ativos_com_equipamentos
+        FROM Computadores 
+        LEFT JOIN Colaboradores ON Computadores.Matricula = Colaboradores.Matricula
+        WHERE Computadores.Matricula IS NOT NULL
+            AND Colaboradores.Nome IS NOT NULL
+    """, ('Computadores', 'Colaboradores'), {'total_colaboradores_ativos_com_equipamentos': 'int'}),
+    
+    # Consultas adicionais básicas
+    Query('total_computadores', f"""
+        SELECT COUNT(*) as total_computadores
+        FROM Computadores
+        WHERE Status NOT IN ({FORA_DE_USO})
+    """, ('Computadores',), {'total_computadores': 'int'}),
+    
+    Query('computadores_por_modelo', f"""
+        SELECT 
+            Modelo,
+            COUNT(*) as quantidade
+        FROM Computadores
+        WHERE Modelo IS NOT NULL
+          AND Status NOT IN ({FORA_DE_USO})
+        GROUP BY Modelo
+        ORDER BY quantidade DESC
+    """, ('Computadores',), {'Modelo': 'str', 'quantidade': 'int'}),
+    
+    Query('usuarios_por_setor', top_n("""
+        SELECT 
+            COALESCE(c.CCusto, 'Sem Setor') as Setor,
+            COUNT(*) as quantidade
+        FROM Colaboradores c
+        WHERE c.Situacao NOT IN ('Demitido', 'Aviso Prévio')
+        GROUP BY c.CCusto
+    """, 'quantidade DESC, Setor', ('Setor', 'quantidade')), ('Colaboradores',), {'Setor': 'str', 'quantidade': 'int'},
+          params={'limite': 10}),
+    
+    Query('ocupacao_por_setor', top_n("""
+        SELECT 
+            COALESCE(c.CCusto, 'Sem Setor') as Setor,
+            COUNT(DISTINCT c.Matricula) as TotalColaboradores,
+            COUNT(DISTINCT CASE WHEN comp.Matricula IS NOT NULL THEN c.Matricula END) as ComEquipamento,
+            CASE 
+                WHEN COUNT(DISTINCT c.Matricula) > 0 
+                THEN ROUND(
+                    (COUNT(DISTINCT CASE WHEN comp.Matricula IS NOT NULL THEN c.Matricula END) * 100.0) / 
+                    COUNT(DISTINCT c.Matricula), 1
+                )
+                ELSE 0 
+            END as TaxaOcupacao
+        FROM Colaboradores c
+        LEFT JOIN Computadores comp ON comp.Matricula = c.Matricula
+        WHERE c.Situacao = 'Ativo'
+        GROUP BY c.CCusto
+        HAVING COUNT(DISTINCT c.Matricula) > 0
+    """, 'TaxaOcupacao DESC, Setor', ('Setor', 'TotalColaboradores', 'ComEquipamento', 'TaxaOcupacao')), ('Colaboradores', 'Computadores'),
+          {'Setor': 'str', 'TotalColaboradores': 'int', 'ComEquipamento': 'int', 'TaxaOcupacao': 'float'},
+          params={'limite': 10}),
+    
+    # Maiores chefias; o restante sai de kpi_colaboradores_ativos (fatia "Outras")
+    Query('colaboradores_por_chefia', top_n("""
+        SELECT 
+            COALESCE(c.Chefia, 'Sem Chefia') as Chefia,
+            COUNT(*) as quantidade
+        FROM Colaboradores c
+        WHERE c.Situacao = 'Ativo'
+        GROUP BY c.Chefia
+    """, 'quantidade DESC, Chefia', ('Chefia', 'quantidade')), ('Colaboradores',), {'Chefia': 'str', 'quantidade': 'int'},
+          params={'limite': 8}),
+    
+    Query('colaboradores_detalhado', """
+        SELECT 
+            c.Nome,
+            c.Matricula,
+            COALESCE(c.CCusto, 'Sem Setor') as Setor,
+            COALESCE(c.Chefia, 'Sem Chefia') as Chefia,
+            c.Situacao,
+            CASE 
+                WHEN comp.Serial IS NOT NULL THEN 'Com Equipamento'
+                ELSE 'Sem Equipamento'
+            END as StatusEquipamento,
+            comp.Modelo as ModeloComputador
+        FROM Colaboradores c
+        LEFT JOIN Computadores comp ON comp.Matricula = c.Matricula
+        WHERE c.Situacao = 'Ativo'
+        ORDER BY c.Nome
+    """, ('Colaboradores', 'Computadores'),
+          {'Nome': 'str', 'Matricula': None, 'Setor': 'category', 'Chefia': 'category', 'Situacao': 'category',
+           'StatusEquipamento': 'category', 'ModeloComputador': 'category'},
+          **DETAIL_READ),
+    
+    Query('equipamentos_detalhado', LOCAL_USUARIO_CTE + """
+        SELECT 
+            c.Serial,
+            c.Modelo,
+            COALESCE(c.Usuario, 'Sem Usuário') as Usuario,
+            COALESCE(c.Matricula, 'Sem Matrícula') as Matricula,
+            COALESCE(col.Nome, 'Não Alocado') as NomeColaborador,
+            CASE 
+                WHEN lu.EmEstoque = 1 THEN 'Estoque'
+                WHEN c.Matricula IS NOT NULL THEN 'Em Uso'
+                ELSE 'Descartado'
+            END as Status
+        FROM Computadores c
+        LEFT JOIN LocalUsuario lu ON lu.Usuario = c.Usuario
+        LEFT JOIN Colaboradores col ON col.Matricula = c.Matricula
+        ORDER BY c.Modelo, c.Serial
+    """, ('Computadores', 'Colaboradores'), LOCAL_STATUS_COLUNAS, **DETAIL_READ),
+    
+    # Situação pelo campo Usuario (Em Estoque, Descartado, ...) ou Em Uso/Sem Status
+    Query('equipamentos_por_status', LOCAL_USUARIO_CTE + """
+        SELECT Status, COUNT(*) as quantidade
+        FROM (
+            SELECT
+                COALESCE(
+                    lu.Situacao,
+                    CASE WHEN c.Matricula IS NOT NULL THEN 'Em Uso' ELSE 'Sem Status' END
+                ) as Status
+            FROM Computadores c
+            LEFT JOIN LocalUsuario lu ON lu.Usuario = c.Usuario
+        ) s
+        GROUP BY Status
+        ORDER BY quantidade DESC
+    """, ('Computadores',), {'Status': 'str', 'quantidade': 'int'}),
+    
+    Query('equipamentos_criticidade', LOCAL_USUARIO_CTE + """
+        SELECT 
+            c.Serial,
+            c.Modelo,
+            COALESCE(c.Usuario, 'Sem Usuário') as Usuario,
+            COALESCE(c.Matricula, 'Sem Matrícula') as Matricula,
+            COALESCE(col.Nome, 'Não Alocado') as NomeColaborador,
+            CASE 
+                WHEN lu.EmEstoque = 1 THEN 'Estoque'
+                WHEN c.Matricula IS NOT NULL THEN 'Em Uso'
+                ELSE 'Descartado'
+            END as Status
+        FROM Computadores c
+        LEFT JOIN LocalUsuario lu ON lu.Usuario = c.Usuario
+        LEFT JOIN Colaboradores col ON col.Matricula = c.Matricula
+        WHERE c.Serial IS NOT NULL
+        ORDER BY c.Modelo, c.Serial
+    """, ('Computadores', 'Colaboradores'), LOCAL_STATUS_COLUNAS, **DETAIL_READ),
+    
+    # Novas queries para análises mais avançadas
+    Query('custos_por_setor', """
+        SELECT 
+            COALESCE(col.CCusto, 'Sem Setor') as Setor,
+            COUNT(DISTINCT c.Serial) as QuantidadeEquipamentos,
+            COUNT(DISTINCT col.Matricula) as QuantidadeColaboradores,
+            CASE 
+                WHEN COUNT(DISTINCT col.Matricula) > 0 
+                THEN ROUND(CAST(COUNT(DISTINCT c.Serial) AS FLOAT) / COUNT(DISTINCT col.Matricula), 2)
+                ELSE 0 
+            END as EquipamentoPorColaborador
+        FROM Colaboradores col
+        LEFT JOIN Computadores c ON c.Matricula = col.Matricula
+        WHERE col.Situacao = 'Ativo'
+        GROUP BY col.CCusto
+        ORDER BY QuantidadeEquipamentos DESC
+    """, ('Colaboradores', 'Computadores'),
+          {'Setor': 'str', 'QuantidadeEquipamentos': 'int', 'QuantidadeColaboradores': 'int',
+           'EquipamentoPorColaborador': 'float'}),
+    
+    Query('rotatividade_analise', """
+        SELECT 
+            YEAR(GETDATE()) as Ano,
+            COUNT(CASE WHEN Situacao = 'Demitido' THEN 1 END) as Demitidos,
+            COUNT(CASE WHEN Situacao = 'Aviso Prévio' THEN 1 END) as AvisoPrevio,
+            COUNT(CASE WHEN Situacao = 'Ativo' THEN 1 END) as Ativos,
+            ROUND(
+                (COUNT(CASE WHEN Situacao IN ('Demitido', 'Aviso Prévio') THEN 1 END) * 100.0) / 
+                NULLIF(COUNT(*), 0), 2
+            ) as TaxaRotatividade
+        FROM Colaboradores
+    """, ('Colaboradores',),
+          {'Ano': 'int', 'Demitidos': 'int', 'AvisoPrevio': 'int', 'Ativos': 'int', 'TaxaRotatividade': 'float'}),
+    
+    Query('equipamentos_idade_critica', """
+        SELECT 
+            c.Serial,
+            c.Modelo,
+            COALESCE(col.Nome, 'Não Alocado') as Usuario,
+            COALESCE(col.CCusto, 'Sem Setor') as Setor,
+            NULL as IdadeAnos,
+            'Sem Data de Compra' as StatusIdade
+        FROM Computadores c
+        LEFT JOIN Colaboradores col ON col.Matricula = c.Matricula
+        WHERE c.Serial IS NOT NULL
+        ORDER BY c.Modelo, c.Serial
+    """, ('Computadores', 'Colaboradores'),
+          {'Serial': 'str', 'Modelo': 'category', 'Usuario': 'str', 'Setor': 'category', 'IdadeAnos': 'float',
+           'StatusIdade': 'category'},
+          **DETAIL_READ),
+    
+    Query('performance_mensal', LOCAL_USUARIO_CTE + """
+        SELECT 
+            FORMAT(GETDATE(), 'yyyy-MM') as MesAtual,
+            COUNT(CASE WHEN c.Situacao = 'Ativo' THEN 1 END) as ColaboradoresAtivos,
+            COUNT(DISTINCT comp.Serial) as EquipamentosAlocados,
+            COUNT(CASE WHEN lu.EmEstoque = 1 THEN 1 END) as EquipamentosEstoque,
+            COUNT(CASE WHEN comp.Matricula IS NULL AND COALESCE(lu.EmEstoque, 0) = 0 THEN 1 END) as EquipamentosSemDono
+        FROM Colaboradores c
+        FULL OUTER JOIN Computadores comp ON comp.Matricula = c.Matricula
+        LEFT JOIN LocalUsuario lu ON lu.Usuario = comp.Usuario
+    """, ('Colaboradores', 'Computadores'),
+          {'MesAtual': 'str', 'ColaboradoresAtivos': 'int', 'EquipamentosAlocados': 'int',
+           'EquipamentosEstoque': 'int', 'EquipamentosSemDono': 'int'}),
+    
+    # Distribuição por Status em uma única leitura de Computadores: o total do
+    # percentual é a soma das contagens (janela), incluindo os sem Status.
+    # Alimenta o resumo, o gráfico de status e o de equipamentos críticos.
+    Query('equipamentos_por_status_real', """
+        SELECT StatusNumerico, Quantidade, Percentual
+        FROM (
+            SELECT 
+                c.Status as StatusNumerico,
+                COUNT(*) as Quantidade,
+                ROUND((COUNT(*) * 100.0) / SUM(COUNT(*)) OVER (), 2) as Percentual
+            FROM Computadores c
+            GROUP BY c.Status
+        ) s
+        WHERE StatusNumerico IS NOT NULL
+        ORDER BY StatusNumerico
+    """, ('Computadores',), {'StatusNumerico': 'int8', 'Quantidade': 'int', 'Percentual': 'float'},
+          status_column='Status'),
+    
+    Query('equipamentos_detalhado_status', """
+        SELECT 
+            c.Serial,
+            c.Modelo,
+            c.Status as StatusNumerico,
+            COALESCE(c.Usuario, 'Sem Usuário') as Usuario,
+            COALESCE(c.Matricula, 'Sem Matrícula') as Matricula,
+            COALESCE(col.Nome, 'Não Alocado') as NomeColaborador,
+            COALESCE(col.CCusto, 'Sem Setor') as Setor
+        FROM Computadores c
+        LEFT JOIN Colaboradores col ON col.Matricula = c.Matricula
+        WHERE c.Serial IS NOT NULL
+        ORDER BY c.Status, c.Modelo, c.Serial
+    """, ('Computadores', 'Colaboradores'),
+          {'Serial': 'str', 'Modelo': 'category', 'StatusNumerico': 'int8', 'Usuario': 'category', 'Matricula': None,
+           'NomeColaborador': 'str', 'Setor': 'category'},
+          status_column='StatusRealizado', **DETAIL_READ),
+    
+    Query('diagnostico_status_simples', """
+        SELECT 
+            Status,
+            COUNT(*) as Quantidade
+        FROM Computadores
+        GROUP BY Status
+        ORDER BY Status
+    """, ('Computadores',), {'Status': 'int8', 'Quantidade': 'int'})
+)
+
+# Sonda barata de mudanças: linhas, chave máxima e checksum de cada tabela, em uma única ida ao banco
+TABLE_PROBE_QUERY = "\n        UNION ALL".join(
+    f"""
+        SELECT 
+            '{tabela}' AS Tabela,
+            COUNT_BIG(*) AS Linhas,
+            CAST(MAX({chave}) AS NVARCHAR(64)) AS ChaveMax,
+            CHECKSUM_AGG(BINARY_CHECKSUM(*)) AS Checksum
+        FROM {tabela}"""
+    for tabela, chave in SOURCE_TABLES.items()
+)
+
+def probe_remote_tables():
+    """Retorna {tabela: (linhas, chave máxima, checksum)} ou None se a sonda falhar"""
+    import pandas as pd
+
+    df = execute_remote_query(TABLE_PROBE_QUERY)
+    if df.empty:
+        return None
+    assinaturas = {}
+    for row in df.itertuples(index=False):
+        assinaturas[row.Tabela] = tuple(
+            None if pd.isna(v) else str(v) for v in (row.Linhas, row.ChaveMax, row.Checksum)
+        )
+    return assinaturas
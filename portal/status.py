@@ -0,0 +1,55 @@
+"""
+Códigos da coluna Computadores.Status: rótulo, cor e ícone de cada um e os
+grupos usados nos filtros das queries.
+
+As queries trazem só o código inteiro; o rótulo é aplicado aqui, de uma vez
+para a coluna inteira (categórica), e os filtros SQL são montados a partir
+das mesmas tuplas, sem listas de códigos repetidas em cada query.
+"""
+
+# Código: (rótulo, cor, ícone)
+STATUS = {
+    1: ('Em Estoque', '#007bff', '📦'),
+    2: ('Acesso Remoto', '#6f42c1', '🌐'),
+    3: ('Em Uso', '#28a745', '✅'),
+    4: ('Extraviado', '#ffc107', '❓'),
+    5: ('Reparo', '#ff6b35', '🔧'),
+    6: ('Roubado', '#6c757d', '🚨'),
+    7: ('Devolvido', '#20c997', '↩️'),
+    8: ('Descartado', '#dc3545', '🗑️'),
+    9: ('Danificado', '#fd7e14', '🔧'),
+}
+STATUS_INDEFINIDO = 'Status Indefinido'
+COR_INDEFINIDO = '#e9ecef'
+ICONE_INDEFINIDO = '❗'
+
+STATUS_CRITICOS = (4, 6, 8, 9)           # Extraviado, Roubado, Descartado, Danificado
+STATUS_FORA_DE_USO = STATUS_CRITICOS + (5,)  # Críticos e em reparo: fora das contagens de inventário
+
+ROTULOS = [rotulo for rotulo, _, _ in STATUS.values()] + [STATUS_INDEFINIDO]
+CORES_STATUS = {rotulo: cor for rotulo, cor, _ in STATUS.values()} | {STATUS_INDEFINIDO: COR_INDEFINIDO}
+ICONES_STATUS = {rotulo: icone for rotulo, _, icone in STATUS.values()} | {STATUS_INDEFINIDO: ICONE_INDEFINIDO}
+
+
+def sql_lista(codigos):
+    """Lista de códigos para IN (...) / NOT IN (...)"""
+    return ', '.join(str(codigo) for codigo in codigos)
+
+
+def rotular_status(df, coluna, codigo='StatusNumerico'):
+    """
+    Cria em `df` a coluna `coluna` com o rótulo de cada código de `codigo`
+    (categórica, na ordem dos códigos). Códigos desconhecidos ficam como
+    STATUS_INDEFINIDO.
+    """
+    import pandas as pd
+
+    codigos = pd.to_numeric(df[codigo], errors='coerce')
+    rotulos = codigos.map({numero: rotulo for numero, (rotulo, _, _) in STATUS.items()})
+    df[coluna] = pd.Categorical(rotulos.fillna(STATUS_INDEFINIDO), categories=ROTULOS)
+    return df
+
+
+def cores_status(rotulos):
+    """Cor de cada rótulo, na mesma ordem"""
+    return [CORES_STATUS.get(rotulo, COR_INDEFINIDO) for rotulo in rotulos]
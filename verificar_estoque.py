@@ -2,8 +2,7 @@
 """
 Script para verificar os dados de estoque e confirmar se as exclusões estão funcionando
 """
-import pandas as pd
-from app import get_engine, QUERIES
+from portal.db import get_engine, QUERIES
 from sqlalchemy import text
 
 def verificar_estoque():
@@ -52,7 +51,7 @@ def verificar_estoque():
                     print(f"   ✅ Status {status} ({status_nome}): {quantidade}")
             
             # 3. Total após exclusões
-            result = connection.execute(text(QUERIES['total_equipamentos_estoque']))
+            result = connection.execute(text(QUERIES['total_equipamentos_estoque'].sql))
             total_filtrado_resultado = result.fetchone()
             total_filtrado = total_filtrado_resultado[0] if total_filtrado_resultado and total_filtrado_resultado[0] else 0
             print(f"\n🎯 Total em estoque APÓS exclusões: {total_filtrado}")